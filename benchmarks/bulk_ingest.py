@@ -0,0 +1,84 @@
+"""
+Compares message ingestion throughput of `MessageService.create_message` (one message per call)
+with `MessageService.create_messages` (one batch per call).
+
+    python -m benchmarks.bulk_ingest --database-url postgresql+asyncpg://... --messages 20000 --batch-size 500
+"""
+import argparse
+import asyncio
+import os
+import time
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.services.message_service import MessageService
+from src.infrastructure.unit_of_work import UnitOfWork
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+
+
+def new_service(session: AsyncSession) -> MessageService:
+    return MessageService(
+        user_repository=UserRepository(session),
+        message_repository=MessageRepository(session),
+        unit_of_work=UnitOfWork(session),
+    )
+
+
+async def ingest_one_by_one(async_session, sender_ids, total: int) -> float:
+    started = time.perf_counter()
+    for i in range(total):
+        # A fresh session per message, like one POST /messages/ request each
+        async with async_session() as session:
+            await new_service(session).create_message(Message(sender_id=sender_ids[i % len(sender_ids)], content="x"))
+    return total / (time.perf_counter() - started)
+
+
+async def ingest_batched(async_session, sender_ids, total: int, batch_size: int) -> float:
+    started = time.perf_counter()
+    for batch_start in range(0, total, batch_size):
+        batch = [
+            Message(sender_id=sender_ids[i % len(sender_ids)], content="x")
+            for i in range(batch_start, min(batch_start + batch_size, total))
+        ]
+        async with async_session() as session:
+            await new_service(session).create_messages(batch)
+    return total / (time.perf_counter() - started)
+
+
+async def main(database_url: str, messages: int, batch_size: int, senders: int):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with async_session() as session, UnitOfWork(session):
+        sender_ids = [
+            (await UserRepository(session).create(User(name=f"Sender {i}", email=f"sender-{uuid4()}@example.com"))).id
+            for i in range(senders)
+        ]
+
+    one_by_one = await ingest_one_by_one(async_session, sender_ids, messages)
+    batched = await ingest_batched(async_session, sender_ids, messages, batch_size)
+    await engine.dispose()
+
+    print(f"{'create_message':>24}: {one_by_one:10.0f} messages/s")
+    print(f"{'create_messages':>24}: {batched:10.0f} messages/s (batch size {batch_size})")
+    print(f"{'speedup':>24}: {batched / one_by_one:10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--senders", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.messages, args.batch_size, args.senders))
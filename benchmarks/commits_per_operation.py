@@ -0,0 +1,104 @@
+"""
+Counts the commits and SQL statements issued by each service operation, and times them.
+
+    python -m benchmarks.commits_per_operation --database-url postgresql+asyncpg://... --repeat 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.services.message_service import MessageService
+from src.infrastructure.services.user_service import UserService
+from src.infrastructure.unit_of_work import UnitOfWork
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+
+
+class Counter:
+    def __init__(self, engine):
+        self.commits = 0
+        self.statements = 0
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_statement)
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def _on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+
+def services(session: AsyncSession):
+    user_repository, message_repository = UserRepository(session), MessageRepository(session)
+    unit_of_work = UnitOfWork(session)
+    return (
+        UserService(user_repository=user_repository, message_repository=message_repository, unit_of_work=unit_of_work),
+        MessageService(
+            user_repository=user_repository, message_repository=message_repository, unit_of_work=unit_of_work
+        ),
+    )
+
+
+async def run_once(async_session):
+    """Runs every operation once on fresh data, yielding (operation, coroutine factory)."""
+    async with async_session() as session:
+        user_service, message_service = services(session)
+        user = User(name="Bench", email=f"bench-{uuid4()}@example.com")
+
+        yield "create_user", lambda: user_service.create_user(user)
+        yield "update_user", lambda: user_service.update_user(
+            user.id, User(name="Renamed", email=f"renamed-{uuid4()}@example.com")
+        )
+        message = Message(sender_id=user.id, content="Benchmark")
+        yield "create_message", lambda: message_service.create_message(message)
+        yield "delete_message", lambda: message_service.delete_message(message.id)
+        # Its only message is deleted already, so the batch size doesn't come into play
+        yield "delete_user", lambda: user_service.delete_user(user.id, batch_size=1000)
+
+
+async def main(database_url: str, repeat: int):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    counter = Counter(engine)
+
+    commits, statements, durations = defaultdict(list), defaultdict(list), defaultdict(list)
+    for _ in range(repeat):
+        async for operation, call in run_once(async_session):
+            commits_before, statements_before = counter.commits, counter.statements
+            started = time.perf_counter()
+            await call()
+            durations[operation].append((time.perf_counter() - started) * 1000)
+            commits[operation].append(counter.commits - commits_before)
+            statements[operation].append(counter.statements - statements_before)
+
+    await engine.dispose()
+
+    print(f"{'operation':>16} {'commits':>8} {'statements':>11} {'median ms':>10}")
+    for operation in durations:
+        print(
+            f"{operation:>16} {statistics.mean(commits[operation]):8.1f} "
+            f"{statistics.mean(statements[operation]):11.1f} {statistics.median(durations[operation]):10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.repeat))
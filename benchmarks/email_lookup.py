@@ -0,0 +1,109 @@
+"""
+Times case-insensitive user lookups by email with and without the unique index on lower(email).
+
+Seeds --users users, then looks up random ones with their email in another casing through
+`UserRepository.get_by_email`, first served by "ix_USER_email_lower" and then with the index dropped,
+as the `lower(email)` queries of ops tooling ran before it. The index is recreated afterwards.
+
+    python -m benchmarks.email_lookup --database-url postgresql+asyncpg://... --users 5000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import User
+from src.infrastructure.repositories.user import UserRepository
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+SEED_CHUNK_SIZE = 5000
+INDEX = next(index for index in User.__table__.indexes if index.name == "ix_USER_email_lower")
+
+
+def user_rows(total: int):
+    now = datetime.utcnow()
+    for i in range(total):
+        yield {
+            "id": uuid4(),
+            "is_deleted": False,
+            "created_at": now,
+            "updated_at": now,
+            "name": f"User {i}",
+            "email": f"user.{i}@lookup.example.com",
+            "message_count": 0,
+        }
+
+
+async def seed(engine, total: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        remaining = user_rows(total)
+        while chunk := list(islice(remaining, SEED_CHUNK_SIZE)):
+            await conn.execute(insert(User), chunk)
+    async with engine.begin() as conn:
+        await conn.execute(text('ANALYZE "USER"'))
+
+
+async def lookups(async_session, emails: list) -> list:
+    """Wall time of each lookup, in milliseconds."""
+    durations = []
+    async with async_session() as session:
+        repository = UserRepository(session)
+        for email in emails:
+            started = time.perf_counter()
+            assert await repository.get_by_email(email) is not None
+            durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+async def main(database_url: str, users: int, lookups_count: int, skip_seed: bool):
+    random.seed(0)
+    engine = create_async_engine(database_url)
+    if not skip_seed:
+        started = time.perf_counter()
+        await seed(engine, users)
+        print(f"Seeded {users} users in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.connect() as conn:
+        emails = (await conn.execute(select(User.email).order_by(func.random()).limit(lookups_count))).scalars().all()
+    # Callers don't know the casing the email was registered with
+    emails = [email.upper() if i % 2 else email.title() for i, email in enumerate(emails)]
+
+    results = {"indexed lower(email)": await lookups(async_session, emails)}
+    async with engine.begin() as conn:
+        await conn.run_sync(INDEX.drop)
+    try:
+        # A sequential scan per lookup; a fraction of them is enough to measure it
+        results["lower(email) without index"] = await lookups(async_session, emails[: max(1, lookups_count // 20)])
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(INDEX.create)
+    await engine.dispose()
+
+    print(f"{'lookup of ' + str(users) + ' users':>30} {'p50 ms':>9} {'p95 ms':>9} {'lookups':>8}")
+    for name, durations in results.items():
+        p95 = statistics.quantiles(durations, n=20)[-1] if len(durations) > 1 else durations[0]
+        print(f"{name:>30} {statistics.median(durations):9.3f} {p95:9.3f} {len(durations):8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--users", type=int, default=5_000_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the users of a previous run")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.users, args.lookups, args.skip_seed))
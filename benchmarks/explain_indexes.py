@@ -0,0 +1,173 @@
+"""
+Seeds a PostgreSQL database migrated to head and prints EXPLAIN ANALYZE for every repository query,
+once without the "ix_MESSAGE_sender_id_created_at_active" index and once with it. The index is recreated
+after the first pass, on every partition of MESSAGE.
+
+Every repository method runs inside an outer transaction that is rolled back, so the
+write queries are analyzed without changing the seeded data.
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.explain_indexes --messages 10000000
+"""
+import argparse
+import asyncio
+from uuid import uuid4
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.config import settings
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.pagination import encode_cursor
+from src.infrastructure.repositories.user import UserRepository
+
+INDEX = next(index for index in Message.__table__.indexes if index.name == "ix_MESSAGE_sender_id_created_at_active")
+
+SEED_USERS = """
+INSERT INTO "USER" (id, is_deleted, created_at, name, email, updated_at)
+SELECT gen_random_uuid(), false, now(), 'User ' || g, 'user' || g || '@bench.example.com', now()
+FROM generate_series(1, :users) AS g
+"""
+
+SEED_MESSAGES = """
+WITH senders AS (SELECT array_agg(id) AS ids, count(*) AS total FROM "USER")
+INSERT INTO "MESSAGE" (id, is_deleted, created_at, sender_id, content)
+SELECT gen_random_uuid(), random() < :deleted_ratio, now() - make_interval(secs => g),
+       senders.ids[1 + g % senders.total], 'Message ' || g || ' content'
+FROM senders, generate_series(1, :messages) AS g
+"""
+
+SEED_DELETED_AT = """UPDATE "MESSAGE" SET deleted_at = created_at WHERE is_deleted AND deleted_at IS NULL"""
+
+SEED_MESSAGE_COUNTS = """
+UPDATE "USER" SET message_count = counts.total
+FROM (SELECT sender_id, count(*) AS total FROM "MESSAGE" WHERE NOT is_deleted GROUP BY sender_id) AS counts
+WHERE "USER".id = counts.sender_id
+"""
+
+EXPLAINABLE_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+async def seed(database_url: str, users: int, messages: int, deleted_ratio: float):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        existing = (await conn.execute(select(func.count()).select_from(Message))).scalar_one()
+        if existing >= messages:
+            print(f"Skipping seed, MESSAGE already has {existing} rows")
+        else:
+            await conn.execute(text(SEED_USERS), {"users": users})
+            await conn.execute(text(SEED_MESSAGES), {"messages": messages, "deleted_ratio": deleted_ratio})
+            await conn.execute(text(SEED_DELETED_AT))
+            await conn.execute(text(SEED_MESSAGE_COUNTS))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text('VACUUM ANALYZE "USER", "MESSAGE"'))
+    await engine.dispose()
+
+
+def repository_calls(sender_id, user_email, message_id, cursor):
+    """Every repository query, keyed by a readable name."""
+    return {
+        "UserRepository.create": lambda s: UserRepository(s).create(
+            User(name="Explain", email=f"explain-{uuid4()}@example.com")
+        ),
+        "UserRepository.get_by_id": lambda s: UserRepository(s).get_by_id(sender_id),
+        "UserRepository.get_by_email": lambda s: UserRepository(s).get_by_email(user_email),
+        "UserRepository.list_users": lambda s: UserRepository(s).list_users(limit=20, offset=1000),
+        "UserRepository.update": lambda s: UserRepository(s).update(sender_id, User(name="Renamed", email=user_email)),
+        "UserRepository.soft_delete": lambda s: UserRepository(s).soft_delete(sender_id),
+        "MessageRepository.create": lambda s: MessageRepository(s).create(
+            Message(sender_id=sender_id, content="Explain")
+        ),
+        "MessageRepository.get_by_id": lambda s: MessageRepository(s).get_by_id(message_id),
+        "MessageRepository.get_by_sender_id (offset)": lambda s: MessageRepository(s).get_by_sender_id(
+            sender_id, limit=20, offset=500
+        ),
+        "MessageRepository.get_by_sender_id (cursor)": lambda s: MessageRepository(s).get_by_sender_id(
+            sender_id, limit=20, cursor=cursor
+        ),
+        "MessageRepository.get_by_sender_id_count": lambda s: MessageRepository(s).get_by_sender_id_count(sender_id),
+        "MessageRepository.soft_delete": lambda s: MessageRepository(s).soft_delete(message_id),
+        "MessageRepository.soft_delete_by_sender_id": lambda s: MessageRepository(s).soft_delete_by_sender_id(
+            sender_id
+        ),
+    }
+
+
+async def explain(database_url: str, label: str):
+    engine = create_async_engine(database_url)
+
+    async with engine.connect() as conn:
+        sample = (
+            await conn.execute(
+                select(Message.sender_id, Message.id, Message.created_at)
+                .where(Message.is_deleted == False)  # noqa
+                .order_by(Message.created_at)
+                .limit(1)
+            )
+        ).one()
+        user_email = (await conn.execute(select(User.email).where(User.id == sample.sender_id))).scalar_one()
+
+    calls = repository_calls(sample.sender_id, user_email, sample.id, encode_cursor(sample.created_at, sample.id))
+
+    print(f"\n==================== {label} ====================")
+    for name, call in calls.items():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        async with engine.connect() as conn:
+            outer = await conn.begin()
+            session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+
+            event.listen(conn.sync_connection, "before_cursor_execute", capture)
+            await call(session)
+            event.remove(conn.sync_connection, "before_cursor_execute", capture)
+
+            for statement, parameters in captured:
+                if not statement.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+                    continue
+                plan = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                print(f"\n--- {name}\n{statement.strip()}")
+                print("\n".join(row[0] for row in plan))
+
+            await session.close()
+            await outer.rollback()
+
+    await engine.dispose()
+
+
+async def without_index(database_url: str) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(INDEX.drop)
+    try:
+        await explain(database_url, f"before (without {INDEX.name})")
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(INDEX.create)
+            await conn.execute(text('ANALYZE "MESSAGE"'))
+        await engine.dispose()
+
+
+def main(users: int, messages: int, deleted_ratio: float):
+    database_url = settings.database_url
+
+    # The repositories run against the current schema, so both passes stay at head
+    command.upgrade(Config("alembic.ini"), "head")
+    asyncio.run(seed(database_url, users, messages, deleted_ratio))
+    asyncio.run(without_index(database_url))
+    asyncio.run(explain(database_url, "after (head)"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--deleted-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    main(args.users, args.messages, args.deleted_ratio)
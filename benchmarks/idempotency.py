@@ -0,0 +1,90 @@
+"""
+Measures what retried creations cost with and without an Idempotency-Key, through the app in-process.
+
+Creates --requests users and messages with a key each, then retries every request:
+
+- with its key, the stored response is replayed by `IdempotencyMiddleware` without touching USER or MESSAGE
+  (the database store reads CACHE_ENTRY instead)
+- without a key, a retried user creation runs again and fails on the unique email (IntegrityError and rollback),
+  and a retried message is created a second time. Failed statements aren't counted under SQL/request
+
+--backend picks the store of the keys, as IDEMPOTENCY_BACKEND does: "memory" or "database" (CACHE_ENTRY).
+
+    python -m benchmarks.idempotency --database-url postgresql+asyncpg://... --requests 2000 --backend database
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from uuid import uuid4
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+
+
+async def timed_posts(client, track_queries, path: str, requests: list) -> tuple:
+    """Median latency in milliseconds, SQL statements per request and the status codes of the requests."""
+    durations, statuses = [], set()
+    with track_queries() as stats:
+        for body, headers in requests:
+            started = time.perf_counter()
+            response = await client.post(path, json=body, headers=headers)
+            durations.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+    return statistics.median(durations), stats.statements / len(requests), sorted(statuses)
+
+
+async def main(database_url: str, requests: int, backend: str):
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["IDEMPOTENCY_BACKEND"] = backend
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+        os.environ.setdefault(name, "benchmark")
+    from httpx import ASGITransport, AsyncClient
+    from sqlmodel import SQLModel
+
+    from src.config import database
+    from src.infrastructure.database.instrumentation import track_queries
+    from src.main import app
+
+    database.open()
+    async with database.engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    results = {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+        users = [
+            ({"name": f"User {i}", "email": f"user-{uuid4()}@example.com"}, {"Idempotency-Key": str(uuid4())})
+            for i in range(requests)
+        ]
+        results["create user"] = await timed_posts(client, track_queries, "/users/", users)
+        results["retry user with key"] = await timed_posts(client, track_queries, "/users/", users)
+        results["retry user without key"] = await timed_posts(
+            client, track_queries, "/users/", [(body, {}) for body, _ in users]
+        )
+
+        sender = (await client.post("/users/", json={"name": "Sender", "email": f"{uuid4()}@example.com"})).json()
+        messages = [
+            ({"sender_id": sender["id"], "content": f"Message {i}"}, {"Idempotency-Key": str(uuid4())})
+            for i in range(requests)
+        ]
+        results["create message"] = await timed_posts(client, track_queries, "/messages/", messages)
+        results["retry message with key"] = await timed_posts(client, track_queries, "/messages/", messages)
+        results["retry message without key"] = await timed_posts(
+            client, track_queries, "/messages/", [(body, {}) for body, _ in messages]
+        )
+    await database.close()
+
+    print(f"{'requests (' + backend + ' store)':>28} {'p50 ms':>8} {'SQL/request':>12} {'statuses':>10}")
+    for name, (p50, statements, statuses) in results.items():
+        print(f"{name:>28} {p50:8.2f} {statements:12.1f} {','.join(map(str, statuses)):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--backend", choices=["memory", "database"], default="memory")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.requests, args.backend))
@@ -0,0 +1,111 @@
+"""
+Compares offset and keyset (cursor) pagination of a heavy sender's messages.
+
+Seeds one sender with enough messages to reach the requested page depth, then times
+`MessageRepository.get_by_sender_id` at page 1 and at the deepest page in both modes.
+
+    python -m benchmarks.keyset_pagination --database-url postgresql+asyncpg://... --pages 10000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.pagination import encode_cursor
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+SEED_CHUNK_SIZE = 5000
+
+
+async def seed(session: AsyncSession, total: int):
+    sender = User(name="Heavy sender", email=f"heavy-{uuid4()}@example.com")
+    session.add(sender)
+    await session.commit()
+
+    started_at = datetime.utcnow()
+    for chunk_start in range(0, total, SEED_CHUNK_SIZE):
+        rows = [
+            {
+                "id": uuid4(),
+                "is_deleted": False,
+                "created_at": started_at + timedelta(microseconds=i),
+                "sender_id": sender.id,
+                "content": f"Message {i} content",
+            }
+            for i in range(chunk_start, min(chunk_start + SEED_CHUNK_SIZE, total))
+        ]
+        await session.execute(insert(Message), rows)
+        await session.commit()
+    return sender.id
+
+
+async def timed(coro_factory, repeat: int) -> float:
+    """Returns the median duration of the awaited coroutine in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+async def main(database_url: str, pages: int, page_size: int, repeat: int):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        sender_id = await seed(session, pages * page_size)
+        repository = MessageRepository(session)
+
+        # Cursor pointing at the last row before the deepest page
+        boundary_query = (
+            select(Message.created_at, Message.id)
+            .where(Message.sender_id == sender_id)
+            .order_by(Message.created_at, Message.id)
+            .offset((pages - 1) * page_size - 1)
+            .limit(1)
+        )
+        boundary = (await session.execute(boundary_query)).one()
+        deep_cursor = encode_cursor(boundary.created_at, boundary.id)
+
+        results = {
+            "offset_page_1": await timed(
+                lambda: repository.get_by_sender_id(sender_id, limit=page_size, offset=0), repeat
+            ),
+            f"offset_page_{pages}": await timed(
+                lambda: repository.get_by_sender_id(sender_id, limit=page_size, offset=(pages - 1) * page_size),
+                repeat,
+            ),
+            "keyset_page_1": await timed(lambda: repository.get_by_sender_id(sender_id, limit=page_size), repeat),
+            f"keyset_page_{pages}": await timed(
+                lambda: repository.get_by_sender_id(sender_id, limit=page_size, cursor=deep_cursor), repeat
+            ),
+        }
+
+    await engine.dispose()
+
+    for name, duration in results.items():
+        print(f"{name:>24}: {duration:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.pages, args.page_size, args.repeat))
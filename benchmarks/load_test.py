@@ -0,0 +1,277 @@
+"""
+Load-tests the API with a mixed workload and reports latency percentiles and throughput per endpoint as JSON.
+
+Seeds the database, starts `src.main:app` with uvicorn (unless --url points at a running server), then lets
+--concurrency clients pick weighted operations for --duration seconds: create a user, post a message,
+page through a sender's messages with the cursor and delete a user.
+
+    python -m benchmarks.load_test --database-url postgresql+asyncpg://... --duration 30 --output before.json
+    python -m benchmarks.load_test --database-url postgresql+asyncpg://... --duration 30 --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+SEED_CHUNK_SIZE = 5000
+
+# Relative frequency of each operation in the mix
+DEFAULT_WEIGHTS = {"create_user": 1, "create_message": 5, "get_messages_page": 10, "delete_user": 1}
+
+
+async def seed(database_url: str, users: int, messages_per_user: int) -> list:
+    """Inserts users with their messages directly, bypassing the API, and returns the user ids."""
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    now = datetime.utcnow()
+    user_rows = [
+        {
+            "id": uuid4(),
+            "is_deleted": False,
+            "created_at": now,
+            "updated_at": now,
+            "name": f"Load {i}",
+            "email": f"load-{uuid4()}@example.com",
+            "message_count": messages_per_user,
+        }
+        for i in range(users)
+    ]
+    message_rows = [
+        {
+            "id": uuid4(),
+            "is_deleted": False,
+            "created_at": now + timedelta(microseconds=i),
+            "sender_id": row["id"],
+            "content": f"Seeded message {i}",
+        }
+        for row in user_rows
+        for i in range(messages_per_user)
+    ]
+    async with engine.begin() as conn:
+        for model, rows in ((User, user_rows), (Message, message_rows)):
+            remaining = iter(rows)
+            while chunk := list(islice(remaining, SEED_CHUNK_SIZE)):
+                await conn.execute(insert(model), chunk)
+    await engine.dispose()
+    return [str(row["id"]) for row in user_rows]
+
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    env = {
+        "POSTGRES_USER": "benchmark",
+        "POSTGRES_PASSWORD": "benchmark",
+        "POSTGRES_DB": "benchmark",
+        **os.environ,
+        "DATABASE_URL": database_url,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"], env=env
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get("/metrics")
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+class Workload:
+    """Operations of the mix, timing every request they make under its endpoint."""
+
+    def __init__(self, client: httpx.AsyncClient, sender_ids: list, page_size: int):
+        self.client = client
+        self.sender_ids = sender_ids
+        # Users created by the run, the only ones deleted so the seeded senders keep their messages
+        self.created_user_ids = []
+        self.page_size = page_size
+        self.latencies = defaultdict(list)
+
+    async def create_user(self) -> None:
+        response = await self._request(
+            "POST /users/", "POST", "/users/", json={"name": "Load", "email": f"load-{uuid4()}@example.com"}
+        )
+        self.created_user_ids.append(response.json()["id"])
+
+    async def create_message(self) -> None:
+        await self._request(
+            "POST /messages/",
+            "POST",
+            "/messages/",
+            json={"sender_id": random.choice(self.sender_ids), "content": "Load test message"},
+        )
+
+    async def get_messages_page(self) -> None:
+        sender_id = random.choice(self.sender_ids)
+        params = {"limit": self.page_size, "include_count": False}
+        # Scroll a few pages with the cursor, like a client loading older messages
+        for _ in range(random.randint(1, 3)):
+            response = await self._request(
+                "GET /messages/sender/{sender_id}", "GET", f"/messages/sender/{sender_id}", params=params
+            )
+            next_cursor = response.json()["next_cursor"]
+            if next_cursor is None:
+                return
+            params["cursor"] = next_cursor
+
+    async def delete_user(self) -> None:
+        if not self.created_user_ids:
+            return await self.create_user()
+        await self._request("DELETE /users/{user_id}", "DELETE", f"/users/{self.created_user_ids.pop()}")
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        response.raise_for_status()
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        return response
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run(base_url: str, sender_ids: list, concurrency: int, duration: float, page_size: int, weights: dict):
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_until_ready(client)
+        workload = Workload(client, sender_ids, page_size)
+        operations = [getattr(workload, name) for name in weights]
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                operation = random.choices(operations, weights=list(weights.values()))[0]
+                try:
+                    await operation()
+                except httpx.HTTPError as e:
+                    errors[f"{operation.__name__}: {type(e).__name__}"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+        latencies = workload.latencies
+
+    report = {}
+    for endpoint, values in sorted(latencies.items()):
+        values.sort()
+        report[endpoint] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 0.50), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+        }
+    return {
+        "total_rps": round(sum(len(values) for values in latencies.values()) / elapsed, 1),
+        "endpoints": report,
+        "errors": dict(errors),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change of throughput and p95 latency per endpoint against a previous report."""
+    changes = {}
+    for endpoint, stats in report["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint)
+        if before:
+            changes[endpoint] = {
+                "rps_change": f"{stats['rps'] / before['rps'] - 1:+.1%}",
+                "p95_change": f"{stats['p95_ms'] / before['p95_ms'] - 1:+.1%}",
+            }
+    return {"baseline_revision": baseline.get("revision"), "endpoints": changes}
+
+
+def main(args):
+    random.seed(args.seed)
+    sender_ids = asyncio.run(seed(args.database_url, args.users, args.messages_per_user))
+
+    server = None if args.url else start_server(args.database_url, args.port)
+    try:
+        results = asyncio.run(
+            run(
+                args.url or f"http://127.0.0.1:{args.port}",
+                sender_ids,
+                args.concurrency,
+                args.duration,
+                args.page_size,
+                DEFAULT_WEIGHTS,
+            )
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "revision": git_revision(),
+        "database": args.database_url.split("://")[0],
+        "parameters": {
+            "users": args.users,
+            "messages_per_user": args.messages_per_user,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "page_size": args.page_size,
+            "weights": DEFAULT_WEIGHTS,
+        },
+        **results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--url", help="Base URL of an already running server; seeding still uses --database-url")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages-per-user", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the operation mix")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+
+    main(parser.parse_args())
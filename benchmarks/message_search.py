@@ -0,0 +1,137 @@
+"""
+Compares the full-text search of `MessageRepository.search` with a sequential `ILIKE '%q%'` scan.
+
+Seeds --rows messages whose words follow a Zipf-like distribution, then times both for common, uncommon and
+rare words. On PostgreSQL the search goes through the generated tsvector column and its GIN index, created
+here as the migrations do; elsewhere it falls back to the in-process inverted index.
+
+    python -m benchmarks.message_search --database-url postgresql+asyncpg://... --rows 10000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from uuid import uuid4
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MESSAGE_ROW_COLUMNS, MessageRepository
+from src.infrastructure.search import TEXT_SEARCH_CONFIG
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+SEED_CHUNK_SIZE = 5000
+VOCABULARY_SIZE = 50000
+WORDS_PER_MESSAGE = 12
+# Vocabulary ranks of the searched words, from frequent to rare
+QUERY_RANKS = {"common": 10, "uncommon": 1000, "rare": 40000}
+
+
+def word(rank: int) -> str:
+    return f"w{rank}x"
+
+
+def message_rows(sender_id, total: int):
+    ranks = range(1, VOCABULARY_SIZE + 1)
+    cum_weights = list(accumulate(1 / rank for rank in ranks))
+    now = datetime.utcnow()
+    for i in range(total):
+        words = random.choices(ranks, cum_weights=cum_weights, k=WORDS_PER_MESSAGE)
+        yield {
+            "id": uuid4(),
+            "is_deleted": False,
+            "created_at": now + timedelta(microseconds=i),
+            "sender_id": sender_id,
+            "content": " ".join(word(rank) for rank in words),
+        }
+
+
+async def seed(engine, total: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        if engine.dialect.name == "postgresql":
+            await conn.execute(
+                text(
+                    'ALTER TABLE "MESSAGE" ADD COLUMN IF NOT EXISTS content_tsv tsvector '
+                    f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', content)) STORED"
+                )
+            )
+
+    sender = {"id": uuid4(), "is_deleted": False, "name": "Search", "email": f"search-{uuid4()}@example.com"}
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{**sender, "message_count": total}])
+        remaining = message_rows(sender["id"], total)
+        while chunk := list(islice(remaining, SEED_CHUNK_SIZE)):
+            await conn.execute(insert(Message), chunk)
+
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(
+                text('CREATE INDEX IF NOT EXISTS "ix_MESSAGE_content_tsv" ON "MESSAGE" USING gin (content_tsv)')
+            )
+            await conn.execute(text('ANALYZE "MESSAGE"'))
+
+
+async def full_text(async_session, query: str, limit: int) -> int:
+    async with async_session() as session:
+        return len(await MessageRepository(session).search(query, limit=limit))
+
+
+async def ilike(async_session, query: str, limit: int) -> int:
+    statement = (
+        select(*MESSAGE_ROW_COLUMNS)
+        .where(Message.content.ilike(f"%{query}%"), Message.is_deleted == False)  # noqa
+        .order_by(Message.created_at, Message.id)
+        .limit(limit)
+    )
+    async with async_session() as session:
+        return len((await session.execute(statement)).all())
+
+
+async def timed(coro_factory, repeat: int) -> float:
+    """Median wall time of the awaited coroutine, in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+async def main(database_url: str, rows: int, limit: int, repeat: int, skip_seed: bool):
+    random.seed(0)
+    engine = create_async_engine(database_url)
+    if not skip_seed:
+        started = time.perf_counter()
+        await seed(engine, rows)
+        print(f"Seeded {rows} messages in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"{'query':>10} {'full-text ms':>13} {'ilike ms':>10} {'results':>8}")
+    for name, rank in QUERY_RANKS.items():
+        query = word(rank)
+        results = await full_text(async_session, query, limit)
+        search_ms = await timed(lambda: full_text(async_session, query, limit), repeat)
+        ilike_ms = await timed(lambda: ilike(async_session, query, limit), repeat)
+        print(f"{name:>10} {search_ms:13.2f} {ilike_ms:10.2f} {results:8}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the messages of a previous run")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.rows, args.limit, args.repeat, args.skip_seed))
@@ -0,0 +1,115 @@
+"""
+Compares the cost of loading and serializing one page of a sender's messages:
+
+- ORM: `Message` instances, revalidated against `PaginatedMessageResponse` and encoded with the stdlib json,
+  as FastAPI does for a `response_model`
+- projected: `MessageRow` tuples from `get_page_by_sender_id`, encoded with orjson
+
+    python -m benchmarks.page_serialization --database-url postgresql+asyncpg://... --page-size 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.api.schema.message_schema import PaginatedMessageResponse
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+
+# What FastAPI validates a response_model with
+response_adapter = TypeAdapter(PaginatedMessageResponse)
+
+
+async def seed(async_session, total: int):
+    now = datetime.utcnow()
+    sender = User(name="Page sender", email=f"page-{uuid4()}@example.com", message_count=total)
+    rows = [
+        {
+            "id": uuid4(),
+            "is_deleted": False,
+            "created_at": now + timedelta(microseconds=i),
+            "sender_id": sender.id,
+            "content": f"Message {i} with some realistic length content to serialize",
+        }
+        for i in range(total)
+    ]
+    async with async_session() as session:
+        session.add(sender)
+        await session.flush()
+        await session.execute(insert(Message), rows)
+        await session.commit()
+    return sender.id
+
+
+async def orm_page(async_session, sender_id, page_size: int) -> bytes:
+    async with async_session() as session:
+        repository = MessageRepository(session)
+        messages = await repository.get_by_sender_id(sender_id, limit=page_size)
+        count = await repository.get_by_sender_id_count(sender_id)
+    response = response_adapter.validate_python({"count": count, "messages": messages, "next_cursor": None})
+    return json.dumps(jsonable_encoder(response)).encode()
+
+
+async def projected_page(async_session, sender_id, page_size: int) -> bytes:
+    async with async_session() as session:
+        count, rows = await MessageRepository(session).get_page_by_sender_id(sender_id, limit=page_size)
+    messages = [{"id": row.id, "sender_id": row.sender_id, "content": row.content} for row in rows]
+    return orjson.dumps({"count": count, "messages": messages, "next_cursor": None})
+
+
+async def timed(coro_factory, repeat: int) -> tuple:
+    """Median wall time and process CPU time of the awaited coroutine, in milliseconds."""
+    wall, cpu = [], []
+    for _ in range(repeat):
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        await coro_factory()
+        wall.append((time.perf_counter() - wall_started) * 1000)
+        cpu.append((time.process_time() - cpu_started) * 1000)
+    return statistics.median(wall), statistics.median(cpu)
+
+
+async def main(database_url: str, page_size: int, repeat: int):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    sender_id = await seed(async_session, page_size)
+
+    # Both paths must produce the same document
+    assert json.loads(await orm_page(async_session, sender_id, page_size)) == json.loads(
+        await projected_page(async_session, sender_id, page_size)
+    )
+
+    results = {
+        "orm + response_model + json": await timed(lambda: orm_page(async_session, sender_id, page_size), repeat),
+        "projected rows + orjson": await timed(lambda: projected_page(async_session, sender_id, page_size), repeat),
+    }
+    await engine.dispose()
+
+    print(f"{'page of ' + str(page_size):>30} {'wall ms':>9} {'cpu ms':>9}")
+    for name, (wall, cpu) in results.items():
+        print(f"{name:>30} {wall:9.2f} {cpu:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.page_size, args.repeat))
@@ -0,0 +1,82 @@
+"""
+Measures how throughput scales with the number of server workers.
+
+Seeds the database once, then starts `python -m src.server` with 1, 2, 4... workers up to the core count
+and runs the same load against each, printing the RPS and p95 latency per worker count as JSON.
+The default mix only reads, so SQLite's single writer doesn't hide the scaling; pass --writes to add them.
+
+    python -m benchmarks.worker_scaling --database-url postgresql+asyncpg://... --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.load_test import DEFAULT_DATABASE_URL, DEFAULT_WEIGHTS, run, seed
+
+READ_WEIGHTS = {"get_messages_page": 1}
+
+
+def worker_counts(max_workers: int) -> list:
+    counts, workers = [], 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def start_server(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = {
+        "POSTGRES_USER": "benchmark",
+        "POSTGRES_PASSWORD": "benchmark",
+        "POSTGRES_DB": "benchmark",
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "SERVER_WORKERS": str(workers),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "src.server"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def main(args):
+    sender_ids = asyncio.run(seed(args.database_url, args.users, args.messages_per_user))
+    weights = DEFAULT_WEIGHTS if args.writes else READ_WEIGHTS
+
+    results = []
+    for workers in worker_counts(args.max_workers):
+        server = start_server(args.database_url, args.port, workers)
+        try:
+            report = asyncio.run(
+                run(f"http://127.0.0.1:{args.port}", sender_ids, args.concurrency, args.duration, 20, weights)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        p95 = max(endpoint["p95_ms"] for endpoint in report["endpoints"].values())
+        results.append({"workers": workers, "rps": report["total_rps"], "p95_ms": p95, "errors": report["errors"]})
+        print(f"{workers:>3} workers: {report['total_rps']:10.1f} requests/s, p95 {p95:8.2f} ms", file=sys.stderr)
+
+    baseline = results[0]["rps"]
+    for result in results:
+        result["speedup"] = round(result["rps"] / baseline, 2) if baseline else None
+    print(json.dumps({"cores": os.cpu_count(), "weights": weights, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages-per-user", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--writes", action="store_true", help="Use the load test's mixed workload")
+
+    main(parser.parse_args())
@@ -0,0 +1,116 @@
+"""
+Compares `MessageService.create_message` committing each message with the write-behind queue group-committing them.
+
+--concurrency clients each send their share of --messages, with a fresh session per message like one
+POST /messages/ request each. The synchronous path acknowledges a message once it's committed; the
+write-behind path once it's queued, so it reports both the accepted and the committed throughput, plus how long
+accepted messages stayed in memory only (what a crash would lose) and the backlog left when the burst ended.
+
+    python -m benchmarks.write_behind --database-url postgresql+asyncpg://... --messages 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.exceptions.message import MessageQueueFullException
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.services.message_service import MessageService
+from src.infrastructure.unit_of_work import UnitOfWork
+from src.infrastructure.write_behind import MessageWriteBehindQueue
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+
+
+def new_service(session: AsyncSession, write_behind: Optional[MessageWriteBehindQueue] = None) -> MessageService:
+    return MessageService(
+        user_repository=UserRepository(session),
+        message_repository=MessageRepository(session),
+        unit_of_work=UnitOfWork(session),
+        write_behind=write_behind,
+    )
+
+
+async def client(async_session, sender_id, count: int, write_behind: Optional[MessageWriteBehindQueue]) -> int:
+    """Sends `count` messages, backing off like a client told to retry; returns how many were rejected first."""
+    rejected = 0
+    for _ in range(count):
+        while True:
+            try:
+                async with async_session() as session:
+                    await new_service(session, write_behind).create_message(Message(sender_id=sender_id, content="x"))
+                break
+            except MessageQueueFullException:
+                rejected += 1
+                await asyncio.sleep(0.01)
+    return rejected
+
+
+async def run_clients(async_session, sender_ids, total: int, concurrency: int, write_behind=None) -> int:
+    shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+    rejections = await asyncio.gather(
+        *(client(async_session, sender_ids[i % len(sender_ids)], share, write_behind) for i, share in enumerate(shares))
+    )
+    return sum(rejections)
+
+
+async def main(database_url: str, messages: int, concurrency: int, senders: int, max_queue: int, batch_size: int):
+    # Concurrent SQLite writers wait for the database lock instead of failing right away
+    connect_args = {"timeout": 60} if database_url.startswith("sqlite") else {}
+    engine = create_async_engine(database_url, connect_args=connect_args)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with async_session() as session, UnitOfWork(session):
+        sender_ids = [
+            (await UserRepository(session).create(User(name=f"Sender {i}", email=f"sender-{uuid4()}@example.com"))).id
+            for i in range(senders)
+        ]
+
+    started = time.perf_counter()
+    await run_clients(async_session, sender_ids, messages, concurrency)
+    synchronous = messages / (time.perf_counter() - started)
+
+    queue = MessageWriteBehindQueue(async_session, max_size=max_queue, batch_size=batch_size)
+    queue.start()
+    started = time.perf_counter()
+    rejected = await run_clients(async_session, sender_ids, messages, concurrency, queue)
+    accepted = messages / (time.perf_counter() - started)
+    peak_depth = queue.metrics.depth
+    await queue.stop()
+    committed = messages / (time.perf_counter() - started)
+    await engine.dispose()
+
+    metrics = queue.metrics
+    print(f"{'synchronous':>24}: {synchronous:10.0f} messages/s committed")
+    print(f"{'write-behind accepted':>24}: {accepted:10.0f} messages/s ({rejected} rejections retried)")
+    print(f"{'write-behind committed':>24}: {committed:10.0f} messages/s in {metrics.flushes} group commits")
+    print(
+        f"{'accept to commit':>24}: {metrics.queued_seconds_total / max(metrics.written, 1) * 1000:10.1f} ms avg, "
+        f"{metrics.queued_seconds_max * 1000:.1f} ms max"
+    )
+    print(f"{'queue depth':>24}: {peak_depth:10} at the end of the burst (max {max_queue})")
+    if metrics.failed:
+        print(f"{'lost':>24}: {metrics.failed:10} messages in failed flushes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--senders", type=int, default=10)
+    parser.add_argument("--max-queue", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.messages, args.concurrency, args.senders, args.max_queue, args.batch_size))
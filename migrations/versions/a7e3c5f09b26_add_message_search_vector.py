@@ -0,0 +1,34 @@
+"""Add generated tsvector of message content with a GIN index
+
+Revision ID: a7e3c5f09b26
+Revises: f2b8d4c7a915
+Create Date: 2026-10-18 16:27:54.091367
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7e3c5f09b26"
+down_revision: Union[str, None] = "f2b8d4c7a915"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A stored generated column rewrites MESSAGE once, then PostgreSQL keeps it in sync with content.
+    # Keep the configuration in line with TEXT_SEARCH_CONFIG in src/infrastructure/search.py
+    op.execute(
+        """
+        ALTER TABLE "MESSAGE" ADD COLUMN content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+        """
+    )
+    op.create_index("ix_MESSAGE_content_tsv", "MESSAGE", ["content_tsv"], unique=False, postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_MESSAGE_content_tsv", table_name="MESSAGE")
+    op.drop_column("MESSAGE", "content_tsv")
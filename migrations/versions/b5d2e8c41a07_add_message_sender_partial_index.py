@@ -0,0 +1,46 @@
+"""Add partial index on active messages by sender, drop redundant id indexes
+
+Revision ID: b5d2e8c41a07
+Revises: 73e3bc923f74
+Create Date: 2026-10-18 10:12:31.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5d2e8c41a07"
+down_revision: Union[str, None] = "73e3bc923f74"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction, but keeps MESSAGE writable while the index builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_MESSAGE_sender_id_created_at_active",
+            "MESSAGE",
+            ["sender_id", "created_at", "id"],
+            unique=False,
+            postgresql_where=sa.text("is_deleted = false"),
+            postgresql_concurrently=True,
+        )
+
+    # Both duplicate the primary key index
+    op.drop_index("ix_MESSAGE_id", table_name="MESSAGE")
+    op.drop_index("ix_USER_id", table_name="USER")
+
+
+def downgrade() -> None:
+    op.create_index("ix_USER_id", "USER", ["id"], unique=False)
+    op.create_index("ix_MESSAGE_id", "MESSAGE", ["id"], unique=False)
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_MESSAGE_sender_id_created_at_active",
+            table_name="MESSAGE",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,36 @@
+"""Create CACHE_ENTRY, the shared store of the database cache backend (idempotency keys)
+
+Revision ID: b9c4e7d2a318
+Revises: d3f1a8b6c240
+Create Date: 2026-10-18 20:41:09.318256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b9c4e7d2a318"
+down_revision: Union[str, None] = "d3f1a8b6c240"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "CACHE_ENTRY",
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(length=512), nullable=False),
+        sa.Column("value", sa.JSON(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    # Finds the expired entries to evict
+    op.create_index(op.f("ix_CACHE_ENTRY_expires_at"), "CACHE_ENTRY", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_CACHE_ENTRY_expires_at"), table_name="CACHE_ENTRY")
+    op.drop_table("CACHE_ENTRY")
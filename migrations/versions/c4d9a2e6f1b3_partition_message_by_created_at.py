@@ -0,0 +1,97 @@
+"""Partition MESSAGE by month of created_at
+
+Revision ID: c4d9a2e6f1b3
+Revises: e1f7a3c90d52
+Create Date: 2026-10-18 13:41:09.552870
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    month_start,
+    months_to_create,
+    partition_name,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d9a2e6f1b3"
+down_revision: Union[str, None] = "e1f7a3c90d52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Future partitions created up front; `python -m src.commands.maintain_message_partitions` keeps ahead of them
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, is_deleted, created_at, sender_id, content"
+
+
+def _create_message_table(name: str, partitioned: bool) -> None:
+    # The partition key has to be part of the primary key of a partitioned table
+    op.execute(
+        f"""
+        CREATE TABLE "{name}" (
+            id UUID NOT NULL,
+            is_deleted BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            sender_id UUID NOT NULL REFERENCES "USER" (id),
+            content VARCHAR NOT NULL,
+            PRIMARY KEY ({"id, created_at" if partitioned else "id"})
+        ) {"PARTITION BY RANGE (created_at)" if partitioned else ""}
+        """
+    )
+
+
+def _create_active_sender_index() -> None:
+    # Created on the parent, it cascades to every partition, existing or future
+    op.create_index(
+        "ix_MESSAGE_sender_id_created_at_active",
+        "MESSAGE",
+        ["sender_id", "created_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("is_deleted = false"),
+    )
+
+
+def upgrade() -> None:
+    # Rewrites the table, so MESSAGE is locked for the duration; run it in a maintenance window
+    op.drop_index("ix_MESSAGE_sender_id_created_at_active", table_name="MESSAGE")
+    op.rename_table("MESSAGE", "MESSAGE_unpartitioned")
+    op.execute('ALTER TABLE "MESSAGE_unpartitioned" RENAME CONSTRAINT "MESSAGE_pkey" TO "MESSAGE_unpartitioned_pkey"')
+    _create_message_table("MESSAGE", partitioned=True)
+
+    oldest = op.get_bind().execute(sa.text('SELECT min(created_at) FROM "MESSAGE_unpartitioned"')).scalar()
+    today = date.today()
+    month = month_start(oldest.date()) if oldest is not None else month_start(today)
+    months = []
+    while month < month_start(today):
+        months.append(month)
+        month = add_months(month, 1)
+    for month in months + months_to_create(today, MONTHS_AHEAD):
+        op.execute(
+            f'CREATE TABLE "{partition_name(month)}" PARTITION OF "MESSAGE" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+    op.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "MESSAGE" DEFAULT')
+
+    op.execute(f'INSERT INTO "MESSAGE" ({COLUMNS}) SELECT {COLUMNS} FROM "MESSAGE_unpartitioned"')
+    op.drop_table("MESSAGE_unpartitioned")
+    _create_active_sender_index()
+    op.execute('ANALYZE "MESSAGE"')
+
+
+def downgrade() -> None:
+    op.drop_index("ix_MESSAGE_sender_id_created_at_active", table_name="MESSAGE")
+    op.rename_table("MESSAGE", "MESSAGE_partitioned")
+    op.execute('ALTER TABLE "MESSAGE_partitioned" RENAME CONSTRAINT "MESSAGE_pkey" TO "MESSAGE_partitioned_pkey"')
+    _create_message_table("MESSAGE", partitioned=False)
+    op.execute(f'INSERT INTO "MESSAGE" ({COLUMNS}) SELECT {COLUMNS} FROM "MESSAGE_partitioned"')
+    # Drops every partition still attached; detached ones are left alone as standalone tables
+    op.execute('DROP TABLE "MESSAGE_partitioned"')
+    _create_active_sender_index()
@@ -0,0 +1,55 @@
+"""Replace the unique constraint on USER.email by a unique index on lower(email)
+
+Revision ID: d3f1a8b6c240
+Revises: a7e3c5f09b26
+Create Date: 2026-10-18 17:48:12.604519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d3f1a8b6c240"
+down_revision: Union[str, None] = "a7e3c5f09b26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Emails differing only by their casing were accepted so far; they have to be merged or renamed first
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                """
+                SELECT lower(email) AS email, count(*) AS users FROM "USER"
+                GROUP BY lower(email) HAVING count(*) > 1 ORDER BY lower(email) LIMIT 20
+                """
+            )
+        )
+        .all()
+    )
+    if duplicates:
+        listed = ", ".join(f"{row.email} ({row.users} users)" for row in duplicates)
+        raise RuntimeError(f"Emails used by several users with different casings: {listed}")
+
+    # CONCURRENTLY can't run inside a transaction, but keeps USER writable while the index builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_USER_email_lower",
+            "USER",
+            [sa.text("lower(email)")],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+    # Made redundant by the index: an exact duplicate is a duplicate of lower(email) as well
+    op.drop_constraint("USER_email_key", "USER", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("USER_email_key", "USER", ["email"])
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_USER_email_lower", table_name="USER", postgresql_concurrently=True)
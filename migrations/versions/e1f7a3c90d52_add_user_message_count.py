@@ -0,0 +1,35 @@
+"""Add maintained message counter to user
+
+Revision ID: e1f7a3c90d52
+Revises: b5d2e8c41a07
+Create Date: 2026-10-18 11:03:47.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e1f7a3c90d52"
+down_revision: Union[str, None] = "b5d2e8c41a07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("USER", sa.Column("message_count", sa.Integer(), server_default="0", nullable=False))
+    # Backfill; run `python -m src.commands.reconcile_message_counts` afterwards if writes weren't stopped
+    op.execute(
+        """
+        UPDATE "USER" SET message_count = (
+            SELECT count(*) FROM "MESSAGE"
+            WHERE "MESSAGE".sender_id = "USER".id AND "MESSAGE".is_deleted = false
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("USER", "message_count")
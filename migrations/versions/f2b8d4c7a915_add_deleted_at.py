@@ -0,0 +1,41 @@
+"""Add deleted_at to USER and MESSAGE for the purge of soft deleted rows
+
+Revision ID: f2b8d4c7a915
+Revises: c4d9a2e6f1b3
+Create Date: 2026-10-18 15:02:26.730194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b8d4c7a915"
+down_revision: Union[str, None] = "c4d9a2e6f1b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("USER", "MESSAGE")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("deleted_at", sa.DateTime(), nullable=True))
+        # Rows deleted before the column existed start their retention window now
+        op.execute(f"UPDATE \"{table}\" SET deleted_at = (now() AT TIME ZONE 'utc') WHERE is_deleted = true")
+        # Not CONCURRENTLY: MESSAGE is partitioned, and a partitioned table's index can't be built concurrently
+        op.create_index(
+            f"ix_{table}_deleted_at_deleted",
+            table,
+            ["deleted_at"],
+            unique=False,
+            postgresql_where=sa.text("is_deleted = true"),
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_deleted_at_deleted", table_name=table)
+        op.drop_column(table, "deleted_at")
@@ -0,0 +1,34 @@
+import secrets
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from src.api.schema.internal_schema import PoolStatusResponse
+from src.config import database, settings, user_cache, user_profile_cache
+
+
+# Dependency guarding the operational endpoints, which are disabled unless a token is configured
+async def require_internal_token(x_internal_token: Optional[str] = Header(None)) -> None:
+    if settings.internal_api_token is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_internal_token is None or not secrets.compare_digest(x_internal_token, settings.internal_api_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal token")
+
+
+# FastAPI Router for operational endpoints, not meant to be exposed publicly
+internal_router = APIRouter(prefix="", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+
+# GET: Connection pool occupancy and checkout wait times, of the primary and of each read replica
+@internal_router.get("/pool", response_model=List[PoolStatusResponse])
+async def get_pool_status():
+    return [PoolStatusResponse(**monitor.status()) for monitor in database.pool_monitors]
+
+
+# GET: Hit/miss statistics of the user caches
+@internal_router.get("/cache")
+async def get_cache_stats():
+    return {
+        name: cache.stats() if cache is not None else None
+        for name, cache in (("user_cache", user_cache), ("user_profile_cache", user_profile_cache))
+    }
@@ -1,33 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from datetime import datetime, timezone
 from uuid import UUID
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.schema.message_schema import MessageRequestBody, PaginatedMessageResponse
+from src.api.schema.message_schema import (
+    MessageBatchError,
+    MessageBatchRequestBody,
+    MessageBatchResponse,
+    MessageRequestBody,
+    MessageSearchResponse,
+    PaginatedMessageResponse,
+)
 from src.infrastructure.repositories.message import MessageRepository
 from src.infrastructure.repositories.user import UserRepository
 from src.infrastructure.services.message_service import MessageService
+from src.infrastructure.unit_of_work import UnitOfWork
+from src.infrastructure.write_behind import MessageWriteBehindQueue
 from src.domain.models import Message
 from src.domain.exceptions.user import UserNotFoundException
-from src.domain.exceptions.message import MessageNotFoundException
-from src.config import get_session
+from src.domain.exceptions.message import MessageNotFoundException, MessageQueueFullException
+from src.domain.exceptions.pagination import InvalidCursorException
+from src.config import database, get_message_write_behind, get_read_session, get_session, user_cache
+from src.infrastructure.database.routing import is_pinned_to_primary
 
 message_router = APIRouter(prefix="", tags=["messages"])
 
 
-async def get_message_service(session: AsyncSession = Depends(get_session)) -> MessageService:
-    return MessageService(user_repository=UserRepository(session), message_repository=MessageRepository(session))
+async def get_message_service(
+    session: AsyncSession = Depends(get_session),
+    write_behind: Optional[MessageWriteBehindQueue] = Depends(get_message_write_behind),
+) -> MessageService:
+    return MessageService(
+        user_repository=UserRepository(session),
+        message_repository=MessageRepository(session),
+        unit_of_work=UnitOfWork(session),
+        user_cache=user_cache,
+        write_behind=write_behind,
+    )
 
 
-# POST: Create a new message
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # created_at is stored as naive UTC; offset-aware bounds are converted to it rather than passed on as is
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def get_message_read_service(session: AsyncSession = Depends(get_read_session)) -> MessageService:
+    return MessageService(
+        user_repository=UserRepository(session),
+        message_repository=MessageRepository(session),
+        unit_of_work=UnitOfWork(session),
+        user_cache=user_cache,
+    )
+
+
+# POST: Create a new message; in write-behind mode it is only queued (202) and committed shortly after
 @message_router.post("/", response_model=Message, status_code=status.HTTP_201_CREATED)
 async def create_message(message: MessageRequestBody, service: MessageService = Depends(get_message_service)):
     try:
         created_message = await service.create_message(Message(**message.dict()))
-        return created_message
     except UserNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except MessageQueueFullException as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers={"Retry-After": "1"})
+
+    if service.write_behind is not None:
+        return ORJSONResponse(created_message.model_dump(), status_code=status.HTTP_202_ACCEPTED)
+    return created_message
+
+
+# POST: Create a batch of messages, reporting the ones that couldn't be created
+@message_router.post("/batch", response_model=MessageBatchResponse)
+async def create_messages(batch: MessageBatchRequestBody, service: MessageService = Depends(get_message_service)):
+    created_messages, errors = await service.create_messages([Message(**message.dict()) for message in batch.messages])
+    return MessageBatchResponse(
+        created=created_messages,
+        errors=[MessageBatchError(index=index, detail=detail) for index, detail in errors],
+    )
 
 
 # GET: Get messages sent by a particular user
@@ -36,10 +89,84 @@ async def get_messages_by_sender_id(
     sender_id: UUID,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
-    service: MessageService = Depends(get_message_service),
+    cursor: Optional[str] = None,
+    include_count: bool = True,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    service: MessageService = Depends(get_message_read_service),
+):
+    try:
+        total_count, messages, next_cursor = await service.get_mesages_by_sender_id(
+            sender_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_count=include_count,
+            created_after=_naive_utc(created_after),
+            created_before=_naive_utc(created_before),
+        )
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Returning the response directly skips revalidating every row against response_model, which only documents it
+    return ORJSONResponse(
+        {
+            "count": total_count,
+            "messages": [{"id": row.id, "sender_id": row.sender_id, "content": row.content} for row in messages],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+# GET: Full-text search of messages, best matches first, optionally sent by a particular user
+@message_router.get("/search", response_model=MessageSearchResponse)
+async def search_messages(
+    q: str = Query(min_length=1),
+    sender_id: Optional[UUID] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    service: MessageService = Depends(get_message_read_service),
+):
+    try:
+        results, next_cursor = await service.search_messages(q, sender_id=sender_id, limit=limit, cursor=cursor)
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return ORJSONResponse(
+        {
+            "messages": [
+                {"id": row.id, "sender_id": row.sender_id, "content": row.content, "rank": row.rank} for row in results
+            ],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+# GET: Stream all messages sent by a particular user as NDJSON
+@message_router.get("/sender/{sender_id}/stream")
+async def stream_messages_by_sender_id(
+    sender_id: UUID,
+    request: Request,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
 ):
-    total_count, messages = await service.get_mesages_by_sender_id(sender_id, limit=limit, offset=offset)
-    return PaginatedMessageResponse(count=total_count, messages=messages)
+    session_factory = database.read_session_router.session_factory(is_pinned_to_primary(request))
+    created_after, created_before = _naive_utc(created_after), _naive_utc(created_before)
+
+    async def ndjson_lines():
+        # The session has to outlive the endpoint, so it's opened by the generator instead of get_read_session
+        async with session_factory() as session:
+            service = MessageService(
+                user_repository=UserRepository(session),
+                message_repository=MessageRepository(session),
+                unit_of_work=UnitOfWork(session),
+            )
+            async for message in service.stream_messages_by_sender_id(
+                sender_id, created_after=created_after, created_before=created_before
+            ):
+                yield message.model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
 
 # DELETE: Soft delete a message by its ID
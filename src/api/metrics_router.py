@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.config import database, message_write_behind, purge_metrics, query_metrics
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# FastAPI Router for the Prometheus scrape endpoint
+metrics_router = APIRouter(prefix="", tags=["metrics"])
+
+
+def _pool_gauges() -> str:
+    statuses = [monitor.status() for monitor in database.pool_monitors]
+    lines = []
+    for name in ("checked_out", "checked_in", "overflow"):
+        values = [(status["name"], status[name]) for status in statuses if status[name] is not None]
+        if values:
+            lines.append(f"# TYPE db_pool_{name} gauge")
+            lines += [f'db_pool_{name}{{pool="{pool}"}} {value}' for pool, value in values]
+    lines.append("# TYPE db_pool_checkouts_total counter")
+    lines += [f'db_pool_checkouts_total{{pool="{status["name"]}"}} {status["checkouts"]}' for status in statuses]
+    lines.append("# TYPE db_pool_checkout_wait_max_seconds gauge")
+    lines += [
+        f'db_pool_checkout_wait_max_seconds{{pool="{status["name"]}"}} {status["checkout_wait_max_ms"] / 1000}'
+        for status in statuses
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# GET: Statement, request, pool, purge and message queue metrics in the Prometheus text format
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    rendered = query_metrics.render() + _pool_gauges() + purge_metrics.render()
+    if message_write_behind is not None:
+        rendered += message_write_behind.metrics.render()
+    return PlainTextResponse(rendered, media_type=PROMETHEUS_CONTENT_TYPE)
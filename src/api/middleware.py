@@ -0,0 +1,217 @@
+import base64
+import hashlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.infrastructure.cache import CacheBackend, idempotency_key
+from src.infrastructure.database.instrumentation import QueryMetrics, QueryStats, track_queries
+from src.infrastructure.database.routing import pin_to_primary, track_writes
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+# Headers describing the original exchange rather than the resource, left out of replayed responses
+UNREPLAYED_HEADERS = {b"content-length", b"server-timing", b"set-cookie"}
+
+
+def server_timing(stats: QueryStats) -> str:
+    """Server-Timing header value reporting the request's database time and its slowest statement."""
+    return (
+        f'db;dur={stats.total_seconds * 1000:.2f};desc="{stats.statements} statements", '
+        f'db-slowest;dur={stats.slowest_seconds * 1000:.2f};desc="{stats.slowest_operation or "none"}"'
+    )
+
+
+class QueryTimingMiddleware:
+    """
+    Tracks the SQL statements issued while serving each request: reports them in a Server-Timing header
+    and adds them to the per-route metrics.
+
+    Written as a plain ASGI middleware so the endpoint runs in the same context as the tracking.
+    Statements issued once the response has started, e.g. by streamed bodies, only reach the metrics.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: QueryMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_server_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing(stats))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_server_timing)
+            finally:
+                # Routing stores the matched route in the scope; keep unmatched paths out of the labels
+                route = scope.get("route")
+                self.metrics.record_request(getattr(route, "path", "unmatched"), stats)
+
+
+class PrimaryPinMiddleware:
+    """
+    Pins the clients whose request committed a write to the primary for `read_your_writes_seconds`, with a
+    cookie, so their next reads don't hit a lagging replica.
+
+    Writes are recorded where they commit rather than where sessions are opened, so failed requests don't pin,
+    and the cookie is added to whatever response the endpoint returns.
+    """
+
+    def __init__(self, app: ASGIApp, settings):
+        self.app = app
+        # Read on every request, so the delay can be changed at runtime
+        self.settings = settings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        seconds = self.settings.read_your_writes_seconds if scope["type"] == "http" else 0
+        if seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        with track_writes() as writes:
+
+            async def send_with_pin(message: Message) -> None:
+                if message["type"] == "http.response.start" and writes.recorded:
+                    pin = Response()
+                    pin_to_primary(pin, seconds)
+                    MutableHeaders(scope=message).append("set-cookie", pin.headers["set-cookie"])
+                await send(message)
+
+            await self.app(scope, receive, send_with_pin)
+
+
+class IdempotencyMiddleware:
+    """
+    Makes POST requests to `paths` safe to retry: the first successful response to a request carrying an
+    `Idempotency-Key` header is stored for `ttl` seconds, and a retry with the same key gets it back, marked by an
+    `Idempotent-Replayed` header, without reaching the endpoint or opening a database session.
+
+    The key is reserved in the store, atomically, before the endpoint runs. A retry arriving meanwhile, in any
+    worker sharing the store, is rejected (409) instead of running it twice. The reservation expires after
+    `reservation_ttl` seconds, in case its worker died. Only 2xx responses are stored; otherwise the reservation
+    is released, so a failed request can be retried for real. A key reused with another body is rejected (422).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Optional[CacheBackend],
+        paths: Iterable[str],
+        ttl: Optional[float] = None,
+        reservation_ttl: float = 60,
+    ):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.ttl = ttl
+        self.reservation_ttl = reservation_ttl
+        self.replays = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        client_key = Headers(scope=scope).get("idempotency-key") if scope["type"] == "http" else None
+        if self.store is None or client_key is None or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(client_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+            detail = f"Idempotency-Key must have 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters."
+            await JSONResponse({"detail": detail}, status_code=400)(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = idempotency_key(scope["method"], scope["path"], client_key)
+
+        stored = await self.store.get(key)
+        if stored is None and await self.store.add(key, {"fingerprint": fingerprint}, ttl=self.reservation_ttl):
+            await self._run(key, fingerprint, scope, self._receive_body(body, receive), send)
+            return
+        # Taken by another request since the lookup, or reserved and released in between
+        stored = stored or await self.store.get(key) or {"fingerprint": fingerprint}
+
+        if stored["fingerprint"] != fingerprint:
+            detail = "Idempotency-Key was already used with another request body."
+            await JSONResponse({"detail": detail}, status_code=422)(scope, receive, send)
+        elif "status" not in stored:
+            detail = "A request with this Idempotency-Key is still being processed."
+            await JSONResponse({"detail": detail}, status_code=409)(scope, receive, send)
+        else:
+            self.replays += 1
+            await self._replay(stored, send)
+
+    async def _run(self, key: str, fingerprint: str, scope: Scope, receive: Receive, send: Send) -> None:
+        stored = False
+        start: Optional[Message] = None
+        chunks = []
+
+        async def send_and_store(message: Message) -> None:
+            nonlocal start, stored
+            if message["type"] == "http.response.start":
+                # Copied before outer middlewares add their own headers to the message
+                start = {**message, "headers": list(message.get("headers", []))}
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                # Stored before the response completes, so a client retrying once answered is replayed
+                if not message.get("more_body", False) and 200 <= start["status"] < 300:
+                    await self.store.set(key, self._response(fingerprint, start, b"".join(chunks)), ttl=self.ttl)
+                    stored = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_store)
+        finally:
+            if not stored:
+                await self.store.delete(key)
+
+    @staticmethod
+    def _response(fingerprint: str, start: Message, body: bytes) -> dict:
+        headers = [
+            [name.decode("latin-1"), value.decode("latin-1")]
+            for name, value in start["headers"]
+            if name.lower() not in UNREPLAYED_HEADERS
+        ]
+        return {
+            "fingerprint": fingerprint,
+            "status": start["status"],
+            "headers": headers,
+            "body": base64.b64encode(body).decode(),
+        }
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _receive_body(body: bytes, receive: Receive) -> Receive:
+        """The request's `receive`, with the body already read handed back to the endpoint first."""
+        sent = False
+
+        async def receive_body() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return receive_body
+
+    @staticmethod
+    async def _replay(stored: dict, send: Send) -> None:
+        body = base64.b64decode(stored["body"])
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored["headers"]]
+        headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,15 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PoolStatusResponse(BaseModel):
+    name: str
+    pool_class: str
+    size: Optional[int]
+    checked_in: Optional[int]
+    checked_out: Optional[int]
+    overflow: Optional[int]
+    checkouts: int
+    checkout_wait_avg_ms: float
+    checkout_wait_max_ms: float
@@ -1,7 +1,7 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from src.domain.models import Message
 
@@ -11,6 +11,33 @@ class MessageRequestBody(BaseModel):
     content: str
 
 
+class MessageBatchRequestBody(BaseModel):
+    messages: List[MessageRequestBody] = Field(min_length=1, max_length=1000)
+
+
+class MessageBatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class MessageBatchResponse(BaseModel):
+    created: List[Message]
+    errors: List[MessageBatchError]
+
+
 class PaginatedMessageResponse(BaseModel):
-    count: int
+    count: Optional[int] = None
     messages: List[Message]
+    next_cursor: Optional[str] = None
+
+
+class MessageSearchResult(BaseModel):
+    id: UUID
+    sender_id: UUID
+    content: str
+    rank: float
+
+
+class MessageSearchResponse(BaseModel):
+    messages: List[MessageSearchResult]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,33 @@
-from pydantic import BaseModel, EmailStr
+from typing import List
+from uuid import UUID
+
+from pydantic import BaseModel, EmailStr, Field
+
+from src.domain.models import User
+
+# Keys a single batch lookup accepts
+MAX_BATCH_LOOKUP = 1000
 
 
 class UserRequestBody(BaseModel):
     name: str
     email: EmailStr
+
+
+class UserDeletionProgressResponse(BaseModel):
+    remaining_messages: int
+    completed: bool
+
+
+class UserEmailsRequestBody(BaseModel):
+    emails: List[str] = Field(min_length=1, max_length=MAX_BATCH_LOOKUP)
+
+
+class UsersByIdsResponse(BaseModel):
+    users: List[User]
+    missing: List[UUID]
+
+
+class UsersByEmailsResponse(BaseModel):
+    users: List[User]
+    missing: List[str]
@@ -1,16 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response, status
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.schema.user_schema import UserRequestBody
+from src.api.schema.user_schema import (
+    MAX_BATCH_LOOKUP,
+    UserDeletionProgressResponse,
+    UserEmailsRequestBody,
+    UserRequestBody,
+    UsersByEmailsResponse,
+    UsersByIdsResponse,
+)
 from src.infrastructure.services.user_service import UserService
 from src.infrastructure.repositories.user import UserRepository
 from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.unit_of_work import UnitOfWork
 from src.domain.models import User
 from src.domain.exceptions.user import UserAlreadyExistsException, UserNotFoundException
-from src.config import get_session
+from src.config import (
+    database,
+    get_read_session,
+    get_session,
+    settings,
+    user_cache,
+    user_profile_cache,
+)
 
 # FastAPI Router for user operations
 user_router = APIRouter(prefix="", tags=["users"])
@@ -18,7 +35,39 @@ user_router = APIRouter(prefix="", tags=["users"])
 
 # Dependency injection for UserService
 async def get_user_service(session: AsyncSession = Depends(get_session)) -> UserService:
-    return UserService(user_repository=UserRepository(session), message_repository=MessageRepository(session))
+    return UserService(
+        user_repository=UserRepository(session),
+        message_repository=MessageRepository(session),
+        unit_of_work=UnitOfWork(session),
+        user_cache=user_cache,
+        profile_cache=user_profile_cache,
+    )
+
+
+# Dependency injection for UserService on a read replica, for read-only endpoints
+async def get_user_read_service(session: AsyncSession = Depends(get_read_session)) -> UserService:
+    return UserService(
+        user_repository=UserRepository(session),
+        message_repository=MessageRepository(session),
+        unit_of_work=UnitOfWork(session),
+        user_cache=user_cache,
+        profile_cache=user_profile_cache,
+        # Cached profiles come from the primary only: a lagging replica could re-cache one an update invalidated
+        fill_profile_cache=session.bind is database.engine,
+    )
+
+
+def _user_etag(user: User) -> str:
+    """Strong ETag that changes whenever the user is updated."""
+    digest = hashlib.blake2b(f"{user.id}:{user.updated_at.isoformat()}".encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
 
 
 # POST: Create a new user
@@ -31,12 +80,41 @@ async def create_user(user: UserRequestBody, service: UserService = Depends(get_
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+# GET: Get a batch of users by their IDs (?ids=...&ids=...), reporting the ones not found
+@user_router.get("/", response_model=UsersByIdsResponse)
+async def get_users_by_ids(
+    ids: List[UUID] = Query(min_length=1, max_length=MAX_BATCH_LOOKUP),
+    service: UserService = Depends(get_user_read_service),
+):
+    users, missing = await service.get_users_by_ids(ids)
+    return UsersByIdsResponse(users=users, missing=missing)
+
+
+# POST: Get a batch of users by their emails, reporting the ones not found; a body fits more emails than a URL
+@user_router.post("/by-emails", response_model=UsersByEmailsResponse)
+async def get_users_by_emails(body: UserEmailsRequestBody, service: UserService = Depends(get_user_read_service)):
+    users, missing = await service.get_users_by_emails(body.emails)
+    return UsersByEmailsResponse(users=users, missing=missing)
+
+
 # GET: Get a user by their email
 @user_router.get("/email/{email}", response_model=Optional[User])
-async def get_user_by_email(email: str, service: UserService = Depends(get_user_service)):
+async def get_user_by_email(
+    email: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    service: UserService = Depends(get_user_read_service),
+):
     user = await service.get_user_by_email(email)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    etag = _user_etag(user)
+    # The client's copy is current: answer without serializing the user
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
     return user
 
 
@@ -50,10 +128,40 @@ async def update_user(user_id: UUID, user: UserRequestBody, service: UserService
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-# DELETE: Soft delete a user by their ID
+async def _delete_user_messages(user_id: UUID):
+    # Runs after the response is sent, so it can't use the request's session. Lost on a restart: the purge
+    # worker or python -m src.commands.finish_user_deletions then deletes the messages left
+    async with database.async_session() as session:
+        service = UserService(
+            user_repository=UserRepository(session),
+            message_repository=MessageRepository(session),
+            unit_of_work=UnitOfWork(session),
+        )
+        await service.delete_user_messages(user_id, batch_size=settings.user_delete_batch_size)
+
+
+# DELETE: Soft delete a user by their ID; messages of prolific users are deleted in the background (202)
 @user_router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: UUID, service: UserService = Depends(get_user_service)):
+async def delete_user(
+    user_id: UUID, background_tasks: BackgroundTasks, service: UserService = Depends(get_user_service)
+):
+    try:
+        messages_deleted = await service.delete_user(
+            user_id, inline_limit=settings.user_delete_inline_limit, batch_size=settings.user_delete_batch_size
+        )
+    except UserNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    if not messages_deleted:
+        background_tasks.add_task(_delete_user_messages, user_id)
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+# GET: Progress of the deletion of a user's messages
+@user_router.get("/{user_id}/deletion", response_model=UserDeletionProgressResponse)
+async def get_user_deletion_progress(user_id: UUID, service: UserService = Depends(get_user_read_service)):
     try:
-        await service.delete_user(user_id)
+        remaining_messages = await service.get_remaining_messages(user_id)
     except UserNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return UserDeletionProgressResponse(remaining_messages=remaining_messages, completed=remaining_messages == 0)
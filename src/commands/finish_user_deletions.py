@@ -0,0 +1,37 @@
+"""
+Deletes the messages left active by deleted users, e.g. when the server restarted during the background deletion
+that follows a DELETE /users/{user_id} answered with 202. The purge worker does the same at the start of each pass.
+
+    python -m src.commands.finish_user_deletions --batch-size 5000 --throttle-ratio 1
+"""
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+
+from src.config import database, settings
+from src.infrastructure.purge import PurgeWorker
+
+logger = logging.getLogger(__name__)
+
+
+async def finish_user_deletions(batch_size: int, throttle_ratio: float) -> int:
+    async with database:
+        worker = PurgeWorker(
+            database.async_session,
+            retention=timedelta(days=settings.purge_retention_days),
+            batch_size=batch_size,
+            throttle_ratio=throttle_ratio,
+        )
+        return await worker.finish_user_deletions()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.user_delete_batch_size)
+    parser.add_argument("--throttle-ratio", type=float, default=settings.purge_throttle_ratio)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    deleted = asyncio.run(finish_user_deletions(args.batch_size, args.throttle_ratio))
+    logger.info(f"Deleted {deleted} messages of deleted users.")
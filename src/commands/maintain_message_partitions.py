@@ -0,0 +1,70 @@
+"""
+Keeps the monthly MESSAGE partitions ahead of time and detaches the ones past retention (PostgreSQL only).
+
+Creates the partitions of the current month and the next --months-ahead ones, then detaches the partitions
+older than --detach-older-than-months. Detached partitions remain as standalone tables, to be archived or
+dropped separately: their active messages are taken off their senders' message counters and their foreign key
+to USER is dropped, so the purge can remove the senders. A detached partition left unreleased by an interrupted
+run is released by the next one. Meant to run daily, e.g. from cron.
+
+    python -m src.commands.maintain_message_partitions --months-ahead 3 --detach-older-than-months 12
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date
+from typing import List, Optional, Tuple
+
+from src.config import database
+from src.infrastructure.database.partitions import (
+    create_partition,
+    detach_partition,
+    list_partitions,
+    list_unreleased_partitions,
+    months_to_create,
+    partition_name,
+    partitions_to_detach,
+    release_partition,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def maintain_message_partitions(
+    months_ahead: int, detach_older_than_months: Optional[int], today: date = None
+) -> Tuple[List[str], List[str]]:
+    """Returns the names of the created and of the detached partitions."""
+    today = today or date.today()
+    async with database:
+        async with database.engine.begin() as conn:
+            existing = set(await list_partitions(conn))
+            created = []
+            for month in months_to_create(today, months_ahead):
+                if partition_name(month) not in existing:
+                    await create_partition(conn, month)
+                    created.append(partition_name(month))
+
+        detached = []
+        if detach_older_than_months is not None:
+            for name in partitions_to_detach(existing, today, detach_older_than_months):
+                # Each detach in its own short transaction, so MESSAGE is only locked for one at a time
+                await detach_partition(database.engine, name)
+                detached.append(name)
+
+        async with database.engine.connect() as conn:
+            unreleased = await list_unreleased_partitions(conn)
+        for name in unreleased:
+            released = await release_partition(database.engine, name)
+            logger.info(f"Took {released} messages of {name} off their senders' counters.")
+    return created, detached
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--detach-older-than-months", type=int, help="Keep every partition if omitted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    created, detached = asyncio.run(maintain_message_partitions(args.months_ahead, args.detach_older_than_months))
+    logger.info(f"Created partitions: {created or 'none'}. Detached partitions: {detached or 'none'}.")
@@ -0,0 +1,55 @@
+"""
+Hard deletes the USER and MESSAGE rows soft deleted longer ago than the retention window.
+
+Runs a single pass by default, e.g. from cron; --forever keeps purging every --interval-seconds.
+Several instances can run at once: each skips the rows another one has locked.
+
+    python -m src.commands.purge_deleted_rows --retention-days 30 --batch-size 1000 --throttle-ratio 1
+"""
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Dict
+
+from src.config import database, purge_metrics, settings
+from src.infrastructure.purge import PurgeWorker
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_deleted_rows(
+    retention_days: float, batch_size: int, throttle_ratio: float, interval_seconds: float = None
+) -> Dict[str, int]:
+    async with database:
+        worker = PurgeWorker(
+            database.async_session,
+            retention=timedelta(days=retention_days),
+            batch_size=batch_size,
+            throttle_ratio=throttle_ratio,
+            metrics=purge_metrics,
+        )
+        if interval_seconds is not None:
+            await worker.run_forever(interval_seconds)
+        return await worker.run_once()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-days", type=float, default=settings.purge_retention_days)
+    parser.add_argument("--batch-size", type=int, default=settings.purge_batch_size)
+    parser.add_argument("--throttle-ratio", type=float, default=settings.purge_throttle_ratio)
+    parser.add_argument("--forever", action="store_true")
+    parser.add_argument("--interval-seconds", type=float, default=settings.purge_interval_seconds)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    purged = asyncio.run(
+        purge_deleted_rows(
+            args.retention_days,
+            args.batch_size,
+            args.throttle_ratio,
+            interval_seconds=args.interval_seconds if args.forever else None,
+        )
+    )
+    logger.info(f"Purged soft deleted rows: {purged}")
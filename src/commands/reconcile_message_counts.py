@@ -0,0 +1,39 @@
+"""
+Rebuilds every user's message counter from the MESSAGE table.
+
+    python -m src.commands.reconcile_message_counts --batch-size 1000
+"""
+import argparse
+import asyncio
+import logging
+
+from src.config import database
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_message_counts(batch_size: int) -> int:
+    rebuilt = 0
+    last_id = None
+    async with database, database.async_session() as session:
+        repository = MessageRepository(session)
+        while True:
+            # One short transaction per batch keeps the user rows locked briefly
+            async with UnitOfWork(session):
+                user_ids = await repository.rebuild_sender_counts_batch(last_id, batch_size)
+            if not user_ids:
+                return rebuilt
+            rebuilt += len(user_ids)
+            last_id = user_ids[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rebuilt = asyncio.run(reconcile_message_counts(args.batch_size))
+    logger.info(f"Rebuilt message counters of {rebuilt} users.")
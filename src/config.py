@@ -1,7 +1,20 @@
+import os
+import time
+from typing import List, Optional
+
+from fastapi import Request
 from pydantic_settings import BaseSettings
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from src.infrastructure.cache import CacheBackend, DatabaseCache, InMemoryCache, RedisCache
+from src.infrastructure.database.instrumentation import QueryMetrics, instrument_engine
+from src.infrastructure.database.pool import PoolMonitor
+from src.infrastructure.database.routing import ReadSessionRouter, is_pinned_to_primary
+from src.infrastructure.purge import PurgeMetrics
+from src.infrastructure.write_behind import MessageWriteBehindQueue
+
 
 class Settings(BaseSettings):
     database_url: str
@@ -9,21 +22,263 @@ class Settings(BaseSettings):
     postgres_password: str
     postgres_db: str
 
+    # Read replicas, as a JSON list of URLs; reads fall back to the primary when empty
+    database_replica_urls: List[str] = []
+    # How long a client's reads stay on the primary after it writes; 0 disables the pinning
+    read_your_writes_seconds: float = 0
+
+    # Engine and connection pool
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = False
+    # asyncpg only
+    db_statement_cache_size: int = 100
+    db_prepared_statement_cache_size: int = 100
+
+    # Cache of existing user ids used to validate message senders: "memory", "redis" or "none". Unset, it's
+    # "redis" if REDIS_URL is set, "memory" with a single server worker, and "none" otherwise: a process-local
+    # cache would keep accepting messages from a user deleted through another worker until its entry expires
+    user_cache_backend: Optional[str] = None
+    user_cache_max_size: int = 10000
+    user_cache_ttl_seconds: float = 60
+    redis_url: Optional[str] = None
+    # Server-side cache of user-by-email lookups, on the same backend; disabled by default
+    user_profile_cache_enabled: bool = False
+    user_profile_cache_ttl_seconds: float = 300
+
+    # Deleting a user soft deletes their messages this many per transaction,
+    # in the background when they have more than the inline limit
+    user_delete_batch_size: int = 5000
+    user_delete_inline_limit: int = 10000
+
+    # Purge of soft deleted rows past retention, run by every server process when enabled
+    # (or with python -m src.commands.purge_deleted_rows)
+    purge_enabled: bool = False
+    purge_retention_days: float = 30
+    purge_batch_size: int = 1000
+    # Sleep this many times each batch's duration between batches
+    purge_throttle_ratio: float = 1.0
+    purge_interval_seconds: float = 3600
+
+    # Write-behind ingest: POST /messages/ queues messages (202) for a background flusher to group-commit.
+    # Queued messages are lost if the process crashes before their batch commits
+    message_write_behind_enabled: bool = False
+    message_write_behind_max_queue: int = 10000
+    message_write_behind_batch_size: int = 500
+    message_write_behind_flush_seconds: float = 0.05
+
+    # Responses stored for the Idempotency-Key of POST /users/ and POST /messages/: "memory" (per process),
+    # "database" (the CACHE_ENTRY table, shared by all workers), "redis" or "none"
+    idempotency_backend: str = "memory"
+    idempotency_max_keys: int = 100000
+    idempotency_ttl_seconds: float = 86400
+
+    # Token the /internal endpoints require in the X-Internal-Token header; they answer 404 while it's unset
+    internal_api_token: Optional[str] = None
+
+    # Production server (python -m src.server); every worker has its own pools of db_pool_size connections
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    # Defaults to one worker per core
+    server_workers: Optional[int] = None
+    # "auto" picks uvloop and httptools when they are installed
+    server_loop: str = "auto"
+    server_http: str = "auto"
+    server_graceful_shutdown_seconds: float = 30
+
     class Config:
         env_file = ".env"
 
 
+def engine_options(settings: Settings) -> dict:
+    """Keyword arguments for create_async_engine derived from the settings."""
+    options = {"echo": settings.db_echo, "future": True}
+    drivername = make_url(settings.database_url).drivername
+
+    # SQLite (local runs and tests) keeps the pool its dialect picks with its default sizing: a NullPool for
+    # aiosqlite files with SQLAlchemy 2.0, a queue pool with later releases. The pool settings are for servers
+    if not drivername.startswith("sqlite"):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    if drivername == "postgresql+asyncpg":
+        options["connect_args"] = {
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+        }
+    return options
+
+
+def server_workers(settings: Settings) -> int:
+    """Worker processes started by python -m src.server."""
+    return settings.server_workers or os.cpu_count() or 1
+
+
+def user_cache_backend(settings: Settings) -> str:
+    if settings.user_cache_backend is not None:
+        return settings.user_cache_backend
+    if settings.redis_url is not None:
+        return "redis"
+    return "memory" if server_workers(settings) == 1 else "none"
+
+
+def create_cache(settings: Settings, ttl: float, prefix: str) -> Optional[CacheBackend]:
+    backend = user_cache_backend(settings)
+    if backend == "memory":
+        return InMemoryCache(max_size=settings.user_cache_max_size, ttl=ttl)
+    if backend == "redis":
+        return RedisCache.from_url(settings.redis_url, ttl=ttl, prefix=prefix)
+    return None
+
+
+def create_idempotency_store(settings: Settings, database: "Database") -> Optional[CacheBackend]:
+    ttl = settings.idempotency_ttl_seconds
+    if settings.idempotency_backend == "memory":
+        return InMemoryCache(max_size=settings.idempotency_max_keys, ttl=ttl)
+    if settings.idempotency_backend == "database":
+        return DatabaseCache(lambda: database.async_session(), ttl=ttl)
+    if settings.idempotency_backend == "redis":
+        return RedisCache.from_url(settings.redis_url, ttl=ttl, prefix="")
+    return None
+
+
+class Database:
+    """
+    Engines and sessionmakers of the primary and the read replicas.
+
+    Opened by the app's lifespan rather than at import time, so each worker process builds its own
+    connection pools after it's started, and closed on shutdown to return the connections gracefully.
+    """
+
+    def __init__(self, settings: Settings, metrics: QueryMetrics):
+        self.settings = settings
+        self.metrics = metrics
+        self._engines: Optional[List[AsyncEngine]] = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._opened("engine")[0]
+
+    @property
+    def replica_engines(self) -> List[AsyncEngine]:
+        return self._opened("replica_engines")[1:]
+
+    @property
+    def async_session(self) -> sessionmaker:
+        self._opened("async_session")
+        return self._async_session
+
+    @property
+    def read_session_router(self) -> ReadSessionRouter:
+        self._opened("read_session_router")
+        return self._read_session_router
+
+    @property
+    def pool_monitors(self) -> List[PoolMonitor]:
+        """One per engine: the primary's, then the replicas'."""
+        self._opened("pool_monitors")
+        return self._pool_monitors
+
+    def pool_monitor(self, engine: AsyncEngine) -> PoolMonitor:
+        return next(monitor for monitor in self.pool_monitors if monitor.engine is engine)
+
+    def open(self) -> None:
+        if self._engines is not None:
+            return
+        urls = [self.settings.database_url, *self.settings.database_replica_urls]
+        engines = [create_async_engine(url, **engine_options(self.settings)) for url in urls]
+        for engine in engines:
+            instrument_engine(engine, self.metrics)
+
+        sessionmakers = [sessionmaker(bind=e, class_=AsyncSession, expire_on_commit=False) for e in engines]
+        self._async_session = sessionmakers[0]
+        self._read_session_router = ReadSessionRouter(primary=sessionmakers[0], replicas=sessionmakers[1:])
+        self._pool_monitors = [
+            PoolMonitor(engine, name="primary" if i == 0 else f"replica-{i}") for i, engine in enumerate(engines)
+        ]
+        self._engines = engines
+
+    async def close(self) -> None:
+        """Disposes of every engine's pool; connections still checked out are closed once returned."""
+        if self._engines is None:
+            return
+        engines, self._engines = self._engines, None
+        for engine in engines:
+            await engine.dispose()
+
+    async def __aenter__(self) -> "Database":
+        self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def _opened(self, name: str) -> List[AsyncEngine]:
+        if self._engines is None:
+            raise RuntimeError(f"Database.{name} used before the database was opened by the app's lifespan.")
+        return self._engines
+
+
 settings = Settings()
 
-DATABASE_URL = settings.database_url
+# Statement counts and timings of every engine, served at /metrics
+query_metrics = QueryMetrics()
+
+database = Database(settings, query_metrics)
+
+# Progress of the purge worker, served at /metrics
+purge_metrics = PurgeMetrics()
+
+# Started and flushed by the app's lifespan, in each worker process
+message_write_behind = (
+    MessageWriteBehindQueue(
+        lambda: database.async_session(),
+        max_size=settings.message_write_behind_max_queue,
+        batch_size=settings.message_write_behind_batch_size,
+        flush_interval_seconds=settings.message_write_behind_flush_seconds,
+    )
+    if settings.message_write_behind_enabled
+    else None
+)
+
+# Shared by all requests of the process, or by all workers unless kept in memory
+idempotency_store = create_idempotency_store(settings, database)
 
-# Create the async engine using asyncpg
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+# Shared by all requests of the process
+user_cache = create_cache(settings, ttl=settings.user_cache_ttl_seconds, prefix="users:")
+user_profile_cache = (
+    create_cache(settings, ttl=settings.user_profile_cache_ttl_seconds, prefix="user-profiles:")
+    if settings.user_profile_cache_enabled
+    else None
+)
 
-# Create the sessionmaker for async operations
-async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+async def _checked_out(session: AsyncSession) -> AsyncSession:
+    """Checks the session's connection out eagerly, to record how long its engine's pool made us wait."""
+    started = time.perf_counter()
+    await session.connection()
+    database.pool_monitor(session.bind).record_checkout_wait(time.perf_counter() - started)
+    return session
 
 
 async def get_session() -> AsyncSession:
-    async with async_session() as session:
-        yield session
+    """Session on the primary, for requests that write; the ones committing a write pin their client to it."""
+    async with database.async_session() as session:
+        yield await _checked_out(session)
+
+
+def get_message_write_behind() -> Optional[MessageWriteBehindQueue]:
+    return message_write_behind
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """Session on a read replica, or on the primary if the client recently wrote."""
+    async with database.read_session_router.session_factory(is_pinned_to_primary(request))() as session:
+        yield await _checked_out(session)
@@ -4,3 +4,11 @@ class MessageNotFoundException(Exception):
     def __init__(self, message="Message doesn't exist"):
         self.message = message
         super().__init__(self.message)
+
+
+class MessageQueueFullException(Exception):
+    """Exception raised when the write-behind queue can't take another message"""
+
+    def __init__(self, message="Message queue is full"):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,6 @@
+class InvalidCursorException(Exception):
+    """Exception raised when a pagination cursor can't be decoded"""
+
+    def __init__(self, message="Invalid pagination cursor"):
+        self.message = message
+        super().__init__(self.message)
@@ -1,2 +1,2 @@
-from .message import Message
+from .message import Message, MessageRow, MessageSearchRow
 from .user import User
@@ -6,6 +6,8 @@ from uuid import UUID, uuid4
 
 
 class BaseModel(SQLModel):
-    id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
     is_deleted: bool = Field(default=False, exclude=True)
     created_at: Optional[datetime] = Field(default_factory=datetime.utcnow, exclude=True)
+    # Set by soft deletes; the purge worker hard deletes the record once the retention window has passed
+    deleted_at: Optional[datetime] = Field(default=None, exclude=True)
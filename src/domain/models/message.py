@@ -1,3 +1,7 @@
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import Index, column, false, true
 from sqlmodel import Field
 from uuid import UUID
 
@@ -5,7 +9,46 @@ from src.domain.models.base_model import BaseModel
 
 
 class Message(BaseModel, table=True):
+    # On PostgreSQL the migrations range-partition this table by month of created_at, see
+    # src/infrastructure/database/partitions.py; create_all (SQLite, tests) keeps it a plain table
     __tablename__ = "MESSAGE"
+    __table_args__ = (
+        # Serves the active-messages-by-sender queries, including keyset pagination on (created_at, id)
+        Index(
+            "ix_MESSAGE_sender_id_created_at_active",
+            "sender_id",
+            "created_at",
+            "id",
+            postgresql_where=column("is_deleted") == false(),
+            sqlite_where=column("is_deleted") == false(),
+        ),
+        # Finds the soft deleted messages past retention for the purge worker
+        Index(
+            "ix_MESSAGE_deleted_at_deleted",
+            "deleted_at",
+            postgresql_where=column("is_deleted") == true(),
+            sqlite_where=column("is_deleted") == true(),
+        ),
+    )
 
     sender_id: UUID = Field(foreign_key="USER.id")
     content: str
+
+
+class MessageRow(NamedTuple):
+    """Read-only projection of an active message, loaded without the ORM for list endpoints."""
+
+    id: UUID
+    sender_id: UUID
+    content: str
+    created_at: datetime
+
+
+class MessageSearchRow(NamedTuple):
+    """Active message matching a full-text search, with its relevance rank."""
+
+    id: UUID
+    sender_id: UUID
+    content: str
+    created_at: datetime
+    rank: float
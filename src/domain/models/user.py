@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index, column, func, true
 from sqlmodel import Field
 
 from src.domain.models.base_model import BaseModel
@@ -9,7 +10,20 @@ from src.domain.models.base_model import BaseModel
 class User(BaseModel, table=True):
 
     __tablename__ = "USER"
+    __table_args__ = (
+        # Emails are unique regardless of their casing, which is kept as entered; lookups go through lower(email)
+        Index("ix_USER_email_lower", func.lower(column("email")), unique=True),
+        # Finds the soft deleted users past retention for the purge worker
+        Index(
+            "ix_USER_deleted_at_deleted",
+            "deleted_at",
+            postgresql_where=column("is_deleted") == true(),
+            sqlite_where=column("is_deleted") == true(),
+        ),
+    )
 
     name: str
-    email: str = Field(sa_column_kwargs={"unique": True})
+    email: str
     updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    # Active messages sent by the user, maintained by MessageRepository
+    message_count: int = Field(default=0, exclude=True, sa_column_kwargs={"server_default": "0"})
@@ -0,0 +1,5 @@
+from .base import CacheBackend
+from .database import CacheEntry, DatabaseCache
+from .memory import InMemoryCache
+from .redis import RedisCache
+from .keys import idempotency_key, user_cached_email_key, user_email_key, user_exists_key
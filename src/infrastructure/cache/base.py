@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class CacheBackend(ABC):
+    """Small async key-value cache interface with per-entry TTL and hit/miss accounting."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None when the key is missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value; `ttl` overrides the backend's default time to live in seconds."""
+
+    @abstractmethod
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Stores a value only if the key is missing or expired, atomically; returns whether it was stored."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Removes the keys, ignoring missing ones."""
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _record(self, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
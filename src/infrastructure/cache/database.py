@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import JSON, Column, delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import Field, SQLModel
+
+from src.infrastructure.cache.base import CacheBackend
+
+
+class CacheEntry(SQLModel, table=True):
+    __tablename__ = "CACHE_ENTRY"
+
+    key: str = Field(primary_key=True, max_length=512)
+    value: Any = Field(sa_column=Column(JSON, nullable=False))
+    # Expired entries read as missing until a later `set` evicts them
+    expires_at: datetime = Field(index=True)
+
+
+class DatabaseCache(CacheBackend):
+    """
+    Cache shared by all workers without another server to run, stored in the CACHE_ENTRY table.
+    Values are stored as JSON. Every `eviction_interval` sets, up to `eviction_batch_size` expired entries are deleted.
+
+    Each call runs its own short transaction, independent of the request's.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        ttl: float = 60,
+        prefix: str = "",
+        eviction_interval: int = 100,
+        eviction_batch_size: int = 1000,
+    ):
+        super().__init__()
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.prefix = prefix
+        self.eviction_interval = eviction_interval
+        self.eviction_batch_size = eviction_batch_size
+        self.evictions = 0
+        self._sets = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        statement = select(CacheEntry.value).where(
+            CacheEntry.key == self.prefix + key, CacheEntry.expires_at > datetime.utcnow()
+        )
+        async with self.session_factory() as session:
+            value = (await session.execute(statement)).scalar_one_or_none()
+        return self._record(value)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        async with self.session_factory() as session:
+            statement = self._insert(session, key, value, ttl)
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[CacheEntry.key],
+                    set_={"value": statement.excluded.value, "expires_at": statement.excluded.expires_at},
+                )
+            )
+            await self._commit_set(session)
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        async with self.session_factory() as session:
+            statement = self._insert(session, key, value, ttl)
+            # Concurrent adds of a key serialize on its primary key: only one of them inserts or takes an expired row
+            result = await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[CacheEntry.key],
+                    set_={"value": statement.excluded.value, "expires_at": statement.excluded.expires_at},
+                    where=CacheEntry.__table__.c.expires_at <= datetime.utcnow(),
+                )
+            )
+            await self._commit_set(session)
+        return result.rowcount == 1
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        async with self.session_factory() as session:
+            await session.execute(delete(CacheEntry).where(CacheEntry.key.in_([self.prefix + key for key in keys])))
+            await session.commit()
+
+    def _insert(self, session: AsyncSession, key: str, value: Any, ttl: Optional[float]):
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl if ttl is None else ttl)
+        insert = postgresql_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+        return insert(CacheEntry).values(key=self.prefix + key, value=value, expires_at=expires_at)
+
+    async def _commit_set(self, session: AsyncSession) -> None:
+        self._sets += 1
+        if self._sets % self.eviction_interval == 0:
+            self.evictions += await self._evict_expired(session)
+        await session.commit()
+
+    async def _evict_expired(self, session: AsyncSession) -> int:
+        expired = (
+            select(CacheEntry.key)
+            .where(CacheEntry.expires_at <= datetime.utcnow())
+            .order_by(CacheEntry.expires_at)
+            .limit(self.eviction_batch_size)
+        )
+        result = await session.execute(delete(CacheEntry).where(CacheEntry.key.in_(expired)))
+        return result.rowcount
+
+    def stats(self) -> dict:
+        return {**super().stats(), "evictions": self.evictions}
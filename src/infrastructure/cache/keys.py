@@ -0,0 +1,21 @@
+from uuid import UUID
+
+
+def user_exists_key(user_id: UUID) -> str:
+    """Key marking a user id as belonging to an existing, non-deleted user."""
+    return f"user:exists:{user_id}"
+
+
+def user_email_key(email: str) -> str:
+    """Key of a cached user looked up by email; lookups are case-insensitive, so are the keys."""
+    return f"user:email:{email.lower()}"
+
+
+def user_cached_email_key(user_id: UUID) -> str:
+    """Key remembering under which email a user is cached, to invalidate it by id."""
+    return f"user:cached-email:{user_id}"
+
+
+def idempotency_key(method: str, path: str, key: str) -> str:
+    """Key of the response stored for a client's Idempotency-Key, scoped to the endpoint it was sent to."""
+    return f"idempotency:{method}:{path}:{key}"
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.infrastructure.cache.base import CacheBackend
+
+
+class InMemoryCache(CacheBackend):
+    """
+    Process-local TTL + LRU cache. Once `max_size` entries are stored, the least recently used one is evicted.
+
+    Entries aren't shared between workers, so invalidations only reach the process that made them.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return self._record(None)
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return self._record(None)
+
+        self._entries.move_to_end(key)
+        return self._record(value)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        # Atomic since nothing is awaited between the check and the write
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._entries), "max_size": self.max_size, "evictions": self.evictions}
@@ -0,0 +1,40 @@
+import json
+from typing import Any, Optional
+
+from src.infrastructure.cache.base import CacheBackend
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by all workers, stored in Redis or any server speaking its protocol.
+    Values are stored as JSON; size limits are left to the server's maxmemory policy.
+    """
+
+    def __init__(self, client, ttl: float = 60, prefix: str = "cache:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        # Optional dependency, only needed when this backend is configured
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), **kwargs)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return self._record(json.loads(raw) if raw is not None else None)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        await self.client.set(self.prefix + key, json.dumps(value), px=ttl_ms)
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        return bool(await self.client.set(self.prefix + key, json.dumps(value), px=ttl_ms, nx=True))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
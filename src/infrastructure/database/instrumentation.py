@@ -0,0 +1,179 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Upper bounds, in seconds, of the statement duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+UNTAGGED = "untagged"
+
+_trackers: ContextVar[Tuple["QueryStats", ...]] = ContextVar("query_trackers", default=())
+_operation: ContextVar[Optional[str]] = ContextVar("query_operation", default=None)
+
+
+class QueryStats:
+    """
+    SQL statements issued within a `track_queries` block, e.g. while serving one request.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.slowest_operation: Optional[str] = None
+
+    def record(self, statement: str, operation: str, seconds: float) -> None:
+        self.statements += 1
+        self.total_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+            self.slowest_operation = operation
+
+
+class QueryMetrics:
+    """
+    Process-wide statement counts and durations per repository method, and statement counts per route,
+    rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # operation -> [count, total seconds, count per bucket (+Inf last)]
+        self._operations: dict[str, list] = {}
+        # route -> [requests, statements, total seconds]
+        self._routes: dict[str, list] = {}
+
+    def record_statement(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._operations.setdefault(operation, [0, 0.0, [0] * (len(DURATION_BUCKETS) + 1)])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2][bisect_left(DURATION_BUCKETS, seconds)] += 1
+
+    def record_request(self, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            entry = self._routes.setdefault(route, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += stats.statements
+            entry[2] += stats.total_seconds
+
+    def render(self) -> str:
+        with self._lock:
+            operations = {
+                name: (count, total, list(buckets)) for name, (count, total, buckets) in self._operations.items()
+            }
+            routes = {name: tuple(values) for name, values in self._routes.items()}
+
+        lines = [
+            "# HELP db_statement_duration_seconds Duration of the SQL statements issued by each repository method.",
+            "# TYPE db_statement_duration_seconds histogram",
+        ]
+        for operation, (count, total, buckets) in sorted(operations.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(DURATION_BUCKETS + ("+Inf",), buckets):
+                cumulative += bucket_count
+                lines.append(
+                    f'db_statement_duration_seconds_bucket{{operation="{operation}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'db_statement_duration_seconds_sum{{operation="{operation}"}} {total}')
+            lines.append(f'db_statement_duration_seconds_count{{operation="{operation}"}} {count}')
+
+        for name, index, kind, help_text in (
+            ("http_requests_total", 0, "counter", "Requests served, per route."),
+            ("http_request_db_statements_total", 1, "counter", "SQL statements issued while serving requests."),
+            ("http_request_db_seconds_total", 2, "counter", "Time spent in the database while serving requests."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{route="{route}"}} {values[index]}' for route, values in sorted(routes.items())]
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Records the statements issued by the current task, and the tasks it starts, within the block.
+    Blocks can be nested: each one sees all the statements issued while it is open.
+    """
+    stats = QueryStats()
+    token = _trackers.set(_trackers.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _trackers.reset(token)
+
+
+@contextmanager
+def query_operation(name: str) -> Iterator[None]:
+    """Tags the statements issued within the block with `name`, unless an enclosing block already did."""
+    if _operation.get() is not None:
+        yield
+        return
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def tag_queries(name: str):
+    """Decorator tagging the statements issued by an async method or async generator with `name`."""
+
+    def decorator(method):
+        if inspect.isasyncgenfunction(method):
+
+            @functools.wraps(method)
+            async def tagged_generator(*args, **kwargs):
+                generator = method(*args, **kwargs)
+                try:
+                    while True:
+                        # Tagged step by step, the caller's code between items runs untagged
+                        with query_operation(name):
+                            try:
+                                item = await generator.__anext__()
+                            except StopAsyncIteration:
+                                return
+                        yield item
+                finally:
+                    await generator.aclose()
+
+            return tagged_generator
+
+        @functools.wraps(method)
+        async def tagged(*args, **kwargs):
+            with query_operation(name):
+                return await method(*args, **kwargs)
+
+        return tagged
+
+    return decorator
+
+
+def instrument_engine(engine: AsyncEngine, metrics: QueryMetrics) -> None:
+    """Times every statement run by the engine, feeding `metrics` and the open `track_queries` blocks."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started_at"].pop()
+        operation = _operation.get() or UNTAGGED
+        metrics.record_statement(operation, seconds)
+        for stats in _trackers.get():
+            stats.record(statement, operation, seconds)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute, drop its start time
+        if context.connection is not None and context.connection.info.get("query_started_at"):
+            context.connection.info["query_started_at"].pop()
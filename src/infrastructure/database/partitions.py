@@ -0,0 +1,204 @@
+"""
+Monthly range partitions of the MESSAGE table on PostgreSQL.
+
+Partitions are named "MESSAGE_pYYYYMM" and hold the messages created during that month (UTC).
+Rows outside every monthly partition land in "MESSAGE_default" until their partition is created.
+"""
+import asyncio
+import logging
+import re
+from datetime import date
+from typing import Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.domain.models import Message
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PARENT = "MESSAGE"
+DEFAULT_PARTITION = "MESSAGE_default"
+# SQLSTATE of a statement giving up on a lock after lock_timeout
+LOCK_NOT_AVAILABLE = "55P03"
+_PARTITION_NAME = re.compile(r"^MESSAGE_p(\d{4})(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """The month held by a monthly partition, or None for any other table (e.g. the default partition)."""
+    match = _PARTITION_NAME.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def months_to_create(today: date, months_ahead: int) -> List[date]:
+    """The current month and the following `months_ahead` ones."""
+    current = month_start(today)
+    return [add_months(current, i) for i in range(months_ahead + 1)]
+
+
+def partitions_to_detach(names: Iterable[str], today: date, retain_months: int) -> List[str]:
+    """Monthly partitions entirely older than the last `retain_months` months, oldest first."""
+    cutoff = add_months(month_start(today), -retain_months)
+    months = sorted((partition_month(name), name) for name in names if partition_month(name) is not None)
+    return [name for month, name in months if month < cutoff]
+
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(
+        text(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = :parent
+            """
+        ),
+        {"parent": PARENT},
+    )
+    return list(result.scalars())
+
+
+async def create_partition(conn: AsyncConnection, month: date) -> None:
+    """
+    Creates the partition of `month`. Rows of that month already caught by the default partition are moved
+    into it in the same transaction, as PostgreSQL refuses to create a partition overlapping them.
+    """
+    name, start, end = partition_name(month), month, add_months(month, 1)
+    bounds = {"start": start, "end": end}
+    in_range = "created_at >= :start AND created_at < :end"
+
+    stranded = (
+        await conn.execute(text(f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE {in_range})'), bounds)
+    ).scalar_one()
+    if stranded:
+        await conn.execute(text(f'ALTER TABLE "{PARENT}" DETACH PARTITION "{DEFAULT_PARTITION}"'))
+
+    await conn.execute(
+        text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{PARENT}" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+    if stranded:
+        # Named columns, as generated ones (content_tsv) can't be inserted into
+        columns = ", ".join(Message.__table__.columns.keys())
+        await conn.execute(
+            text(f'INSERT INTO "{PARENT}" ({columns}) SELECT {columns} FROM "{DEFAULT_PARTITION}" WHERE {in_range}'),
+            bounds,
+        )
+        await conn.execute(text(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE {in_range}'), bounds)
+        await conn.execute(text(f'ALTER TABLE "{PARENT}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT'))
+
+
+async def list_unreleased_partitions(conn: AsyncConnection) -> List[str]:
+    """Detached monthly partitions not released yet, i.e. still holding a foreign key to USER."""
+    result = await conn.execute(
+        text(
+            """
+            SELECT DISTINCT child.relname FROM pg_class child
+            JOIN pg_constraint ON pg_constraint.conrelid = child.oid AND pg_constraint.contype = 'f'
+            WHERE child.relkind = 'r' AND NOT child.relispartition
+            """
+        )
+    )
+    return sorted(name for name in result.scalars() if partition_month(name) is not None)
+
+
+async def detach_partition(
+    engine: AsyncEngine, name: str, lock_timeout_ms: int = 2000, attempts: int = 5, retry_backoff_seconds: float = 1
+) -> None:
+    """
+    Detaches a partition; it stays around as a standalone table, to be released with `release_partition`.
+
+    DETACH ... CONCURRENTLY is refused while MESSAGE has a default partition, so the partition is detached in
+    a plain transaction. That takes an ACCESS EXCLUSIVE lock on MESSAGE, which queues every later query behind
+    it while it waits for the running ones: waiting is capped at `lock_timeout_ms`, then the detach backs off
+    and retries, up to `attempts` times. Once it has the lock, the detach only changes the catalog.
+    """
+
+    async def detach(conn: AsyncConnection) -> None:
+        await conn.execute(text(f'ALTER TABLE "{PARENT}" DETACH PARTITION "{name}"'))
+
+    await _with_lock_timeout(engine, detach, f"Detaching {name}", lock_timeout_ms, attempts, retry_backoff_seconds)
+
+
+async def release_partition(
+    engine: AsyncEngine, name: str, lock_timeout_ms: int = 2000, attempts: int = 5, retry_backoff_seconds: float = 1
+) -> int:
+    """
+    Takes the active messages of a detached partition off their senders' counters and drops the partition's
+    foreign key to USER, so its senders can be purged while the table waits to be archived. Both happen in one
+    transaction, retried like `detach_partition`: a partition without the foreign key has been released already.
+    Returns the number of messages taken off the counters.
+    """
+
+    async def release(conn: AsyncConnection) -> int:
+        foreign_keys = text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+        )
+        constraints = (await conn.execute(foreign_keys, {"table": f'"{name}"'})).scalars().all()
+        if not constraints:
+            return 0
+        # Senders locked in id order, like the counter updates of MessageRepository.bulk_create
+        result = await conn.execute(
+            text(
+                f"""
+                WITH detached AS (
+                    SELECT sender_id, count(*) AS count FROM "{name}" WHERE is_deleted = false GROUP BY sender_id
+                ), locked AS (
+                    SELECT "USER".id FROM "USER" JOIN detached ON detached.sender_id = "USER".id
+                    ORDER BY "USER".id FOR UPDATE OF "USER"
+                )
+                UPDATE "USER" SET message_count = "USER".message_count - detached.count
+                FROM detached JOIN locked ON locked.id = detached.sender_id
+                WHERE "USER".id = detached.sender_id
+                RETURNING detached.count
+                """
+            )
+        )
+        released = sum(result.scalars())
+        for constraint in constraints:
+            await conn.execute(text(f'ALTER TABLE "{name}" DROP CONSTRAINT "{constraint}"'))
+        return released
+
+    return await _with_lock_timeout(
+        engine, release, f"Releasing {name}", lock_timeout_ms, attempts, retry_backoff_seconds
+    )
+
+
+async def _with_lock_timeout(
+    engine: AsyncEngine,
+    work: Callable[[AsyncConnection], Awaitable[T]],
+    description: str,
+    lock_timeout_ms: int,
+    attempts: int,
+    retry_backoff_seconds: float,
+) -> T:
+    """Runs `work` in a transaction waiting at most `lock_timeout_ms` for each lock, retried with backoff."""
+    for attempt in range(1, attempts + 1):
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                return await work(conn)
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            logger.warning(f"{description} timed out waiting for a lock (attempt {attempt}/{attempts}).")
+            await asyncio.sleep(retry_backoff_seconds * 2 ** (attempt - 1))
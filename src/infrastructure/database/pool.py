@@ -0,0 +1,42 @@
+import threading
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class PoolMonitor:
+    """
+    Reports the occupancy of an engine's connection pool together with how long sessions waited to check out.
+    `name` tells the pools apart in reports, e.g. "primary" or "replica-1".
+    """
+
+    def __init__(self, engine: AsyncEngine, name: str = "primary"):
+        self.engine = engine
+        self.name = name
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def record_checkout_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._checkouts += 1
+            self._total_wait += seconds
+            self._max_wait = max(self._max_wait, seconds)
+
+    def status(self) -> dict:
+        pool = self.engine.pool
+        with self._lock:
+            checkouts, total_wait, max_wait = self._checkouts, self._total_wait, self._max_wait
+
+        return {
+            "name": self.name,
+            "pool_class": type(pool).__name__,
+            # Only queue-based pools are sized; the others report None
+            "size": getattr(pool, "size", lambda: None)(),
+            "checked_in": getattr(pool, "checkedin", lambda: None)(),
+            "checked_out": getattr(pool, "checkedout", lambda: None)(),
+            "overflow": getattr(pool, "overflow", lambda: None)(),
+            "checkouts": checkouts,
+            "checkout_wait_avg_ms": total_wait / checkouts * 1000 if checkouts else 0.0,
+            "checkout_wait_max_ms": max_wait * 1000,
+        }
@@ -0,0 +1,74 @@
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Cookie holding the unix time until which a client that just wrote is served from the primary
+PRIMARY_PIN_COOKIE = "primary_pin_until"
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+class Writes:
+    """Whether writes were committed or accepted within a `track_writes` block, e.g. while serving one request."""
+
+    def __init__(self):
+        self.recorded = False
+
+
+_write_trackers: ContextVar[Tuple[Writes, ...]] = ContextVar("write_trackers", default=())
+
+
+class ReadSessionRouter:
+    """
+    Picks the session factory for read-only work: replicas in round-robin order,
+    or the primary when there are no replicas or the client is pinned to it.
+    """
+
+    def __init__(self, primary: SessionFactory, replicas: Sequence[SessionFactory] = ()):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._next_replica = itertools.cycle(self.replicas)
+
+    def session_factory(self, pinned_to_primary: bool = False) -> SessionFactory:
+        if pinned_to_primary or not self.replicas:
+            return self.primary
+        return next(self._next_replica)
+
+
+def pin_to_primary(response: Response, seconds: float) -> None:
+    """Makes the client's reads go to the primary for the next `seconds`, so it reads its own writes."""
+    if seconds > 0:
+        response.set_cookie(PRIMARY_PIN_COOKIE, str(time.time() + seconds), max_age=int(seconds) + 1, httponly=True)
+
+
+@contextmanager
+def track_writes() -> Iterator[Writes]:
+    """
+    Records whether the current task, or the tasks it starts, write within the block.
+    Blocks can be nested: each one sees all the writes recorded while it is open.
+    """
+    writes = Writes()
+    token = _write_trackers.set(_write_trackers.get() + (writes,))
+    try:
+        yield writes
+    finally:
+        _write_trackers.reset(token)
+
+
+def record_write() -> None:
+    """Marks the open `track_writes` blocks as having written, once a write is committed or accepted."""
+    for writes in _write_trackers.get():
+        writes.recorded = True
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesces the single-key loads requested during the same event-loop iteration into one call of
+    `batch_load`, which returns the value of every key it found.
+
+    Values are memoized for the loader's lifetime: create one per request so they don't go stale.
+    Batches run one at a time under `lock`: loaders whose batches query the same session must share it,
+    as an AsyncSession doesn't allow concurrent operations.
+    """
+
+    def __init__(self, batch_load: Callable[[List[K]], Awaitable[Dict[K, V]]], lock: asyncio.Lock = None):
+        self.batch_load = batch_load
+        self.lock = lock or asyncio.Lock()
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._pending: List[K] = []
+        # Keeps the dispatched batches referenced until they complete
+        self._batches: set = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        """The value of the key, or None if the batch didn't find it."""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._pending:
+                # Runs after the callbacks already scheduled, i.e. once the other ready tasks had their turn
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+        return await future
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        batch = asyncio.ensure_future(self._resolve(keys))
+        self._batches.add(batch)
+        batch.add_done_callback(self._batches.discard)
+
+    async def _resolve(self, keys: List[K]) -> None:
+        try:
+            async with self.lock:
+                values = await self.batch_load(keys)
+        except Exception as e:
+            for key in keys:
+                # Failures aren't memoized: a later load retries
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(values.get(key))
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Tuple, Type
+from uuid import UUID
+
+from sqlalchemy.orm import sessionmaker
+
+from src.infrastructure.repositories.base_repository import BaseRepository
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+# Messages first: a user is only purged once none of their messages remain
+PURGE_ORDER = (MessageRepository, UserRepository)
+
+
+class PurgeMetrics:
+    """Rows purged, batches and time spent per table, and the end of the last pass, in the Prometheus format."""
+
+    def __init__(self):
+        # table -> [rows, batches, total seconds]
+        self._tables: Dict[str, list] = {}
+        self.last_run_timestamp: Optional[float] = None
+
+    def record_batch(self, table: str, rows: int, seconds: float) -> None:
+        entry = self._tables.setdefault(table, [0, 0, 0.0])
+        entry[0] += rows
+        entry[1] += 1
+        entry[2] += seconds
+
+    def record_run(self) -> None:
+        self.last_run_timestamp = time.time()
+
+    def render(self) -> str:
+        lines = []
+        for name, index, help_text in (
+            ("purge_rows_total", 0, "Soft deleted rows hard deleted by the purge worker."),
+            ("purge_batches_total", 1, "Purge transactions committed."),
+            ("purge_seconds_total", 2, "Time spent in purge transactions."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{table="{table}"}} {values[index]}' for table, values in sorted(self._tables.items())]
+        if self.last_run_timestamp is not None:
+            lines += [
+                "# HELP purge_last_run_timestamp_seconds End of the last complete purge pass.",
+                "# TYPE purge_last_run_timestamp_seconds gauge",
+                f"purge_last_run_timestamp_seconds {self.last_run_timestamp}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+class PurgeWorker:
+    """
+    Hard deletes the USER and MESSAGE rows soft deleted longer ago than the retention window. Each pass first
+    finishes the deletions of users whose messages were left active, e.g. by a restart during their deferred deletion.
+
+    Rows go in transactions of at most `batch_size`, locked with FOR UPDATE SKIP LOCKED so several workers
+    (one per server process) share the work without waiting on each other. After each batch the worker sleeps
+    `throttle_ratio` times the batch's duration: at 1.0 it keeps a connection busy at most half of the time,
+    leaving room for the foreground traffic.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        retention: timedelta,
+        batch_size: int = 1000,
+        throttle_ratio: float = 1.0,
+        metrics: PurgeMetrics = None,
+        repositories: Sequence[Type[BaseRepository]] = PURGE_ORDER,
+    ):
+        self.session_factory = session_factory
+        self.retention = retention
+        self.batch_size = batch_size
+        self.throttle_ratio = throttle_ratio
+        self.metrics = metrics or PurgeMetrics()
+        self.repositories = repositories
+
+    async def run_once(self, now: datetime = None) -> Dict[str, int]:
+        """Purges every table until no expired row is left unlocked. Returns the purged rows per table."""
+        deleted_before = (now or datetime.utcnow()) - self.retention
+        await self.finish_user_deletions()
+        purged = {}
+        for repository_class in self.repositories:
+            table, rows = await self._purge(repository_class, deleted_before)
+            purged[table] = rows
+        self.metrics.record_run()
+        return purged
+
+    async def finish_user_deletions(self) -> int:
+        """
+        Soft deletes the messages still active of deleted users, in throttled batches.
+        Returns the number of deleted messages; they are purged once past the retention window.
+        """
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                user_ids = await UserRepository(session).get_deleted_ids_with_active_messages(self.batch_size)
+            for user_id in user_ids:
+                total += await self._delete_messages_of(user_id)
+            if len(user_ids) < self.batch_size:
+                if total:
+                    logger.info(f"Deleted {total} messages left by deleted users.")
+                return total
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        """Runs a pass every `interval_seconds` until cancelled, e.g. as an asyncio task of the app's lifespan."""
+        while True:
+            try:
+                purged = await self.run_once()
+                logger.info(f"Purged soft deleted rows: {purged}")
+            except Exception:
+                # The next pass retries; a failing purge must not take the server down
+                logger.exception("Purge of soft deleted rows failed.")
+            await asyncio.sleep(interval_seconds)
+
+    async def _purge(self, repository_class: Type[BaseRepository], deleted_before: datetime) -> Tuple[str, int]:
+        total = 0
+        while True:
+            started = time.perf_counter()
+            async with self.session_factory() as session, UnitOfWork(session):
+                repository = repository_class(session)
+                purged = await repository.purge_deleted_batch(deleted_before, self.batch_size)
+            elapsed = time.perf_counter() - started
+
+            self.metrics.record_batch(repository.model.__tablename__, purged, elapsed)
+            total += purged
+            if purged < self.batch_size:
+                return repository.model.__tablename__, total
+            await asyncio.sleep(elapsed * self.throttle_ratio)
+
+    async def _delete_messages_of(self, user_id: UUID) -> int:
+        total = 0
+        while True:
+            started = time.perf_counter()
+            async with self.session_factory() as session, UnitOfWork(session):
+                deleted = await MessageRepository(session).soft_delete_batch_by_sender_id(user_id, self.batch_size)
+            elapsed = time.perf_counter() - started
+
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+            await asyncio.sleep(elapsed * self.throttle_ratio)
@@ -1,68 +1,160 @@
+import inspect
 from datetime import datetime
-from typing import TypeVar
+from typing import Optional, TypeVar
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Row, exists, insert, update, delete
+
+from src.infrastructure.database.instrumentation import tag_queries
 
 ModelType = TypeVar("ModelType")
 
 
 class BaseRepository:
+    """
+    Generic data access for a model. Writes are only flushed: committing is left to the
+    caller's unit of work, so a service operation commits all of its writes once.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        """Tags the statements of every public async method, inherited ones included, e.g. "UserRepository.create"."""
+        super().__init_subclass__(**kwargs)
+        for name, method in inspect.getmembers(cls, inspect.isfunction):
+            if not name.startswith("_") and (inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method)):
+                setattr(cls, name, tag_queries(f"{cls.__name__}.{name}")(method))
+
+    # Columns besides the id returned by deletes and handed to `_on_removed`
+    removed_columns: tuple = ()
+
     def __init__(self, session: AsyncSession, model: ModelType):
         self.session = session
         self.model = model  # Store the model type for later use
 
     async def create(self, obj: ModelType) -> ModelType:
-        try:
-            self.session.add(obj)
-            await self.session.commit()
-            await self.session.refresh(obj)  # Fetches the newly created record
-            return obj
-        except IntegrityError as e:
-            await self.session.rollback()
-            raise e
+        # INSERT ... RETURNING hands back the stored row, server defaults included, without a second SELECT
+        stmt = insert(self.model).values(**self._column_values(obj)).returning(self.model)
+        result = await self.session.execute(stmt)
+        created = result.scalars().one()
+        await self._on_created(created)
+        return created
 
     async def get_by_id(self, id: UUID) -> ModelType:
         stmt = self._active_query().filter(self.model.id == id)
         result = await self.session.execute(stmt)
         return result.scalars().first()
 
+    async def exists(self, id: UUID) -> bool:
+        """Checks that an active record has this id without loading it."""
+        stmt = select(exists().where(self.model.id == id, self.model.is_deleted == False))  # noqa
+        result = await self.session.execute(stmt)
+        return result.scalar_one()
+
+    async def get_columns_by_id(self, id: UUID, *columns) -> Optional[Row]:
+        """Loads only the given columns of an active record, as a row rather than an ORM instance."""
+        stmt = self._active_query(*columns).filter(self.model.id == id)
+        result = await self.session.execute(stmt)
+        return result.first()
+
     async def update(self, obj_id: UUID, obj: ModelType) -> ModelType:
-        try:
-            obj.updated_at = datetime.utcnow()
-            stmt = (
-                update(self.model)
-                .where(self.model.id == obj_id)
-                .values(**obj.model_dump(exclude_unset=True))
-                .execution_options(synchronize_session="fetch")
-            )
-            await self.session.execute(stmt)
-            await self.session.commit()
-            return await self.get_by_id(obj_id)
-        except IntegrityError as e:
-            await self.session.rollback()
-            raise e
-
-    async def soft_delete(self, id: UUID) -> None:
+        obj.updated_at = datetime.utcnow()
+        stmt = (
+            update(self.model)
+            .where(self.model.id == obj_id, self.model.is_deleted == False)  # noqa
+            .values(**obj.model_dump(exclude_unset=True))
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
+    async def soft_delete(self, id: UUID) -> bool:
+        """
+        Soft deletes the record if it is active, in a single conditional UPDATE ... RETURNING.
+        Returns whether there was an active record to delete.
+        """
         stmt = (
             update(self.model)
+            .where(self.model.id == id, self.model.is_deleted == False)  # noqa
+            .values(is_deleted=True, deleted_at=datetime.utcnow())
+            .returning(self.model.id, *self.removed_columns)
+            .execution_options(synchronize_session="fetch")
+        )
+        result = await self.session.execute(stmt)
+        removed = result.first()
+        if removed is None:
+            return False
+        await self._on_removed(removed)
+        return True
+
+    async def hard_delete(self, id: UUID) -> bool:
+        """Deletes the record, active or not. Returns whether there was a record to delete."""
+        stmt = (
+            delete(self.model)
             .where(self.model.id == id)
-            .values(is_deleted=True)
+            .returning(self.model.id, self.model.is_deleted, *self.removed_columns)
             .execution_options(synchronize_session="fetch")
         )
-        await self.session.execute(stmt)
-        await self.session.commit()
+        result = await self.session.execute(stmt)
+        removed = result.first()
+        if removed is None:
+            return False
+        if not removed.is_deleted:
+            await self._on_removed(removed)
+        return True
 
-    async def hard_delete(self, id: UUID) -> None:
-        stmt = delete(self.model).where(self.model.id == id).execution_options(synchronize_session="fetch")
-        await self.session.execute(stmt)
-        await self.session.commit()
+    async def purge_deleted_batch(self, deleted_before: datetime, batch_size: int) -> int:
+        """
+        Hard deletes at most `batch_size` records soft deleted before `deleted_before`, oldest first.
+        Records locked by another transaction, e.g. another purge worker, are skipped rather than waited for.
+        Returns the number of purged records.
+        """
+        batch = (
+            select(self.model.id)
+            .where(
+                self.model.is_deleted == True,  # noqa
+                self.model.deleted_at < deleted_before,
+                *self._purge_filters(),
+            )
+            .order_by(self.model.deleted_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = delete(self.model).where(self.model.id.in_(batch)).execution_options(synchronize_session=False)
+        result = await self.session.execute(stmt)
+        return result.rowcount
 
-    async def list(self, filters: list = None, limit: int = None, offset: int = None) -> list[ModelType]:
-        query = self._active_query().filter(*filters or [])
+    async def list(
+        self, filters: list = None, limit: int = None, offset: int = None, order_by: list = None
+    ) -> list[ModelType]:
+        query = self._list_query(filters=filters, limit=limit, offset=offset, order_by=order_by)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    def _column_values(self, obj: ModelType) -> dict:
+        """Return the values of every column of `obj`; model_dump() would drop the excluded fields."""
+        return {field: getattr(obj, field) for field in self.model.model_fields}
+
+    async def _on_created(self, obj: ModelType) -> None:
+        """Hook run in the transaction that creates `obj`, after it is flushed."""
+
+    async def _on_removed(self, removed: Row) -> None:
+        """
+        Hook run in the transaction that soft or hard deletes an active record; `removed` holds its id
+        and `removed_columns`.
+        """
+
+    def _purge_filters(self) -> list:
+        """Extra conditions a soft deleted record must meet to be purged, e.g. having no dependent rows left."""
+        return []
+
+    def _list_query(
+        self, filters: list = None, limit: int = None, offset: int = None, order_by: list = None, columns: list = None
+    ):
+        """Return a query of active records, or of their `columns`, with filters, ordering and pagination applied."""
+        query = self._active_query(*columns or []).filter(*filters or []).order_by(*order_by or [])
 
         # Apply pagination
         if limit is not None:
@@ -70,9 +162,8 @@ class BaseRepository:
         if offset is not None:
             query = query.offset(offset)
 
-        result = await self.session.execute(query)
-        return result.scalars().all()
+        return query
 
-    def _active_query(self):
-        """Return a query that filters out deleted records by default."""
-        return select(self.model).filter(self.model.is_deleted == False)  # noqa
+    def _active_query(self, *columns):
+        """Return a query of the records, or only the given columns, that filters out deleted records by default."""
+        return select(*columns or [self.model]).filter(self.model.is_deleted == False)  # noqa
@@ -1,37 +1,304 @@
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple
 from uuid import UUID
 
 from sqlmodel import select
 
-from src.domain.models import Message
+from src.domain.models import Message, MessageRow, MessageSearchRow, User
 from src.infrastructure.repositories.base_repository import BaseRepository
+from src.infrastructure.repositories.pagination import decode_cursor, decode_search_cursor
+from src.infrastructure.search import SEARCH_VECTOR, TEXT_SEARCH_CONFIG, InvertedIndex
 
-from sqlalchemy import update, func
+from sqlalchemy import Row, and_, bindparam, insert, or_, update, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+# Columns of MessageRow, in its field order
+MESSAGE_ROW_COLUMNS = (Message.id, Message.sender_id, Message.content, Message.created_at)
+
+
 class MessageRepository(BaseRepository):
+    removed_columns = (Message.sender_id,)
+
     def __init__(self, session: AsyncSession):
         super().__init__(session=session, model=Message)
 
-    async def get_by_sender_id(self, sender_id: UUID, limit: int = None, offset: int = None) -> list[Message]:
-        messages = await self.list(limit=limit, offset=offset, filters=[Message.sender_id == sender_id])
+    async def bulk_create(self, messages: list[Message]) -> list[Message]:
+        """
+        Inserts all messages and bumps their senders' counters.
+
+        Ids and timestamps are generated client-side, so a batched multi-row INSERT without RETURNING is enough.
+        """
+        if not messages:
+            return []
+
+        rows = [self._column_values(message) for message in messages]
+        await self.session.execute(insert(Message), rows)
+
+        user_table = User.__table__
+        counts = Counter(message.sender_id for message in messages)
+        # Sender rows are locked in id order, so concurrent batches with overlapping senders can't deadlock
+        await self.session.execute(
+            update(user_table)
+            .where(user_table.c.id == bindparam("sender"))
+            .values(message_count=user_table.c.message_count + bindparam("delta")),
+            [{"sender": sender_id, "delta": delta} for sender_id, delta in sorted(counts.items())],
+        )
         return messages
 
+    async def get_by_sender_id(
+        self,
+        sender_id: UUID,
+        limit: int = None,
+        offset: int = None,
+        cursor: str = None,
+        created_after: datetime = None,
+        created_before: datetime = None,
+    ) -> list[Message]:
+        query = self._sender_page_query(
+            sender_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            created_after=created_after,
+            created_before=created_before,
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_page_by_sender_id(
+        self,
+        sender_id: UUID,
+        limit: int = None,
+        offset: int = None,
+        cursor: str = None,
+        include_count: bool = True,
+        created_after: datetime = None,
+        created_before: datetime = None,
+    ) -> Tuple[Optional[int], list[MessageRow]]:
+        """
+        Returns the total number of active messages of the sender together with one page of them.
+
+        The page is projected straight into read-only rows, skipping the ORM identity map and instances.
+        The sender's message counter rides along every row as a scalar subquery, so page and count cost
+        a single statement. The count is the sender's total, regardless of the time window.
+        """
+        query = self._sender_page_query(
+            sender_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            created_after=created_after,
+            created_before=created_before,
+            columns=list(MESSAGE_ROW_COLUMNS),
+        )
+        if not include_count:
+            return None, [MessageRow(*row) for row in (await self.session.execute(query)).all()]
+
+        query = query.add_columns(self._sender_count_query(sender_id).correlate(None).scalar_subquery())
+        rows = (await self.session.execute(query)).all()
+
+        # Past the last page there are no rows to carry the total
+        if not rows:
+            return await self.get_by_sender_id_count(sender_id), []
+        return rows[0][-1] or 0, [MessageRow(*row[:-1]) for row in rows]
+
+    async def stream_by_sender_id(
+        self,
+        sender_id: UUID,
+        batch_size: int = 1000,
+        created_after: datetime = None,
+        created_before: datetime = None,
+    ) -> AsyncIterator[Message]:
+        """
+        Yields every active message of the sender in (created_at, id) order through a server-side cursor,
+        holding at most `batch_size` rows in memory at a time.
+        """
+        query = self._sender_page_query(
+            sender_id, created_after=created_after, created_before=created_before
+        ).execution_options(yield_per=batch_size)
+        result = await self.session.stream_scalars(query)
+        async for message in result:
+            yield message
+
+    async def search(
+        self, query: str, sender_id: UUID = None, limit: int = None, cursor: str = None
+    ) -> list[MessageSearchRow]:
+        """
+        Returns the active messages matching the full-text `query`, optionally only the sender's ones,
+        best ranked first and then in (created_at, id) order. Pages continue after the cursor of the
+        previous page's last result.
+
+        On PostgreSQL the query is parsed by websearch_to_tsquery and matched through the GIN index of the
+        generated `content_tsv` column. Other databases rank the candidate messages with an in-process
+        inverted index, which reads every one of them: only meant for local runs and tests.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return await self._search_in_process(query, sender_id=sender_id, limit=limit, cursor=cursor)
+
+        tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+        rank = func.ts_rank(SEARCH_VECTOR, tsquery)
+        filters = [SEARCH_VECTOR.op("@@")(tsquery)]
+        if sender_id is not None:
+            filters.append(Message.sender_id == sender_id)
+        if cursor is not None:
+            after_rank, created_at, message_id = decode_search_cursor(cursor)
+            filters.append(
+                or_(
+                    rank < after_rank,
+                    and_(rank == after_rank, tuple_(Message.created_at, Message.id) > tuple_(created_at, message_id)),
+                )
+            )
+
+        statement = self._list_query(
+            filters=filters,
+            limit=limit,
+            order_by=[rank.desc(), Message.created_at, Message.id],
+            columns=[*MESSAGE_ROW_COLUMNS, rank],
+        )
+        return [MessageSearchRow(*row) for row in (await self.session.execute(statement)).all()]
+
     async def get_by_sender_id_count(self, sender_id: UUID) -> int:
+        total_count = await self.session.execute(self._sender_count_query(sender_id))
+        return total_count.scalar_one_or_none() or 0
+
+    async def soft_delete_by_sender_id(self, sender_id: UUID) -> None:
         query = (
-            select(func.count())
-            .select_from(Message)
-            .where(Message.is_deleted == False, Message.sender_id == sender_id)  # noqa
+            update(Message)
+            .where(Message.sender_id == sender_id, Message.is_deleted == False)  # noqa
+            .values(is_deleted=True, deleted_at=datetime.utcnow())
         )
-        total_count = await self.session.execute(query)
-        return total_count.scalar_one()
 
-    async def soft_delete_by_sender_id(self, sender_id: UUID) -> None:
+        result = await self.session.execute(query)
+        await self._adjust_sender_count(sender_id, -result.rowcount)
+
+    async def soft_delete_batch_by_sender_id(self, sender_id: UUID, batch_size: int) -> int:
+        """
+        Soft deletes at most `batch_size` active messages of the sender. Committing each batch separately
+        keeps a large history from being locked all at once. Returns the number of deleted messages.
+
+        Concurrent runs for the same sender, e.g. the background deletion and the purge worker's, skip each
+        other's locked rows, and rows deleted in the meantime aren't deleted, nor taken off the counter, twice.
+        """
+        batch = (
+            select(Message.id)
+            .where(Message.sender_id == sender_id, Message.is_deleted == False)  # noqa
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
         query = (
             update(Message)
-            .where(Message.sender_id == sender_id)
-            .values(is_deleted=True)  # Mark as soft deleted and update timestamp
+            .where(Message.id.in_(batch), Message.is_deleted == False)  # noqa
+            .values(is_deleted=True, deleted_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
         )
 
+        result = await self.session.execute(query)
+        await self._adjust_sender_count(sender_id, -result.rowcount)
+        return result.rowcount
+
+    async def rebuild_sender_counts_batch(self, after_id: Optional[UUID], batch_size: int) -> list[UUID]:
+        """
+        Locks the next `batch_size` users in id order after `after_id` and recomputes their message counters
+        from the MESSAGE table. Returns the ids of the rebuilt users; none once every user has been visited.
+
+        Committed batch by batch, messages created or deleted concurrently are either counted by the
+        rebuild or wait for the lock and are applied after it.
+        """
+        query = select(User.id).order_by(User.id).limit(batch_size).with_for_update()
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+        user_ids = (await self.session.execute(query)).scalars().all()
+        if not user_ids:
+            return []
+
+        active_count = (
+            select(func.count())
+            .select_from(Message)
+            .where(Message.sender_id == User.id, Message.is_deleted == False)  # noqa
+            .scalar_subquery()
+        )
+        await self.session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(message_count=active_count)
+            .execution_options(synchronize_session=False)
+        )
+        return user_ids
+
+    async def _search_in_process(
+        self, query: str, sender_id: UUID = None, limit: int = None, cursor: str = None
+    ) -> list[MessageSearchRow]:
+        filters = [] if sender_id is None else [Message.sender_id == sender_id]
+        rows = (await self.session.execute(self._list_query(filters=filters, columns=MESSAGE_ROW_COLUMNS))).all()
+
+        index = InvertedIndex()
+        for row in rows:
+            index.add(row.id, row.content)
+        ranks = index.search(query)
+        results = sorted(
+            (MessageSearchRow(*row, rank=ranks[row.id]) for row in rows if row.id in ranks),
+            key=lambda result: (-result.rank, result.created_at, result.id),
+        )
+
+        if cursor is not None:
+            after_rank, created_at, message_id = decode_search_cursor(cursor)
+            results = [
+                result
+                for result in results
+                if (-result.rank, result.created_at, result.id) > (-after_rank, created_at, message_id)
+            ]
+        return results if limit is None else results[:limit]
+
+    async def _on_created(self, obj: Message) -> None:
+        await self._adjust_sender_count(obj.sender_id, 1)
+
+    async def _on_removed(self, removed: Row) -> None:
+        await self._adjust_sender_count(removed.sender_id, -1)
+
+    async def _adjust_sender_count(self, sender_id: UUID, delta: int) -> None:
+        """Atomically shifts the sender's message counter; the row lock serializes concurrent writers."""
+        if delta == 0:
+            return
+        query = (
+            update(User)
+            .where(User.id == sender_id)
+            .values(message_count=User.message_count + delta)
+            .execution_options(synchronize_session=False)
+        )
         await self.session.execute(query)
-        await self.session.commit()
+
+    def _sender_page_query(
+        self,
+        sender_id: UUID,
+        limit: int = None,
+        offset: int = None,
+        cursor: str = None,
+        created_after: datetime = None,
+        created_before: datetime = None,
+        columns: list = None,
+    ):
+        filters = [Message.sender_id == sender_id]
+
+        # Plain range predicates on the partition key let PostgreSQL prune the monthly MESSAGE partitions
+        if created_after is not None:
+            filters.append(Message.created_at >= created_after)
+        if created_before is not None:
+            filters.append(Message.created_at < created_before)
+
+        # Keyset pagination: continue strictly after the (created_at, id) position encoded in the cursor
+        if cursor is not None:
+            created_at, message_id = decode_cursor(cursor)
+            filters.append(tuple_(Message.created_at, Message.id) > tuple_(created_at, message_id))
+            # Implied by the row comparison, which the planner can't prune partitions with on its own
+            filters.append(Message.created_at >= created_at)
+
+        return self._list_query(
+            filters=filters, limit=limit, offset=offset, order_by=[Message.created_at, Message.id], columns=columns
+        )
+
+    def _sender_count_query(self, sender_id: UUID):
+        # Reads the maintained counter instead of counting the sender's rows
+        return select(User.message_count).where(User.id == sender_id)
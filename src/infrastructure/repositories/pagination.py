@@ -0,0 +1,45 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+from src.domain.exceptions.pagination import InvalidCursorException
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """
+    Encodes the position of a row in (created_at, id) order into an opaque cursor.
+    """
+    raw = f"{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decodes a cursor produced by `encode_cursor` back into a (created_at, id) pair.
+    """
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorException(f"Invalid pagination cursor {cursor!r}.")
+
+
+def encode_search_cursor(rank: float, created_at: datetime, id: UUID) -> str:
+    """
+    Encodes the position of a search result in (rank descending, created_at, id) order into an opaque cursor.
+    """
+    raw = f"{rank!r}|{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, datetime, UUID]:
+    """
+    Decodes a cursor produced by `encode_search_cursor` back into a (rank, created_at, id) triple.
+    """
+    try:
+        rank, created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return float(rank), datetime.fromisoformat(created_at), UUID(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorException(f"Invalid pagination cursor {cursor!r}.")
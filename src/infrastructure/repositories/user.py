@@ -1,6 +1,9 @@
-from typing import Optional
+from typing import Iterable, Optional
+from uuid import UUID
 
-from src.domain.models import User
+from sqlalchemy import exists, func, select
+
+from src.domain.models import Message, User
 from src.infrastructure.repositories.base_repository import BaseRepository
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -10,11 +13,52 @@ class UserRepository(BaseRepository):
         super().__init__(session=session, model=User)
 
     async def get_by_email(self, email: str) -> Optional[User]:
-        query = self._active_query().filter(User.email == email)
+        """Case-insensitive lookup, served by the unique index on lower(email)."""
+        query = self._active_query().filter(func.lower(User.email) == func.lower(email))
         result = await self.session.execute(query)
         return result.scalars().first()
 
+    async def get_by_ids(self, ids: Iterable[UUID]) -> list[User]:
+        """Active users among the given ids, in a single IN query; unknown ids are left out."""
+        query = self._active_query().filter(User.id.in_(set(ids)))
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_by_emails(self, emails: Iterable[str]) -> list[User]:
+        """Active users with any of the given emails regardless of casing, in a single IN query on lower(email)."""
+        query = self._active_query().filter(func.lower(User.email).in_([func.lower(email) for email in set(emails)]))
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
     async def list_users(self, limit: int = None, offset: int = None) -> list[User]:
         # Use the list method from BaseRepository with pagination
         users = await self.list(limit=limit, offset=offset)
         return users
+
+    async def get_existing_ids(self, ids: Iterable[UUID]) -> set[UUID]:
+        """Returns which of the given ids belong to active users, in a single IN query."""
+        query = select(User.id).where(User.id.in_(set(ids)), User.is_deleted == False)  # noqa
+        result = await self.session.execute(query)
+        return set(result.scalars().all())
+
+    async def is_deleted(self, id: UUID) -> Optional[bool]:
+        """Whether the user was soft deleted, or None if there's no such user at all."""
+        result = await self.session.execute(select(User.is_deleted).where(User.id == id))
+        return result.scalar_one_or_none()
+
+    async def get_deleted_ids_with_active_messages(self, limit: int) -> list[UUID]:
+        """Deleted users some of whose messages are still active, e.g. when their deferred deletion was interrupted."""
+        query = (
+            select(User.id)
+            .where(
+                User.is_deleted == True,  # noqa
+                exists().where(Message.sender_id == User.id, Message.is_deleted == False),  # noqa
+            )
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    def _purge_filters(self) -> list:
+        # The foreign key keeps a user until all of their messages, deleted ones included, have been purged
+        return [~exists().where(Message.sender_id == User.id)]
@@ -0,0 +1,52 @@
+"""
+Full-text search of message content.
+
+PostgreSQL matches and ranks against the `content_tsv` tsvector column, generated from `content` and indexed
+with GIN by the migrations. Other databases (SQLite in local runs and tests) fall back to `InvertedIndex`.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Hashable
+
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+TEXT_SEARCH_CONFIG = "english"
+
+# Generated column, left out of the Message model so that inserts never write it
+SEARCH_VECTOR = literal_column('"MESSAGE".content_tsv', type_=TSVECTOR)
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Maps every word to the documents containing it and how many times, to find the documents containing all
+    the words of a query. Documents are ranked by the share of their words matching the query.
+
+    Unlike the PostgreSQL search, words are neither stemmed nor filtered for stop words, and the query syntax
+    (quotes, "or", "-") is not interpreted.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, int]] = defaultdict(dict)
+        self._lengths: Dict[Hashable, int] = {}
+
+    def add(self, key: Hashable, text: str) -> None:
+        words = tokenize(text)
+        self._lengths[key] = len(words)
+        for word in words:
+            postings = self._postings[word]
+            postings[key] = postings.get(key, 0) + 1
+
+    def search(self, query: str) -> Dict[Hashable, float]:
+        """The keys of the documents containing every word of the query, with their rank."""
+        postings = [self._postings.get(word, {}) for word in set(tokenize(query))]
+        if not postings:
+            return {}
+        matches = set(postings[0]).intersection(*postings[1:])
+        return {key: sum(posting[key] for posting in postings) / self._lengths[key] for key in matches}
@@ -1,52 +1,161 @@
 import logging
 
-from typing import List, Tuple
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import UUID
 
 from src.domain.exceptions.message import MessageNotFoundException
 from src.domain.exceptions.user import UserNotFoundException
-from src.domain.models import Message
+from src.domain.models import Message, MessageRow, MessageSearchRow
+from src.infrastructure.cache import CacheBackend, user_exists_key
 from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.pagination import encode_cursor, encode_search_cursor
 from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+from src.infrastructure.write_behind import MessageWriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
 
 class MessageService:
-    def __init__(self, user_repository: UserRepository, message_repository: MessageRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        message_repository: MessageRepository,
+        unit_of_work: UnitOfWork,
+        user_cache: Optional[CacheBackend] = None,
+        write_behind: Optional[MessageWriteBehindQueue] = None,
+    ):
         """
-        Initializes the MessageService with user and message repository dependencies.
+        Initializes the MessageService with user and message repository dependencies, the unit of work
+        committing each write operation, optionally a cache of existing user ids to skip the sender lookup,
+        and optionally a write-behind queue that new messages are handed to instead of being committed.
         """
         self.user_repository = user_repository
         self.message_repository = message_repository
+        self.unit_of_work = unit_of_work
+        self.user_cache = user_cache
+        self.write_behind = write_behind
 
     async def create_message(self, message: Message) -> Message:
         """
         Creates a new message if the sender exists.
+
+        With a write-behind queue, the message is only queued, to be committed with others shortly after:
+        it is returned with its pre-generated id, or MessageQueueFullException is raised if the queue is full.
         """
-        sender = await self.user_repository.get_by_id(message.sender_id)
-        if sender is None:
+        if not await self._sender_exists(message.sender_id):
             logger.info(f"User with ID {message.sender_id} not found for {message.id}.")
             raise UserNotFoundException(f"Sender with ID {message.sender_id} not found.")
 
-        return await self.message_repository.create(message)
+        if self.write_behind is not None:
+            self.write_behind.submit(message)
+            return message
+
+        async with self.unit_of_work:
+            return await self.message_repository.create(message)
+
+    async def create_messages(self, messages: List[Message]) -> Tuple[List[Message], List[Tuple[int, str]]]:
+        """
+        Creates a batch of messages, skipping those whose sender doesn't exist.
+
+        All distinct senders are validated with one query and the valid messages are inserted together.
+        Returns the created messages and (index, reason) pairs for the rejected ones.
+        """
+        existing_sender_ids = await self.user_repository.get_existing_ids({message.sender_id for message in messages})
+
+        valid, errors = [], []
+        for index, message in enumerate(messages):
+            if message.sender_id in existing_sender_ids:
+                valid.append(message)
+            else:
+                errors.append((index, f"Sender with ID {message.sender_id} not found."))
+
+        if errors:
+            logger.info(f"Rejected {len(errors)} of {len(messages)} messages with unknown senders.")
+        async with self.unit_of_work:
+            created = await self.message_repository.bulk_create(valid)
+        return created, errors
 
     async def get_mesages_by_sender_id(
-        self, sender_id: UUID, limit: int = None, offset: int = None
-    ) -> Tuple[int, List[Message]]:
+        self,
+        sender_id: UUID,
+        limit: int = None,
+        offset: int = None,
+        cursor: str = None,
+        include_count: bool = True,
+        created_after: datetime = None,
+        created_before: datetime = None,
+    ) -> Tuple[Optional[int], List[MessageRow], Optional[str]]:
         """
-        Retrieves all messages sent by a specific user.
+        Retrieves all messages sent by a specific user, optionally only the ones created in
+        [created_after, created_before).
+
+        Pages can be requested either by offset or by the opaque cursor returned with the previous page.
+        The returned cursor is None once a page comes back smaller than the limit.
+        The total count is fetched in the same statement as the page, or skipped (None) if not requested.
         """
-        messages = await self.message_repository.get_by_sender_id(sender_id=sender_id, limit=limit, offset=offset)
-        count = await self.message_repository.get_by_sender_id_count(sender_id=sender_id)
-        return count, messages
+        count, messages = await self.message_repository.get_page_by_sender_id(
+            sender_id=sender_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_count=include_count,
+            created_after=created_after,
+            created_before=created_before,
+        )
+
+        next_cursor = None
+        if limit is not None and messages and len(messages) == limit:
+            next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+        return count, messages, next_cursor
+
+    async def search_messages(
+        self, query: str, sender_id: UUID = None, limit: int = 20, cursor: str = None
+    ) -> Tuple[List[MessageSearchRow], Optional[str]]:
+        """
+        Full-text search of the active messages, optionally of a single sender, best matches first.
+        The returned cursor is None once a page comes back smaller than the limit.
+        """
+        results = await self.message_repository.search(query, sender_id=sender_id, limit=limit, cursor=cursor)
+
+        next_cursor = None
+        if results and len(results) == limit:
+            last = results[-1]
+            next_cursor = encode_search_cursor(last.rank, last.created_at, last.id)
+        return results, next_cursor
+
+    async def stream_messages_by_sender_id(
+        self, sender_id: UUID, created_after: datetime = None, created_before: datetime = None
+    ) -> AsyncIterator[Message]:
+        """
+        Streams all messages sent by a specific user without loading them into memory at once.
+        """
+        async for message in self.message_repository.stream_by_sender_id(
+            sender_id=sender_id, created_after=created_after, created_before=created_before
+        ):
+            yield message
 
     async def delete_message(self, message_id: UUID) -> None:
         """
         Soft deletes a message by its ID, if it exists.
         """
-        message = await self.message_repository.get_by_id(message_id)
-        if message is None:
-            raise MessageNotFoundException(f"Message with ID {message_id} not found.")
+        async with self.unit_of_work:
+            if not await self.message_repository.soft_delete(message_id):
+                raise MessageNotFoundException(f"Message with ID {message_id} not found.")
+
+    async def _sender_exists(self, sender_id: UUID) -> bool:
+        """
+        Checks that the sender is an existing user, consulting the user cache first.
+        Only positive answers are cached, so newly created users are accepted right away.
+        """
+        if self.user_cache is not None and await self.user_cache.get(user_exists_key(sender_id)):
+            return True
+
+        if not await self.user_repository.exists(sender_id):
+            return False
 
-        await self.message_repository.soft_delete(message_id)
+        if self.user_cache is not None:
+            # Only added if missing: a delete committed since the lookup left a tombstone that must stay
+            await self.user_cache.add(user_exists_key(sender_id), True)
+        return True
@@ -1,65 +1,196 @@
+import asyncio
 import logging
 
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from sqlalchemy.exc import IntegrityError
 
 from src.domain.exceptions.user import UserAlreadyExistsException, UserNotFoundException
 from src.domain.models import User
+from src.infrastructure.cache import CacheBackend, user_cached_email_key, user_email_key, user_exists_key
+from src.infrastructure.dataloader import DataLoader
 from src.infrastructure.repositories.user import UserRepository
 from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.unit_of_work import UnitOfWork
 
 logger = logging.getLogger(__name__)
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepository, message_repository: MessageRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        message_repository: MessageRepository,
+        unit_of_work: UnitOfWork,
+        user_cache: Optional[CacheBackend] = None,
+        profile_cache: Optional[CacheBackend] = None,
+        fill_profile_cache: bool = True,
+    ):
         """
         Initializes the UserService with user and message repository dependencies.
 
         Parameters:
             user_repository (UserRepository): Repository for accessing user-related data.
             message_repository (MessageRepository): Repository for accessing message-related data.
+            unit_of_work (UnitOfWork): Commits each write operation in a single transaction.
+            user_cache (CacheBackend, optional): Cache of existing user ids, invalidated on updates and deletes.
+            profile_cache (CacheBackend, optional): Cache of users looked up by email, invalidated likewise.
+            fill_profile_cache (bool): Whether lookups may fill the profile cache; only reads from the primary
+                should, as a lagging replica could put back a profile an update just invalidated.
         """
         self.user_repository = user_repository
         self.message_repository = message_repository
+        self.unit_of_work = unit_of_work
+        self.user_cache = user_cache
+        self.profile_cache = profile_cache
+        self.fill_profile_cache = fill_profile_cache
+        # The service lives as long as the request, and so do the loaders and what they memoize.
+        # Both query the request's session, so their batches take turns
+        session_lock = asyncio.Lock()
+        self._users_by_id = DataLoader(self._load_users_by_id, lock=session_lock)
+        self._users_by_email = DataLoader(self._load_users_by_email, lock=session_lock)
 
     async def create_user(self, user: User) -> User:
         """
         Creates a new user if the email is unique.
         """
         try:
-            user = await self.user_repository.create(user)
-            return user
+            async with self.unit_of_work:
+                return await self.user_repository.create(user)
         except IntegrityError:
             logger.info(f"User with email {user.email} already exists.")
             raise UserAlreadyExistsException(f"User with email {user.email} already exists.")
 
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """
-        Retrieves a user by their email address.
+        Retrieves a user by their email address, from the profile cache when possible.
         """
-        return await self.user_repository.get_by_email(email)
+        if self.profile_cache is not None:
+            cached = await self.profile_cache.get(user_email_key(email))
+            if cached is not None:
+                return User.model_validate(cached)
+
+        user = await self.user_repository.get_by_email(email)
+        if user is not None and self.profile_cache is not None and self.fill_profile_cache:
+            await self.profile_cache.set(user_email_key(email), user.model_dump(mode="json"))
+            await self.profile_cache.set(user_cached_email_key(user.id), email)
+        return user
+
+    async def get_users_by_ids(self, user_ids: List[UUID]) -> Tuple[List[User], List[UUID]]:
+        """
+        Retrieves the users with the given IDs in a single query, memoized for the rest of the request.
+        Returns them in the order of their IDs, and the IDs of the users that weren't found.
+        """
+        loaded = await self._users_by_id.load_many(user_ids)
+        found = {user_id: user for user_id, user in zip(user_ids, loaded) if user is not None}
+        return self._in_order(user_ids, found, key=lambda user_id: user_id)
+
+    async def get_users_by_emails(self, emails: List[str]) -> Tuple[List[User], List[str]]:
+        """
+        Retrieves the users with the given email addresses, regardless of casing, in a single query memoized
+        like `get_users_by_ids`.
+        Returns them in the order of their emails, and the emails that didn't match a user.
+        """
+        lowered = [email.lower() for email in emails]
+        loaded = await self._users_by_email.load_many(lowered)
+        found = {email: user for email, user in zip(lowered, loaded) if user is not None}
+        return self._in_order(emails, found, key=str.lower)
 
     async def update_user(self, user_id: UUID, user: User) -> User:
         """
         Updates an existing user's information.
         """
         try:
-            return await self.user_repository.update(user_id, user)
+            async with self.unit_of_work:
+                updated_user = await self.user_repository.update(user_id, user)
         except IntegrityError:
             logger.info(f"User with email {user.email} already exists.")
             raise UserAlreadyExistsException(f"User with email {user.email} already exists.")
 
-    async def delete_user(self, user_id: UUID):
+        await self._invalidate_cache(user_id)
+        return updated_user
+
+    async def delete_user(self, user_id: UUID, batch_size: int, inline_limit: Optional[int] = None) -> bool:
+        """
+        Soft deletes a user by their ID, along with all messages sent by them, `batch_size` of them
+        (USER_DELETE_BATCH_SIZE in the app) per transaction.
+
+        The user is hidden right away. A user with at most `batch_size` messages is deleted together with
+        them in one transaction; otherwise the messages are deleted in batches afterwards, unless there are
+        more than `inline_limit` of them: the caller must then run `delete_user_messages`, e.g. in the background.
+        If that's interrupted, `PurgeWorker.finish_user_deletions` picks up the messages left.
+        Returns whether the messages were deleted too.
+        """
+        async with self.unit_of_work:
+            if not await self.user_repository.soft_delete(user_id):
+                logger.info(f"User with ID {user_id} not found.")
+                raise UserNotFoundException(f"User with ID {user_id} not found.")
+
+            remaining = await self.message_repository.get_by_sender_id_count(user_id)
+            if remaining <= batch_size:
+                await self.message_repository.soft_delete_by_sender_id(user_id)
+
+        # Invalidated as soon as the user is deleted so new messages from them are rejected
+        await self._invalidate_cache(user_id, deleted=True)
+
+        if remaining <= batch_size:
+            return True
+        if inline_limit is not None and remaining > inline_limit:
+            logger.info(f"Deferring deletion of the messages of user {user_id}.")
+            return False
+
+        await self.delete_user_messages(user_id, batch_size=batch_size)
+        return True
+
+    async def delete_user_messages(self, user_id: UUID, batch_size: int) -> int:
         """
-        Soft deletes a user by their ID, along with all messages sent by them.
+        Soft deletes all active messages of a user, `batch_size` rows per transaction.
+        Returns the number of deleted messages.
         """
-        user = await self.user_repository.get_by_id(user_id)
-        if not user:
-            logger.info(f"User with ID {user_id} not found.")
-            raise UserNotFoundException(f"User with ID {user_id} not found.")
+        deleted = 0
+        while True:
+            async with self.unit_of_work:
+                batch_deleted = await self.message_repository.soft_delete_batch_by_sender_id(user_id, batch_size)
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                return deleted
+
+    async def get_remaining_messages(self, user_id: UUID) -> int:
+        """
+        Returns how many active messages a deleted user has, i.e. how far the deletion of their messages has to go.
+        """
+        if not await self.user_repository.is_deleted(user_id):
+            raise UserNotFoundException(f"Deleted user with ID {user_id} not found.")
+        return await self.message_repository.get_by_sender_id_count(user_id)
+
+    async def _load_users_by_id(self, user_ids: List[UUID]) -> Dict[UUID, User]:
+        return {user.id: user for user in await self.user_repository.get_by_ids(user_ids)}
+
+    async def _load_users_by_email(self, emails: List[str]) -> Dict[str, User]:
+        return {user.email.lower(): user for user in await self.user_repository.get_by_emails(emails)}
+
+    @staticmethod
+    def _in_order(keys: list, found: dict, key: Callable) -> Tuple[List[User], list]:
+        """The found users in the order of the requested keys, once each, and the keys that weren't found."""
+        users, missing, seen = [], [], set()
+        for requested in dict.fromkeys(keys):
+            user = found.get(key(requested))
+            if user is None:
+                missing.append(requested)
+            elif user.id not in seen:
+                seen.add(user.id)
+                users.append(user)
+        return users, missing
 
-        await self.user_repository.soft_delete(user_id)
-        await self.message_repository.soft_delete_by_sender_id(sender_id=user_id)
+    async def _invalidate_cache(self, user_id: UUID, deleted: bool = False) -> None:
+        if self.user_cache is not None and deleted:
+            # A tombstone rather than a delete: a sender check that found the user just before the delete
+            # committed only adds missing keys, so it can't cache the user as existing again
+            await self.user_cache.set(user_exists_key(user_id), False)
+        elif self.user_cache is not None:
+            await self.user_cache.delete(user_exists_key(user_id))
+        if self.profile_cache is not None:
+            cached_email = await self.profile_cache.get(user_cached_email_key(user_id))
+            if cached_email is not None:
+                await self.profile_cache.delete(user_email_key(cached_email), user_cached_email_key(user_id))
@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.database.routing import record_write
+
+
+class UnitOfWork:
+    """
+    Transaction boundary of a service operation.
+
+    Repositories sharing the session only flush their changes; leaving the `async with` block
+    commits them all at once, or rolls them back if the block raised.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.session.commit()
+            # The client may read its write back right away, see PrimaryPinMiddleware
+            record_write()
+        else:
+            await self.session.rollback()
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.exceptions.message import MessageQueueFullException
+from src.domain.models import Message
+from src.infrastructure.database.routing import record_write
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindMetrics:
+    """Messages accepted, rejected, written and lost by the write-behind queue, in the Prometheus format."""
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.retries = 0
+        # From acceptance to commit, i.e. how long an accepted message could be lost by a crash
+        self.queued_seconds_total = 0.0
+        self.queued_seconds_max = 0.0
+        self.depth = 0
+
+    def record_flush(self, written: int, failed: int, queued_seconds: List[float]) -> None:
+        self.written += written
+        self.failed += failed
+        self.flushes += 1
+        self.queued_seconds_total += sum(queued_seconds)
+        self.queued_seconds_max = max(self.queued_seconds_max, *queued_seconds)
+
+    def render(self) -> str:
+        lines = []
+        for name, value, help_text in (
+            ("message_queue_accepted_total", self.accepted, "Messages accepted by the write-behind queue."),
+            ("message_queue_rejected_total", self.rejected, "Messages rejected because the queue was full."),
+            ("message_queue_written_total", self.written, "Queued messages committed to the database."),
+            ("message_queue_failed_total", self.failed, "Queued messages lost to a failed flush."),
+            ("message_queue_flushes_total", self.flushes, "Group commits of queued messages."),
+            ("message_queue_retries_total", self.retries, "Group commits retried after a failure."),
+            ("message_queue_queued_seconds_total", self.queued_seconds_total, "Time from acceptance to commit."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+        lines += [
+            "# HELP message_queue_depth Messages accepted and not committed yet.",
+            "# TYPE message_queue_depth gauge",
+            f"message_queue_depth {self.depth}",
+            "# HELP message_queue_queued_seconds_max Longest time from acceptance to commit so far.",
+            "# TYPE message_queue_queued_seconds_max gauge",
+            f"message_queue_queued_seconds_max {self.queued_seconds_max}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class MessageWriteBehindQueue:
+    """
+    Bounded in-process queue of validated messages, written by a background flusher that group-commits them:
+    a batch is flushed once it has `batch_size` messages or `flush_interval_seconds` after its first message.
+
+    Accepted messages live only in memory until their batch commits, so a crash loses them; `stop` flushes
+    everything on a graceful shutdown. A full queue rejects messages instead of letting memory grow.
+
+    A failed commit, e.g. a lost connection or a deadlock, is retried up to `max_attempts` times with exponential
+    backoff, during which the queue keeps filling up. A batch with a row the database rejects is split in halves
+    until that row is written alone, so only the bad rows are lost.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 0.05,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 0.1,
+        metrics: WriteBehindMetrics = None,
+    ):
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.metrics = metrics or WriteBehindMetrics()
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # Set when a full batch is waiting, or to flush right away on shutdown
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Starts the flusher on the running event loop."""
+        if self._flusher is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._batch_ready = asyncio.Event()
+        self._stopping = False
+        self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops accepting messages, waits until every accepted one is committed and stops the flusher."""
+        if self._flusher is None:
+            return
+        flusher, self._flusher = self._flusher, None
+        self._stopping = True
+        self._batch_ready.set()
+        await self._queue.join()
+        flusher.cancel()
+        try:
+            await flusher
+        except asyncio.CancelledError:
+            pass
+
+    def submit(self, message: Message) -> None:
+        if self._flusher is None:
+            raise RuntimeError("MessageWriteBehindQueue.submit called while the queue isn't running.")
+        try:
+            self._queue.put_nowait((message, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            raise MessageQueueFullException(f"Message queue is full ({self.max_size} messages waiting).")
+        self.metrics.accepted += 1
+        # Committed shortly, to the primary: the client reading it back should be pinned to it too
+        record_write()
+        self.metrics.depth = self._queue.qsize()
+        # The flusher holds the batch's first message out of the queue
+        if self._queue.qsize() + 1 >= self.batch_size:
+            self._batch_ready.set()
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Give the batch until the end of its window to fill up, unless it already has or we're stopping
+            if self._queue.qsize() + 1 < self.batch_size and not self._stopping:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Message, float]]) -> None:
+        try:
+            failed = await self._write([message for message, _ in batch])
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+        committed = time.perf_counter()
+        self.metrics.record_flush(len(batch) - failed, failed, [committed - accepted for _, accepted in batch])
+        self.metrics.depth = self._queue.qsize()
+
+    async def _write(self, messages: List[Message]) -> int:
+        """Commits the messages, returning how many of them couldn't be written."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                async with self.session_factory() as session, UnitOfWork(session):
+                    await MessageRepository(session).bulk_create(messages)
+                return 0
+            except (IntegrityError, DataError):
+                # The clients were already answered; all that can be done is to report the loss
+                if len(messages) == 1:
+                    logger.exception(f"Dropped queued message {messages[0].id} rejected by the database.")
+                    return 1
+                # Retrying the same rows fails the same way: isolate the bad ones instead
+                half = len(messages) // 2
+                return await self._write(messages[:half]) + await self._write(messages[half:])
+            except Exception:
+                if attempt == self.max_attempts:
+                    logger.exception(f"Failed to write {len(messages)} queued messages after {attempt} attempts.")
+                    return len(messages)
+                self.metrics.retries += 1
+                await asyncio.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
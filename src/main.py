@@ -1,14 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+
 import uvicorn
 from fastapi import FastAPI
 
+from src.api.internal_router import internal_router
 from src.api.message_router import message_router
+from src.api.metrics_router import metrics_router
+from src.api.middleware import IdempotencyMiddleware, PrimaryPinMiddleware, QueryTimingMiddleware
 from src.api.user_router import user_router
+from src.config import database, idempotency_store, message_write_behind, purge_metrics, query_metrics, settings
+from src.infrastructure.purge import PurgeWorker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Run in every worker process, so each one gets its own connection pools
+    database.open()
+    if message_write_behind is not None:
+        message_write_behind.start()
+    purge_task = None
+    if settings.purge_enabled:
+        # Each worker process purges; SKIP LOCKED keeps them from contending for the same rows
+        worker = PurgeWorker(
+            database.async_session,
+            retention=timedelta(days=settings.purge_retention_days),
+            batch_size=settings.purge_batch_size,
+            throttle_ratio=settings.purge_throttle_ratio,
+            metrics=purge_metrics,
+        )
+        purge_task = asyncio.create_task(worker.run_forever(settings.purge_interval_seconds))
+    yield
+    if purge_task is not None:
+        purge_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await purge_task
+    # Requests are drained by now: commit the messages they queued before the pools close
+    if message_write_behind is not None:
+        await message_write_behind.stop()
+    await database.close()
+
 
 # Define FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(user_router, prefix="/users", tags=["users"])
 app.include_router(message_router, prefix="/messages", tags=["messages"])
+app.include_router(internal_router, prefix="/internal", tags=["internal"])
+app.include_router(metrics_router, tags=["metrics"])
+
+app.add_middleware(PrimaryPinMiddleware, settings=settings)
+# Clients retry creations on timeouts; a replayed one is answered before reaching the database
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store, paths=["/users/", "/messages/"])
+app.add_middleware(QueryTimingMiddleware, metrics=query_metrics)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
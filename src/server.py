@@ -0,0 +1,37 @@
+"""
+Production entry point: serves the app from several worker processes.
+
+    python -m src.server
+
+Workers, event loop and HTTP parser come from the SERVER_* settings. Install uvloop and httptools
+(`pip install uvloop httptools`, not available on Windows) to have "auto" pick them up.
+"""
+import logging
+
+import uvicorn
+
+from src.config import server_workers, settings
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    workers = server_workers(settings)
+    logger.info(f"Starting {workers} workers with loop={settings.server_loop} and http={settings.server_http}.")
+    # The app is passed by import string so that each worker process imports it, and opens its own
+    # database pools in the lifespan
+    uvicorn.run(
+        "src.main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=workers,
+        loop=settings.server_loop,
+        http=settings.server_http,
+        timeout_graceful_shutdown=settings.server_graceful_shutdown_seconds,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
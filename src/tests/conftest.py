@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+import pytest
+
+from src.infrastructure.database.instrumentation import track_queries
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Fixture asserting that a block issues at most `max_statements` SQL statements:
+
+        with query_budget(2):
+            await client.get(...)
+    """
+
+    @contextmanager
+    def budget(max_statements: int):
+        with track_queries() as stats:
+            yield stats
+        assert stats.statements <= max_statements, (
+            f"{stats.statements} statements issued, over the budget of {max_statements}; "
+            f"slowest was {stats.slowest_operation}: {stats.slowest_statement}"
+        )
+
+    return budget
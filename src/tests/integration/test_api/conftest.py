@@ -0,0 +1,40 @@
+import os
+
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import SQLModel
+
+# The app reads its settings at import time; point it at a local SQLite database unless configured
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///api_test.db")
+for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "test")
+
+from src.config import database  # noqa: E402
+from src.main import app  # noqa: E402
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db():
+    """
+    Fixture creating the schema of the app's database for each test, and dropping it afterwards.
+    """
+    # The test client doesn't run the app's lifespan
+    database.open()
+    async with database.engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield
+    async with database.engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await database.close()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest_asyncio.fixture
+async def user(client):
+    response = await client.post("/users/", json={"name": "Test User", "email": "test@example.com"})
+    return response.json()
@@ -0,0 +1,153 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse
+
+from src.api.middleware import IdempotencyMiddleware
+from src.config import database, settings
+from src.infrastructure.cache import DatabaseCache, InMemoryCache
+
+
+def idempotency_headers() -> dict:
+    # The app's store is shared by the whole test session
+    return {"Idempotency-Key": str(uuid4())}
+
+
+@pytest.mark.asyncio
+async def test_retried_user_creation_is_replayed_without_queries(client, query_budget):
+    headers = idempotency_headers()
+    body = {"name": "Retry", "email": "retry@example.com"}
+    created = await client.post("/users/", json=body, headers=headers)
+
+    with query_budget(0):
+        replayed = await client.post("/users/", json=body, headers=headers)
+
+    assert created.status_code == replayed.status_code == 201
+    assert replayed.json() == created.json()
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in created.headers
+    # Without the key, the retry is a new request
+    assert (await client.post("/users/", json=body)).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_retried_message_creation_creates_one_message(client, user, query_budget):
+    headers = idempotency_headers()
+    body = {"sender_id": user["id"], "content": "Sent once"}
+    created = await client.post("/messages/", json=body, headers=headers)
+
+    with query_budget(0):
+        replayed = await client.post("/messages/", json=body, headers=headers)
+
+    assert replayed.json()["id"] == created.json()["id"]
+    assert (await client.get(f"/messages/sender/{user['id']}")).json()["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_key_reused_with_another_body_is_rejected(client, user):
+    headers = idempotency_headers()
+    await client.post("/messages/", json={"sender_id": user["id"], "content": "First"}, headers=headers)
+
+    response = await client.post("/messages/", json={"sender_id": user["id"], "content": "Second"}, headers=headers)
+
+    assert response.status_code == 422
+    assert (await client.get(f"/messages/sender/{user['id']}")).json()["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_stored(client, user):
+    headers = idempotency_headers()
+    body = {"sender_id": str(uuid4()), "content": "Unknown sender"}
+    assert (await client.post("/messages/", json=body, headers=headers)).status_code == 404
+
+    response = await client.post("/messages/", json=body, headers=headers)
+
+    assert response.status_code == 404
+    assert "Idempotent-Replayed" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_empty_key_is_rejected(client):
+    body = {"name": "Empty key", "email": "empty@example.com"}
+
+    assert (await client.post("/users/", json=body, headers={"Idempotency-Key": ""})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_replay_leaves_out_the_original_exchange_headers(client, monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 5)
+    headers = idempotency_headers()
+    body = {"name": "Headers", "email": "headers@example.com"}
+    created = await client.post("/users/", json=body, headers=headers)
+
+    replayed = await client.post("/users/", json=body, headers=headers)
+
+    assert "set-cookie" in created.headers
+    assert "set-cookie" not in replayed.headers
+    assert len(replayed.headers.get_list("server-timing")) == 1
+    assert 'desc="0 statements"' in replayed.headers["server-timing"]
+    assert replayed.headers["content-type"] == created.headers["content-type"]
+    assert replayed.headers["content-length"] == str(len(replayed.content))
+
+
+def _workers(endpoint, store) -> list:
+    """Clients of two app processes sharing the idempotency store."""
+    return [
+        AsyncClient(
+            transport=ASGITransport(app=IdempotencyMiddleware(endpoint, store=store, paths=["/things/"])),
+            base_url="http://test",
+        )
+        for _ in range(2)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_retry_on_another_worker_during_the_first_request_conflicts():
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = 0
+
+    async def endpoint(scope, receive, send):
+        nonlocal calls
+        calls += 1
+        started.set()
+        await release.wait()
+        await PlainTextResponse("created", status_code=201)(scope, receive, send)
+
+    first_worker, second_worker = _workers(endpoint, DatabaseCache(lambda: database.async_session()))
+    headers = {"Idempotency-Key": "same"}
+    first = asyncio.create_task(first_worker.post("/things/", content=b"thing", headers=headers))
+    await started.wait()
+    retry = await second_worker.post("/things/", content=b"thing", headers=headers)
+    release.set()
+    created = await first
+    replayed = await second_worker.post("/things/", content=b"thing", headers=headers)
+
+    assert retry.status_code == 409
+    assert created.status_code == replayed.status_code == 201
+    assert replayed.text == "created"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_request_releases_its_key():
+    outcomes = [RuntimeError("crashed"), PlainTextResponse("unavailable", status_code=503)]
+
+    async def endpoint(scope, receive, send):
+        outcome = outcomes.pop(0) if outcomes else PlainTextResponse("created", status_code=201)
+        if isinstance(outcome, Exception):
+            raise outcome
+        await outcome(scope, receive, send)
+
+    store = InMemoryCache()
+    first_worker, second_worker = _workers(endpoint, store)
+    headers = {"Idempotency-Key": "retried"}
+
+    with pytest.raises(RuntimeError):
+        await first_worker.post("/things/", content=b"thing", headers=headers)
+    assert (await second_worker.post("/things/", content=b"thing", headers=headers)).status_code == 503
+    created = await first_worker.post("/things/", content=b"thing", headers=headers)
+
+    assert created.status_code == 201
+    assert "Idempotent-Replayed" not in created.headers
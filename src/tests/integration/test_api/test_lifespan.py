@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import text
+
+from src.config import database
+from src.main import app, lifespan
+
+
+@pytest.mark.asyncio
+async def test_lifespan_opens_and_disposes_database():
+    await database.close()
+    with pytest.raises(RuntimeError):
+        database.engine
+
+    async with lifespan(app):
+        async with database.async_session() as session:
+            assert (await session.execute(text("SELECT 1"))).scalar_one() == 1
+
+    with pytest.raises(RuntimeError):
+        database.async_session
+    # Reopened for the teardown of setup_db
+    database.open()
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlmodel import SQLModel
+
+from src.config import database, get_message_write_behind, settings
+from src.infrastructure.database.routing import PRIMARY_PIN_COOKIE
+from src.infrastructure.write_behind import MessageWriteBehindQueue
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_create_user_budget(client, query_budget):
+    with query_budget(1):
+        response = await client.post("/users/", json={"name": "John Doe", "email": "john@example.com"})
+
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_email_budget(client, user, query_budget):
+    with query_budget(1):
+        response = await client.get(f"/users/email/{user['email']}")
+
+    assert response.json()["id"] == user["id"]
+
+
+@pytest.mark.asyncio
+async def test_create_message_budget(client, user, query_budget):
+    # Sender lookup, INSERT and the sender's counter bump
+    with query_budget(3):
+        response = await client.post("/messages/", json={"sender_id": user["id"], "content": "Hello"})
+
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_get_messages_by_sender_id_budget(client, user, query_budget):
+    for i in range(3):
+        await client.post("/messages/", json={"sender_id": user["id"], "content": f"Message {i}"})
+
+    # The page and the total count come back in the same statement
+    with query_budget(1):
+        response = await client.get(f"/messages/sender/{user['id']}", params={"limit": 2})
+
+    assert response.json()["count"] == 3
+    assert response.json()["messages"][0].keys() == {"id", "sender_id", "content"}
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_and_metrics(client, user):
+    response = await client.get(f"/users/email/{user['email']}")
+
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="1 statements"' in response.headers["Server-Timing"]
+
+    metrics = (await client.get("/metrics")).text
+    assert 'http_requests_total{route="/users/email/{email}"}' in metrics
+    assert 'db_statement_duration_seconds_count{operation="UserRepository.get_by_email"}' in metrics
+
+
+@pytest.mark.asyncio
+async def test_delete_message_budget(client, user, query_budget):
+    message = (await client.post("/messages/", json={"sender_id": user["id"], "content": "Hello"})).json()
+
+    # The conditional soft delete and the sender's counter, without loading the message first
+    with query_budget(2):
+        response = await client.delete(f"/messages/{message['id']}")
+
+    assert response.status_code == 204
+    assert (await client.delete(f"/messages/{message['id']}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_user_deletion_progress_budget(client, user, query_budget):
+    await client.post("/messages/", json={"sender_id": user["id"], "content": "Hello"})
+
+    assert (await client.get(f"/users/{user['id']}/deletion")).status_code == 404
+    assert (await client.get(f"/users/{uuid4()}/deletion")).status_code == 404
+
+    await client.delete(f"/users/{user['id']}")
+    # The user's deletion flag and their counter
+    with query_budget(2):
+        response = await client.get(f"/users/{user['id']}/deletion")
+
+    assert response.json() == {"remaining_messages": 0, "completed": True}
+
+
+@pytest.mark.asyncio
+async def test_time_window_bounds_with_a_utc_offset(client, user):
+    await client.post("/messages/", json={"sender_id": user["id"], "content": "Hello"})
+    now = datetime.now(timezone.utc)
+    path = f"/messages/sender/{user['id']}"
+
+    since_an_hour_ago = await client.get(
+        path, params={"created_after": f"{now - timedelta(hours=1):%Y-%m-%dT%H:%M:%S}Z"}
+    )
+    # An hour from now, written in UTC-05:00: compared as UTC, not as the local time it reads
+    in_an_hour = (now + timedelta(hours=1)).astimezone(timezone(timedelta(hours=-5))).isoformat()
+    later = await client.get(path, params={"created_after": in_an_hour})
+    streamed = await client.get(f"{path}/stream", params={"created_after": in_an_hour})
+
+    assert since_an_hour_ago.json()["count"] == 1
+    assert later.json()["messages"] == []
+    assert streamed.text == ""
+
+
+@pytest.mark.asyncio
+async def test_search_messages_budget(client, user, query_budget):
+    for content in ("Where is my parcel", "Parcel arrived", "Thanks"):
+        await client.post("/messages/", json={"sender_id": user["id"], "content": content})
+
+    with query_budget(1):
+        response = await client.get("/messages/search", params={"q": "parcel", "limit": 1})
+
+    assert response.status_code == 200
+    assert response.json()["messages"][0].keys() == {"id", "sender_id", "content", "rank"}
+    assert response.json()["next_cursor"] is not None
+    assert (await client.get("/messages/search", params={"q": "parcel", "cursor": "bad"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_user_lookups_budget(client, user, query_budget):
+    other = (await client.post("/users/", json={"name": "Jane Doe", "email": "jane@example.com"})).json()
+    unknown_id = "00000000-0000-0000-0000-000000000000"
+
+    with query_budget(1):
+        response = await client.get("/users/", params={"ids": [user["id"], other["id"], unknown_id]})
+
+    assert [found["id"] for found in response.json()["users"]] == [user["id"], other["id"]]
+    assert response.json()["missing"] == [unknown_id]
+
+    with query_budget(1):
+        response = await client.post("/users/by-emails", json={"emails": ["JANE@example.com", "nobody@example.com"]})
+
+    assert [found["id"] for found in response.json()["users"]] == [other["id"]]
+    assert response.json()["missing"] == ["nobody@example.com"]
+    assert (await client.get("/users/")).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_create_message_write_behind(client, user, query_budget):
+    queue = MessageWriteBehindQueue(lambda: database.async_session(), max_size=1, flush_interval_seconds=10)
+    queue.start()
+    app.dependency_overrides[get_message_write_behind] = lambda: queue
+    try:
+        # Only the sender lookup; the INSERT waits for the group commit
+        with query_budget(1):
+            response = await client.post("/messages/", json={"sender_id": user["id"], "content": "Queued"})
+        # The flusher holds the first message while its batch fills, so the queue takes one more
+        queued = await client.post("/messages/", json={"sender_id": user["id"], "content": "Also queued"})
+        full = await client.post("/messages/", json={"sender_id": user["id"], "content": "Rejected"})
+        await queue.stop()
+    finally:
+        del app.dependency_overrides[get_message_write_behind]
+
+    assert response.status_code == queued.status_code == 202
+    assert full.status_code == 429
+    assert full.headers["Retry-After"] == "1"
+    page = (await client.get(f"/messages/sender/{user['id']}")).json()
+    assert {message["id"] for message in page["messages"]} == {response.json()["id"], queued.json()["id"]}
+
+
+@pytest.mark.asyncio
+async def test_internal_endpoints_require_the_token(client, monkeypatch):
+    assert (await client.get("/internal/pool")).status_code == 404
+
+    monkeypatch.setattr(settings, "internal_api_token", "secret")
+
+    assert (await client.get("/internal/pool")).status_code == 403
+    assert (await client.get("/internal/pool", headers={"X-Internal-Token": "wrong"})).status_code == 403
+    response = await client.get("/internal/pool", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    assert [pool["name"] for pool in response.json()] == ["primary"]
+
+
+@pytest.mark.asyncio
+async def test_pool_status_covers_every_engine(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "internal_api_token", "secret")
+    monkeypatch.setattr(settings, "database_replica_urls", [f"sqlite+aiosqlite:///{tmp_path}/replica.db"])
+    await database.close()
+    database.open()
+    async with database.replica_engines[0].begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    await client.post("/users/", json={"name": "John Doe", "email": "john@example.com"})
+    read = await client.get("/users/email/john@example.com")
+    pools = (await client.get("/internal/pool", headers={"X-Internal-Token": "secret"})).json()
+    metrics = (await client.get("/metrics")).text
+    await database.close()
+    monkeypatch.setattr(settings, "database_replica_urls", [])
+    database.open()
+
+    # Not replicated to the stand-in replica, which served the read
+    assert read.status_code == 404
+    assert [(pool["name"], pool["checkouts"]) for pool in pools] == [("primary", 1), ("replica-1", 1)]
+    assert 'db_pool_checkouts_total{pool="replica-1"} 1' in metrics
+
+
+@pytest.mark.asyncio
+async def test_only_committed_writes_pin_the_client_to_the_primary(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 5)
+    monkeypatch.setattr(settings, "user_delete_batch_size", 1)
+    monkeypatch.setattr(settings, "user_delete_inline_limit", 1)
+    for content in ("First", "Second"):
+        await client.post("/messages/", json={"sender_id": user["id"], "content": content})
+    client.cookies.clear()
+
+    unknown_sender = await client.post("/messages/", json={"sender_id": str(uuid4()), "content": "Lost"})
+    read = await client.get(f"/users/email/{user['email']}")
+    # Deferred deletion of the messages, answered with the endpoint's own response
+    deleted = await client.delete(f"/users/{user['id']}")
+
+    assert unknown_sender.status_code == 404 and "set-cookie" not in unknown_sender.headers
+    assert "set-cookie" not in read.headers
+    assert deleted.status_code == 202
+    assert PRIMARY_PIN_COOKIE in deleted.headers["set-cookie"]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_pins_the_client_to_the_primary(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 5)
+    queue = MessageWriteBehindQueue(lambda: database.async_session())
+    queue.start()
+    app.dependency_overrides[get_message_write_behind] = lambda: queue
+    try:
+        response = await client.post("/messages/", json={"sender_id": user["id"], "content": "Queued"})
+        await queue.stop()
+    finally:
+        del app.dependency_overrides[get_message_write_behind]
+
+    assert response.status_code == 202
+    assert PRIMARY_PIN_COOKIE in response.headers["set-cookie"]
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.infrastructure.cache import CacheEntry, DatabaseCache
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/cache.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _expire(session_factory, *keys: str) -> None:
+    async with session_factory() as session:
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        await session.execute(update(CacheEntry).where(CacheEntry.key.in_(keys)).values(expires_at=expired))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_get_set_delete(session_factory):
+    cache = DatabaseCache(session_factory, prefix="test:")
+
+    await cache.set("key", {"status": 201})
+    await cache.set("key", {"status": 202})
+    assert await cache.get("key") == {"status": 202}
+
+    await cache.delete("key", "missing")
+    assert await cache.get("key") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_missing_then_evicted(session_factory):
+    cache = DatabaseCache(session_factory, eviction_interval=3)
+    await cache.set("old", 1)
+    await cache.set("older", 2)
+    await _expire(session_factory, "old", "older")
+
+    assert await cache.get("old") is None
+    await cache.set("new", 3)
+
+    async with session_factory() as session:
+        assert (await session.execute(select(func.count()).select_from(CacheEntry))).scalar_one() == 1
+    assert cache.stats()["evictions"] == 2
+    assert await cache.get("new") == 3
+
+
+@pytest.mark.asyncio
+async def test_add_only_stores_missing_or_expired_keys(session_factory):
+    cache = DatabaseCache(session_factory)
+
+    assert await cache.add("key", 1) is True
+    assert await cache.add("key", 2) is False
+    await _expire(session_factory, "key")
+    assert await cache.add("key", 3) is True
+    assert await cache.get("key") == 3
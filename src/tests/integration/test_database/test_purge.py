@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+from src.infrastructure.purge import PurgeMetrics, PurgeWorker
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/purge.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _count(session_factory, model):
+    async with session_factory() as session:
+        return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_purge_removes_expired_rows_messages_before_their_sender(session_factory):
+    async with session_factory() as session, UnitOfWork(session):
+        users, messages = UserRepository(session), MessageRepository(session)
+        deleted = await users.create(User(name="Deleted", email="deleted@example.com"))
+        active = await users.create(User(name="Active", email="active@example.com"))
+        await messages.bulk_create([Message(sender_id=deleted.id, content=f"Old {i}") for i in range(5)])
+        kept = await messages.create(Message(sender_id=active.id, content="Kept"))
+        await messages.soft_delete_by_sender_id(deleted.id)
+        await users.soft_delete(deleted.id)
+
+    worker = PurgeWorker(session_factory, retention=timedelta(days=30), batch_size=2, throttle_ratio=0)
+
+    # Still within the retention window
+    assert await worker.run_once() == {"MESSAGE": 0, "USER": 0}
+
+    assert await worker.run_once(now=datetime.utcnow() + timedelta(days=31)) == {"MESSAGE": 5, "USER": 1}
+    assert await _count(session_factory, Message) == 1
+    assert await _count(session_factory, User) == 1
+    async with session_factory() as session:
+        assert await MessageRepository(session).exists(kept.id)
+
+
+@pytest.mark.asyncio
+async def test_user_with_remaining_messages_is_not_purged(session_factory):
+    async with session_factory() as session, UnitOfWork(session):
+        user = await UserRepository(session).create(User(name="Deleted", email="deleted@example.com"))
+        await MessageRepository(session).create(Message(sender_id=user.id, content="Not deleted yet"))
+        await UserRepository(session).soft_delete(user.id)
+
+    async with session_factory() as session, UnitOfWork(session):
+        purged = await UserRepository(session).purge_deleted_batch(datetime.utcnow() + timedelta(days=1), 10)
+
+    assert purged == 0
+    assert await _count(session_factory, User) == 1
+
+
+@pytest.mark.asyncio
+async def test_purge_goes_oldest_first_in_batches_and_records_metrics(session_factory):
+    now = datetime.utcnow()
+    async with session_factory() as session, UnitOfWork(session):
+        user = await UserRepository(session).create(User(name="Sender", email="sender@example.com"))
+        created = await MessageRepository(session).bulk_create(
+            [Message(sender_id=user.id, content=f"Message {i}") for i in range(5)]
+        )
+        for days, message in enumerate(created):
+            await session.execute(
+                update(Message)
+                .where(Message.id == message.id)
+                .values(is_deleted=True, deleted_at=now - timedelta(days=days))
+            )
+
+    async with session_factory() as session, UnitOfWork(session):
+        assert await MessageRepository(session).purge_deleted_batch(now, batch_size=2) == 2
+    async with session_factory() as session:
+        remaining = (await session.execute(select(Message.content).order_by(Message.content))).scalars().all()
+    assert remaining == ["Message 0", "Message 1", "Message 2"]
+
+    metrics = PurgeMetrics()
+    worker = PurgeWorker(session_factory, retention=timedelta(0), batch_size=2, throttle_ratio=0, metrics=metrics)
+    await worker.run_once(now=now + timedelta(seconds=1))
+
+    rendered = metrics.render()
+    assert 'purge_rows_total{table="MESSAGE"} 3' in rendered
+    # A full batch, then a partial one telling the worker it's done
+    assert 'purge_batches_total{table="MESSAGE"} 2' in rendered
+    assert "purge_last_run_timestamp_seconds" in rendered
+
+
+@pytest.mark.asyncio
+async def test_interrupted_user_deletion_is_finished_by_the_next_pass(session_factory):
+    async with session_factory() as session, UnitOfWork(session):
+        users, messages = UserRepository(session), MessageRepository(session)
+        deleted = await users.create(User(name="Deleted", email="deleted@example.com"))
+        active = await users.create(User(name="Active", email="active@example.com"))
+        await messages.bulk_create([Message(sender_id=deleted.id, content=f"Left {i}") for i in range(5)])
+        await messages.create(Message(sender_id=active.id, content="Kept"))
+        # Deleted without its messages, as when the deferred deletion never ran
+        await users.soft_delete(deleted.id)
+
+    worker = PurgeWorker(session_factory, retention=timedelta(days=30), batch_size=2, throttle_ratio=0)
+    await worker.run_once()
+
+    async with session_factory() as session:
+        messages = MessageRepository(session)
+        assert await messages.get_by_sender_id_count(deleted.id) == 0
+        assert await messages.get_by_sender_id_count(active.id) == 1
+        assert await UserRepository(session).get_deleted_ids_with_active_messages(10) == []
+    assert await worker.finish_user_deletions() == 0
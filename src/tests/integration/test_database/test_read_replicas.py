@@ -0,0 +1,40 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.models import User
+from src.infrastructure.database.routing import ReadSessionRouter
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+
+
+@pytest_asyncio.fixture
+async def router(tmp_path):
+    """
+    Fixture routing between two independent SQLite databases standing in for a primary and a replica.
+    """
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/{name}.db") for name in ("primary", "replica")]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    primary, replica = [sessionmaker(bind=e, class_=AsyncSession, expire_on_commit=False) for e in engines]
+    yield ReadSessionRouter(primary=primary, replicas=[replica])
+
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_unless_pinned(router):
+    async with router.primary() as session, UnitOfWork(session):
+        user = await UserRepository(session).create(User(name="Written", email="written@example.com"))
+
+    async with router.session_factory()() as session:
+        # Not replicated to the stand-in, so only the primary knows the user
+        assert await UserRepository(session).get_by_email(user.email) is None
+
+    async with router.session_factory(pinned_to_primary=True)() as session:
+        assert (await UserRepository(session).get_by_email(user.email)).id == user.id
@@ -0,0 +1,128 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.domain.exceptions.message import MessageQueueFullException
+from src.domain.models import Message, User
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.unit_of_work import UnitOfWork
+from src.infrastructure.write_behind import MessageWriteBehindQueue
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/write_behind.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def sender(session_factory):
+    async with session_factory() as session, UnitOfWork(session):
+        return await UserRepository(session).create(User(name="Sender", email="sender@example.com"))
+
+
+async def _stored(session_factory, sender):
+    async with session_factory() as session:
+        count = (await session.execute(select(func.count()).select_from(Message))).scalar_one()
+        message_count = (await session.execute(select(User.message_count).where(User.id == sender.id))).scalar_one()
+    return count, message_count
+
+
+@pytest.mark.asyncio
+async def test_stop_group_commits_every_accepted_message(session_factory, sender):
+    queue = MessageWriteBehindQueue(session_factory, batch_size=3, flush_interval_seconds=10)
+    queue.start()
+
+    for i in range(7):
+        queue.submit(Message(sender_id=sender.id, content=f"Queued {i}"))
+    await queue.stop()
+
+    assert await _stored(session_factory, sender) == (7, 7)
+    # Two full batches, then the rest flushed by the shutdown instead of the distant time window
+    assert queue.metrics.flushes == 3
+    assert queue.metrics.written == queue.metrics.accepted == 7
+    assert queue.metrics.depth == 0
+    rendered = queue.metrics.render()
+    assert "message_queue_written_total 7" in rendered
+    assert f"message_queue_queued_seconds_max {queue.metrics.queued_seconds_max}" in rendered
+    assert queue.metrics.queued_seconds_max > 0
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_flushed_after_the_interval(session_factory, sender):
+    queue = MessageWriteBehindQueue(session_factory, batch_size=100, flush_interval_seconds=0.01)
+    queue.start()
+
+    queue.submit(Message(sender_id=sender.id, content="Alone"))
+    for _ in range(100):
+        if queue.metrics.written:
+            break
+        await asyncio.sleep(0.01)
+
+    assert await _stored(session_factory, sender) == (1, 1)
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_messages(session_factory, sender):
+    queue = MessageWriteBehindQueue(session_factory, max_size=2)
+    queue.start()
+
+    queue.submit(Message(sender_id=sender.id, content="First"))
+    queue.submit(Message(sender_id=sender.id, content="Second"))
+    with pytest.raises(MessageQueueFullException):
+        queue.submit(Message(sender_id=sender.id, content="Third"))
+    await queue.stop()
+
+    assert queue.metrics.rejected == 1
+    assert await _stored(session_factory, sender) == (2, 2)
+    with pytest.raises(RuntimeError):
+        queue.submit(Message(sender_id=sender.id, content="After shutdown"))
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_is_retried(session_factory, sender):
+    bulk_create = MessageRepository.bulk_create
+    attempts = 0
+
+    async def flaky_bulk_create(repository, messages):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise OperationalError("INSERT", {}, Exception("connection reset"))
+        return await bulk_create(repository, messages)
+
+    queue = MessageWriteBehindQueue(session_factory, batch_size=3, retry_backoff_seconds=0)
+    queue.start()
+    with patch.object(MessageRepository, "bulk_create", flaky_bulk_create):
+        for i in range(3):
+            queue.submit(Message(sender_id=sender.id, content=f"Retried {i}"))
+        await queue.stop()
+
+    assert await _stored(session_factory, sender) == (3, 3)
+    assert (queue.metrics.retries, queue.metrics.written, queue.metrics.failed) == (1, 3, 0)
+
+
+@pytest.mark.asyncio
+async def test_rejected_row_only_loses_itself(session_factory, sender):
+    queue = MessageWriteBehindQueue(session_factory, batch_size=5, flush_interval_seconds=10)
+    queue.start()
+
+    for i in range(5):
+        # content is NOT NULL
+        queue.submit(Message(sender_id=sender.id, content=None if i == 3 else f"Queued {i}"))
+    await queue.stop()
+
+    assert await _stored(session_factory, sender) == (4, 4)
+    assert (queue.metrics.retries, queue.metrics.written, queue.metrics.failed) == (0, 4, 1)
@@ -1,10 +1,12 @@
 import pytest_asyncio
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from sqlmodel import SQLModel
 
 from src.domain.models import User, Message
+from src.infrastructure.repositories.message import MessageRepository
 
 # Use an SQLite in-memory database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///test.db"
@@ -33,10 +35,21 @@ async def setup_db():
         await conn.run_sync(SQLModel.metadata.drop_all)
 
 
-@pytest_asyncio.fixture(scope="session")
+@pytest_asyncio.fixture
+def session_factory():
+    """
+    Fixture exposing the session factory, for tests that need several concurrent sessions.
+    """
+    return AsyncSessionLocal
+
+
+@pytest_asyncio.fixture
 async def session_fixture() -> AsyncSession:
     """
     Fixture to create a new session for each test.
+
+    Function scoped, like `setup_db`: repositories only flush, so a session shared by the whole run carried
+    one test's uncommitted rows, or its failed transaction, into the next tests, e.g. a duplicate user email.
     """
     async with AsyncSessionLocal() as session:
 
@@ -44,6 +57,22 @@ async def session_fixture() -> AsyncSession:
         await session.rollback()  # Rollback after test for isolation
 
 
+@pytest_asyncio.fixture
+def statements():
+    """
+    Fixture recording the SQL statements sent to the database, to assert the round trips of a call.
+    Clear it once the other fixtures have run.
+    """
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
 @pytest_asyncio.fixture
 async def user(session_fixture):
     # Create a test user
@@ -75,9 +104,8 @@ async def messages(session_fixture, user):
 
     for i in range(10):
         new_message = Message(sender_id=user.id, content=f"Message {i} content", cceated_at="2024-10-22T12:00:00")
-        session_fixture.add(new_message)
-        await session_fixture.commit()
-        await session_fixture.refresh(new_message)
-        message_list.append(new_message)
+        # Created through the repository so the sender's message counter is maintained
+        message_list.append(await MessageRepository(session_fixture).create(new_message))
+    await session_fixture.commit()
 
     yield message_list
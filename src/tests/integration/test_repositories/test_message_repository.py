@@ -1,17 +1,29 @@
+import asyncio
+import tracemalloc
+from datetime import datetime
+from unittest.mock import patch
+
 import pytest
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 
-from src.domain.models import Message
+from src.domain.exceptions.pagination import InvalidCursorException
+from src.domain.models import Message, MessageRow, User
 from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.pagination import encode_cursor, encode_search_cursor
+from src.infrastructure.unit_of_work import UnitOfWork
 
 
 @pytest.mark.asyncio
-async def test_create_message(session_fixture, user):
+async def test_create_message(session_fixture, user, statements):
     message_repo = MessageRepository(session_fixture)
     new_message = Message(sender_id=user.id, content="Lorem ipsum")
+    statements.clear()
 
     created_message = await message_repo.create(new_message)
 
+    # The INSERT ... RETURNING and the sender's counter bump, no refresh
+    assert [statement.split()[0] for statement in statements] == ["INSERT", "UPDATE"]
+    assert "RETURNING" in statements[0]
     assert created_message.id is not None
     assert created_message.sender_id == user.id
     assert created_message.content == "Lorem ipsum"
@@ -38,6 +50,17 @@ async def test_soft_delete_message(session_fixture, messages):
     assert deleted_user is None
 
 
+@pytest.mark.asyncio
+async def test_soft_delete_records_deleted_at(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+
+    await message_repo.soft_delete(messages[0].id)
+    await message_repo.soft_delete_by_sender_id(user.id)
+
+    deleted_at = (await session_fixture.execute(select(Message.deleted_at))).scalars().all()
+    assert len(deleted_at) == 10 and None not in deleted_at
+
+
 @pytest.mark.asyncio
 async def test_get_by_sender_id_with_pagination(session_fixture, user, messages):
     message_repo = MessageRepository(session_fixture)
@@ -88,3 +111,278 @@ async def test_get_by_sender_id_with_count(session_fixture, user, messages):
     result = await message_repo.get_by_sender_id_count(sender_id=user.id)
 
     assert result == 10
+
+
+@pytest.mark.asyncio
+async def test_get_by_sender_id_with_cursor(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+
+    first_page = await message_repo.get_by_sender_id(sender_id=user.id, limit=4)
+    cursor = encode_cursor(first_page[-1].created_at, first_page[-1].id)
+    second_page = await message_repo.get_by_sender_id(sender_id=user.id, limit=4, cursor=cursor)
+
+    assert first_page == messages[:4]
+    assert second_page == messages[4:8]
+
+
+@pytest.mark.asyncio
+async def test_get_by_sender_id_within_time_window(session_fixture, user):
+    message_repo = MessageRepository(session_fixture)
+    months = [datetime(2024, month, 15) for month in (1, 2, 3, 4)]
+    created = await message_repo.bulk_create(
+        [Message(sender_id=user.id, content=f"Month {i}", created_at=month) for i, month in enumerate(months)]
+    )
+
+    window = {"created_after": datetime(2024, 2, 1), "created_before": datetime(2024, 4, 1)}
+    in_window = await message_repo.get_by_sender_id(user.id, **window)
+    _, rows = await message_repo.get_page_by_sender_id(user.id, include_count=False, **window)
+    streamed = [message async for message in message_repo.stream_by_sender_id(user.id, **window)]
+
+    assert in_window == streamed == created[1:3]
+    assert [row.id for row in rows] == [message.id for message in created[1:3]]
+
+
+@pytest.mark.asyncio
+async def test_get_by_sender_id_with_invalid_cursor(session_fixture, user):
+    message_repo = MessageRepository(session_fixture)
+
+    with pytest.raises(InvalidCursorException):
+        await message_repo.get_by_sender_id(sender_id=user.id, cursor="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_get_page_by_sender_id(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+
+    count, page = await message_repo.get_page_by_sender_id(sender_id=user.id, limit=3, offset=2)
+
+    assert count == 10
+    assert page == [MessageRow(m.id, m.sender_id, m.content, m.created_at) for m in messages[2:5]]
+
+
+@pytest.mark.asyncio
+async def test_get_page_by_sender_id_past_last_page(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+
+    count, page = await message_repo.get_page_by_sender_id(sender_id=user.id, limit=5, offset=20)
+
+    assert count == 10
+    assert page == []
+
+
+@pytest.mark.asyncio
+async def test_get_page_by_sender_id_without_count(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+
+    count, page = await message_repo.get_page_by_sender_id(sender_id=user.id, limit=5, include_count=False)
+
+    assert count is None
+    assert [row.id for row in page] == [message.id for message in messages[:5]]
+
+
+async def _count_active_messages(session, sender_id):
+    query = (
+        select(func.count())
+        .select_from(Message)
+        .where(Message.sender_id == sender_id, Message.is_deleted == False)  # noqa
+    )
+    return (await session.execute(query)).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_sender_count_follows_creates_and_deletes(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+
+    await message_repo.create(Message(sender_id=user.id, content="One more"))
+    await message_repo.soft_delete(messages[0].id)
+    await message_repo.soft_delete(messages[0].id)  # Already deleted, must not be counted twice
+    await message_repo.hard_delete(messages[1].id)
+
+    assert await message_repo.get_by_sender_id_count(sender_id=user.id) == 9
+
+    await message_repo.soft_delete_by_sender_id(sender_id=user.id)
+
+    assert await message_repo.get_by_sender_id_count(sender_id=user.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_sender_count_under_concurrent_creates_and_deletes(session_factory, session_fixture, user, messages):
+    async def create(i):
+        async with session_factory() as session, UnitOfWork(session):
+            await MessageRepository(session).create(Message(sender_id=user.id, content=f"Concurrent {i}"))
+
+    async def delete(message):
+        async with session_factory() as session, UnitOfWork(session):
+            await MessageRepository(session).soft_delete(message.id)
+
+    # Every message is deleted twice to race duplicate deletes as well
+    await asyncio.gather(*[create(i) for i in range(20)], *[delete(message) for message in messages[:5] * 2])
+
+    async with session_factory() as session:
+        assert await MessageRepository(session).get_by_sender_id_count(user.id) == 25
+        assert await _count_active_messages(session, user.id) == 25
+
+
+@pytest.mark.asyncio
+async def test_rebuild_sender_counts(session_fixture, users, user, messages):
+    message_repo = MessageRepository(session_fixture)
+    await session_fixture.execute(update(User).values(message_count=42))
+    await session_fixture.commit()
+
+    batches, last_id = [], None
+    while user_ids := await message_repo.rebuild_sender_counts_batch(last_id, batch_size=4):
+        batches.append(len(user_ids))
+        last_id = user_ids[-1]
+
+    assert batches == [4, 2]
+    assert await message_repo.get_by_sender_id_count(sender_id=user.id) == 10
+    assert await message_repo.get_by_sender_id_count(sender_id=users[0].id) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_create(session_fixture, users):
+    message_repo = MessageRepository(session_fixture)
+    new_messages = [Message(sender_id=users[i % 2].id, content=f"Bulk {i}") for i in range(5)]
+
+    created = await message_repo.bulk_create(new_messages)
+
+    assert created == new_messages
+    assert await message_repo.get_by_sender_id(users[0].id) == new_messages[0::2]
+    assert await message_repo.get_by_sender_id_count(users[0].id) == 3
+    assert await message_repo.get_by_sender_id_count(users[1].id) == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_updates_senders_in_id_order(session_fixture, users):
+    message_repo = MessageRepository(session_fixture)
+    senders = sorted(users, key=lambda user: user.id, reverse=True)
+
+    with patch.object(session_fixture, "execute", wraps=session_fixture.execute) as execute:
+        await message_repo.bulk_create([Message(sender_id=sender.id, content="Bulk") for sender in senders])
+
+    counter_updates = execute.await_args_list[-1].args[1]
+    assert [update["sender"] for update in counter_updates] == sorted(user.id for user in users)
+
+
+@pytest.mark.asyncio
+async def test_stream_by_sender_id(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+    await message_repo.soft_delete(messages[3].id)
+
+    streamed = [message async for message in message_repo.stream_by_sender_id(user.id, batch_size=4)]
+
+    assert streamed == messages[:3] + messages[4:]
+
+
+@pytest.mark.asyncio
+async def test_stream_by_sender_id_memory_stays_bounded(session_fixture, user):
+    message_repo = MessageRepository(session_fixture)
+    content = "x" * 1000
+    for _ in range(10):
+        await message_repo.bulk_create([Message(sender_id=user.id, content=content) for _ in range(1000)])
+
+    tracemalloc.start()
+    streamed = 0
+    async for _ in message_repo.stream_by_sender_id(user.id, batch_size=500):
+        streamed += 1
+    _, streaming_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    materialized = await message_repo.get_by_sender_id(user.id)
+    _, materialized_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert streamed == len(materialized) == 10000
+    # Peak memory is bounded by the batch, not by the sender's 10MB of content
+    assert streaming_peak < materialized_peak / 4
+
+
+@pytest.mark.asyncio
+async def test_soft_delete_batch_by_sender_id(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+    await message_repo.soft_delete(messages[0].id)
+
+    deleted_batches = [await message_repo.soft_delete_batch_by_sender_id(user.id, batch_size=4) for _ in range(4)]
+
+    # The already deleted message isn't touched again
+    assert deleted_batches == [4, 4, 1, 0]
+    assert await message_repo.get_by_sender_id_count(user.id) == 0
+    assert await _count_active_messages(session_fixture, user.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_overlapping_batch_deletes_count_each_message_once(session_factory, session_fixture, user, messages):
+    async def delete_all():
+        deleted = 0
+        while True:
+            async with session_factory() as session, UnitOfWork(session):
+                batch = await MessageRepository(session).soft_delete_batch_by_sender_id(user.id, batch_size=3)
+            deleted += batch
+            if batch < 3:
+                return deleted
+
+    # Like the background deletion of a user's messages and the purge worker picking them up
+    assert sum(await asyncio.gather(delete_all(), delete_all())) == 10
+    # A run started after the first one finished changes nothing
+    assert await delete_all() == 0
+
+    async with session_factory() as session:
+        assert await MessageRepository(session).get_by_sender_id_count(user.id) == 0
+        assert await _count_active_messages(session, user.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_rolls_back_every_repository_write(session_fixture, user, messages):
+    message_repo = MessageRepository(session_fixture)
+    # The rollback expires every loaded object, so keep the plain id around
+    sender_id = user.id
+
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(session_fixture):
+            await message_repo.create(Message(sender_id=sender_id, content="Rolled back"))
+            await message_repo.soft_delete(messages[0].id)
+            raise RuntimeError
+
+    # Neither the messages nor the sender's counter kept any of the writes
+    assert await _count_active_messages(session_fixture, sender_id) == 10
+    assert await message_repo.get_by_sender_id_count(sender_id=sender_id) == 10
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_matches_of_every_word(session_fixture, users):
+    message_repo = MessageRepository(session_fixture)
+    best, other_sender, weaker, _ = await message_repo.bulk_create(
+        [
+            Message(sender_id=users[0].id, content="Refund refund please"),
+            Message(sender_id=users[1].id, content="Refund please, order 42"),
+            Message(sender_id=users[0].id, content="Please process my refund for the broken order"),
+            Message(sender_id=users[0].id, content="Please call me back"),
+        ]
+    )
+    deleted = await message_repo.create(Message(sender_id=users[0].id, content="refund please"))
+    await message_repo.soft_delete(deleted.id)
+
+    results = await message_repo.search("REFUND please")
+    scoped = await message_repo.search("refund please", sender_id=users[0].id)
+
+    assert [result.id for result in results] == [best.id, other_sender.id, weaker.id]
+    assert results[0].rank > results[1].rank > results[2].rank
+    assert [result.id for result in scoped] == [best.id, weaker.id]
+    assert await message_repo.search("refund shipping") == []
+
+
+@pytest.mark.asyncio
+async def test_search_keyset_pagination(session_fixture, user):
+    message_repo = MessageRepository(session_fixture)
+    created = await message_repo.bulk_create(
+        [Message(sender_id=user.id, content=f"Invoice number {i}") for i in range(5)]
+    )
+
+    pages, cursor = [], None
+    while page := await message_repo.search("invoice", limit=2, cursor=cursor):
+        pages.append([result.id for result in page])
+        cursor = encode_search_cursor(page[-1].rank, page[-1].created_at, page[-1].id)
+
+    # Equal ranks fall back to (created_at, id) order
+    assert pages == [[m.id for m in created[0:2]], [m.id for m in created[2:4]], [created[4].id]]
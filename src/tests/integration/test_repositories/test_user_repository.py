@@ -1,18 +1,27 @@
+import asyncio
+from uuid import uuid4
+
 import pytest
 
 from sqlalchemy.exc import IntegrityError
 
 from src.domain.models import User
+from src.infrastructure.repositories.message import MessageRepository
 from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.services.user_service import UserService
+from src.infrastructure.unit_of_work import UnitOfWork
 
 
 @pytest.mark.asyncio
-async def test_create_user(session_fixture):
+async def test_create_user(session_fixture, statements):
     user_repo = UserRepository(session_fixture)
     new_user = User(name="John Doe", email="john@example.com")
 
     created_user = await user_repo.create(new_user)
 
+    # A single INSERT ... RETURNING, no refresh
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT") and "RETURNING" in statements[0]
     assert created_user.id is not None
     assert created_user.name == "John Doe"
     assert created_user.email == "john@example.com"
@@ -87,12 +96,16 @@ async def test_list_active_users(session_fixture, users):
 
 
 @pytest.mark.asyncio
-async def test_update_user(session_fixture, user):
+async def test_update_user(session_fixture, user, statements):
     user_repo = UserRepository(session_fixture)
     user.name = "New name"
+    statements.clear()
 
     updated_user = await user_repo.update(user.id, user)
 
+    # A single UPDATE ... RETURNING, no fetch or re-select
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE") and "RETURNING" in statements[0]
     assert updated_user.id == user.id
     assert updated_user.name == "New name"
     assert updated_user.email == user.email
@@ -118,3 +131,111 @@ async def test_create_user_unique_violation_email(session_fixture, user):
 
     with pytest.raises(IntegrityError):
         await user_repo.create(new_user)
+
+
+@pytest.mark.asyncio
+async def test_create_user_unique_violation_email_other_casing(session_fixture, user):
+    user_repo = UserRepository(session_fixture)
+    new_user = User(name="John Doe", email=user.email.upper())
+
+    with pytest.raises(IntegrityError):
+        await user_repo.create(new_user)
+
+
+@pytest.mark.asyncio
+async def test_get_by_email_ignores_casing(session_fixture, user, statements):
+    user_repo = UserRepository(session_fixture)
+    statements.clear()
+
+    result = await user_repo.get_by_email("Test@Example.COM")
+
+    assert result.id == user.id
+    # Keeps the casing it was created with
+    assert result.email == "test@example.com"
+    assert "lower" in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_get_existing_ids(session_fixture, users):
+    user_repo = UserRepository(session_fixture)
+    await user_repo.soft_delete(users[1].id)
+    unknown_id = uuid4()
+
+    existing_ids = await user_repo.get_existing_ids([users[0].id, users[1].id, unknown_id])
+
+    assert existing_ids == {users[0].id}
+
+
+@pytest.mark.asyncio
+async def test_update_deleted_user(session_fixture, user):
+    user_repo = UserRepository(session_fixture)
+    await user_repo.soft_delete(user.id)
+
+    assert await user_repo.update(user.id, User(name="New name", email=user.email)) is None
+
+
+@pytest.mark.asyncio
+async def test_exists(session_fixture, users):
+    user_repo = UserRepository(session_fixture)
+    await user_repo.soft_delete(users[1].id)
+
+    assert await user_repo.exists(users[0].id) is True
+    assert await user_repo.exists(users[1].id) is False
+    assert await user_repo.exists(uuid4()) is False
+
+
+@pytest.mark.asyncio
+async def test_get_columns_by_id(session_fixture, user):
+    user_repo = UserRepository(session_fixture)
+
+    row = await user_repo.get_columns_by_id(user.id, User.id, User.email)
+
+    assert tuple(row) == (user.id, user.email)
+    assert await user_repo.get_columns_by_id(uuid4(), User.id) is None
+
+
+@pytest.mark.asyncio
+async def test_soft_delete_is_one_conditional_update(session_fixture, user, statements):
+    user_repo = UserRepository(session_fixture)
+    statements.clear()
+
+    assert await user_repo.soft_delete(user.id) is True
+    # Already deleted: nothing to delete the second time
+    assert await user_repo.soft_delete(user.id) is False
+
+    assert [statement.split()[0] for statement in statements] == ["UPDATE", "UPDATE"]
+    assert "RETURNING" in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_get_by_ids_and_emails(session_fixture, users, statements):
+    user_repo = UserRepository(session_fixture)
+    await user_repo.soft_delete(users[2].id)
+    statements.clear()
+
+    by_ids = await user_repo.get_by_ids([users[0].id, users[2].id, users[1].id, uuid4()])
+    by_emails = await user_repo.get_by_emails(["USER0@example.com", "user1@example.com", "nobody@example.com"])
+
+    assert len(statements) == 2
+    assert {user.id for user in by_ids} == {users[0].id, users[1].id}
+    assert {user.id for user in by_emails} == {users[0].id, users[1].id}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_service_lookups_take_turns_on_the_session(session_fixture, users):
+    service = UserService(
+        user_repository=UserRepository(session_fixture),
+        message_repository=MessageRepository(session_fixture),
+        unit_of_work=UnitOfWork(session_fixture),
+    )
+
+    # Ends the fixtures' transaction: each batch would start one on the session, which rejects concurrent operations
+    await session_fixture.commit()
+    (by_ids, _), (by_emails, missing) = await asyncio.gather(
+        service.get_users_by_ids([users[0].id, users[1].id]),
+        service.get_users_by_emails(["USER2@example.com", "nobody@example.com"]),
+    )
+
+    assert [user.id for user in by_ids] == [users[0].id, users[1].id]
+    assert [user.id for user in by_emails] == [users[2].id]
+    assert missing == ["nobody@example.com"]
@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.infrastructure.cache import InMemoryCache, RedisCache
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for RedisCache."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+
+@pytest.mark.asyncio
+class TestInMemoryCache:
+    async def test_get_set_delete(self):
+        cache = InMemoryCache()
+
+        await cache.set("key", True)
+        assert await cache.get("key") is True
+
+        await cache.delete("key", "missing")
+        assert await cache.get("key") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    async def test_entries_expire(self):
+        cache = InMemoryCache(ttl=10)
+
+        with patch("src.infrastructure.cache.memory.time.monotonic", return_value=100):
+            await cache.set("key", True)
+        with patch("src.infrastructure.cache.memory.time.monotonic", return_value=111):
+            assert await cache.get("key") is None
+
+    async def test_least_recently_used_entry_is_evicted(self):
+        cache = InMemoryCache(max_size=2)
+
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+        assert await cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    async def test_add_only_stores_missing_or_expired_keys(self):
+        cache = InMemoryCache(ttl=10)
+
+        with patch("src.infrastructure.cache.memory.time.monotonic", return_value=100):
+            assert await cache.add("key", 1) is True
+            assert await cache.add("key", 2) is False
+        with patch("src.infrastructure.cache.memory.time.monotonic", return_value=111):
+            assert await cache.add("key", 3) is True
+            assert await cache.get("key") == 3
+
+
+@pytest.mark.asyncio
+class TestRedisCache:
+    async def test_get_set_delete(self):
+        client = FakeRedis()
+        cache = RedisCache(client, prefix="users:")
+
+        await cache.set("key", True)
+        assert client.store == {"users:key": "true"}
+        assert await cache.get("key") is True
+
+        await cache.delete("key")
+        assert await cache.get("key") is None
+        assert cache.stats()["hit_ratio"] == 0.5
+
+    async def test_add_only_stores_missing_keys(self):
+        cache = RedisCache(FakeRedis())
+
+        assert await cache.add("key", 1) is True
+        assert await cache.add("key", 2) is False
+        assert await cache.get("key") == 1
@@ -0,0 +1,66 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from src.domain.models import Message, User
+from src.infrastructure.database.instrumentation import QueryMetrics, instrument_engine, track_queries
+from src.infrastructure.repositories.message import MessageRepository
+from src.infrastructure.repositories.user import UserRepository
+
+
+class TestQueryInstrumentation:
+    @pytest_asyncio.fixture
+    async def metrics(self):
+        return QueryMetrics()
+
+    @pytest_asyncio.fixture
+    async def session(self, metrics):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        instrument_engine(engine, metrics)
+
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_track_queries_counts_statements_and_slowest(self, session):
+        with track_queries() as outer:
+            await session.execute(text("SELECT 1"))
+            with track_queries() as inner:
+                await session.execute(text("SELECT 2"))
+
+        assert outer.statements == 2
+        assert inner.statements == 1
+        assert outer.total_seconds >= outer.slowest_seconds > 0
+        assert outer.slowest_statement in ("SELECT 1", "SELECT 2")
+
+    @pytest.mark.asyncio
+    async def test_statements_are_tagged_with_repository_method(self, session, metrics):
+        user = await UserRepository(session).create(User(name="Tagged", email="tagged@example.com"))
+
+        with track_queries() as stats:
+            await MessageRepository(session).create(Message(sender_id=user.id, content="Tagged"))
+            streamed = [message async for message in MessageRepository(session).stream_by_sender_id(user.id)]
+
+        assert len(streamed) == 1
+        assert stats.slowest_operation in ("MessageRepository.create", "MessageRepository.stream_by_sender_id")
+        rendered = metrics.render()
+        assert 'db_statement_duration_seconds_count{operation="UserRepository.create"} 1' in rendered
+        # The INSERT and the sender's counter bump are both attributed to the create
+        assert 'db_statement_duration_seconds_count{operation="MessageRepository.create"} 2' in rendered
+        assert 'db_statement_duration_seconds_count{operation="MessageRepository.stream_by_sender_id"}' in rendered
+
+    def test_render_histogram_is_cumulative(self, metrics):
+        metrics.record_statement("UserRepository.get_by_id", 0.002)
+        metrics.record_statement("UserRepository.get_by_id", 3.0)
+
+        rendered = metrics.render()
+
+        assert 'db_statement_duration_seconds_bucket{operation="UserRepository.get_by_id",le="0.001"} 0' in rendered
+        assert 'db_statement_duration_seconds_bucket{operation="UserRepository.get_by_id",le="0.005"} 1' in rendered
+        assert 'db_statement_duration_seconds_bucket{operation="UserRepository.get_by_id",le="+Inf"} 2' in rendered
+        assert 'db_statement_duration_seconds_count{operation="UserRepository.get_by_id"} 2' in rendered
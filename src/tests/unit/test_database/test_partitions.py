@@ -0,0 +1,30 @@
+from datetime import date
+
+from src.infrastructure.database.partitions import (
+    add_months,
+    months_to_create,
+    partition_month,
+    partition_name,
+    partitions_to_detach,
+)
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_partition_name_round_trips():
+    assert partition_name(date(2024, 3, 1)) == "MESSAGE_p202403"
+    assert partition_month("MESSAGE_p202403") == date(2024, 3, 1)
+    assert partition_month("MESSAGE_default") is None
+
+
+def test_months_to_create_starts_with_current_month():
+    assert months_to_create(date(2024, 12, 18), 2) == [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+
+
+def test_partitions_to_detach_keeps_retained_months_and_default():
+    names = ["MESSAGE_p202405", "MESSAGE_default", "MESSAGE_p202403", "MESSAGE_p202404", "MESSAGE_p202406"]
+
+    assert partitions_to_detach(names, date(2024, 6, 18), retain_months=2) == ["MESSAGE_p202403"]
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.infrastructure.database.pool import PoolMonitor
+
+
+class TestPoolMonitor:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        return create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path}/pool.db", poolclass=AsyncAdaptedQueuePool, pool_size=2, max_overflow=1
+        )
+
+    @pytest.mark.asyncio
+    async def test_status_reports_checked_out_connections(self, engine):
+        monitor = PoolMonitor(engine)
+
+        async with engine.connect(), engine.connect(), engine.connect():
+            status = monitor.status()
+
+        assert status["size"] == 2
+        assert status["checked_out"] == 3
+        assert status["overflow"] == 1
+        await engine.dispose()
+
+    def test_status_aggregates_checkout_waits(self, engine):
+        monitor = PoolMonitor(engine)
+
+        monitor.record_checkout_wait(0.001)
+        monitor.record_checkout_wait(0.003)
+        status = monitor.status()
+
+        assert status["checkouts"] == 2
+        assert status["checkout_wait_avg_ms"] == pytest.approx(2.0)
+        assert status["checkout_wait_max_ms"] == pytest.approx(3.0)
@@ -0,0 +1,75 @@
+import time
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.infrastructure.database.routing import (
+    PRIMARY_PIN_COOKIE,
+    ReadSessionRouter,
+    is_pinned_to_primary,
+    pin_to_primary,
+    record_write,
+    track_writes,
+)
+
+
+def _request(cookies: dict) -> Request:
+    cookie_header = "; ".join(f"{name}={value}" for name, value in cookies.items())
+    return Request({"type": "http", "headers": [(b"cookie", cookie_header.encode())]})
+
+
+class TestReadSessionRouter:
+    def test_round_robins_over_replicas(self):
+        router = ReadSessionRouter(primary="primary", replicas=["replica-1", "replica-2"])
+
+        assert [router.session_factory() for _ in range(3)] == ["replica-1", "replica-2", "replica-1"]
+
+    def test_pinned_client_reads_from_primary(self):
+        router = ReadSessionRouter(primary="primary", replicas=["replica-1"])
+
+        assert router.session_factory(pinned_to_primary=True) == "primary"
+
+    def test_falls_back_to_primary_without_replicas(self):
+        router = ReadSessionRouter(primary="primary")
+
+        assert router.session_factory() == "primary"
+
+
+class TestPrimaryPinning:
+    def test_pin_sets_cookie(self):
+        response = Response()
+
+        pin_to_primary(response, 5)
+
+        assert PRIMARY_PIN_COOKIE in response.headers["set-cookie"]
+
+    def test_pin_disabled(self):
+        response = Response()
+
+        pin_to_primary(response, 0)
+
+        assert "set-cookie" not in response.headers
+
+    def test_is_pinned_until_expiry(self):
+        assert is_pinned_to_primary(_request({PRIMARY_PIN_COOKIE: time.time() + 5}))
+        assert not is_pinned_to_primary(_request({PRIMARY_PIN_COOKIE: time.time() - 5}))
+        assert not is_pinned_to_primary(_request({PRIMARY_PIN_COOKIE: "garbage"}))
+        assert not is_pinned_to_primary(_request({}))
+
+
+class TestWriteTracking:
+    def test_records_writes_in_open_blocks(self):
+        record_write()
+        with track_writes() as outer:
+            with track_writes() as inner:
+                assert not inner.recorded
+                record_write()
+
+        assert inner.recorded and outer.recorded
+
+    def test_writes_after_the_block_are_not_recorded(self):
+        with track_writes() as writes:
+            pass
+        record_write()
+
+        assert not writes.recorded
@@ -7,7 +7,9 @@ import pytest_asyncio
 
 from src.domain.exceptions.message import MessageNotFoundException
 from src.domain.exceptions.user import UserNotFoundException
-from src.domain.models import Message
+from src.domain.models import Message, MessageSearchRow
+from src.infrastructure.cache import InMemoryCache, user_exists_key
+from src.infrastructure.repositories.pagination import encode_cursor, encode_search_cursor
 from src.infrastructure.services.message_service import MessageService
 
 
@@ -16,7 +18,9 @@ class TestMessageService:
     def message_service(self):
         user_repository = AsyncMock()
         message_repository = AsyncMock()
-        return MessageService(user_repository=user_repository, message_repository=message_repository)
+        return MessageService(
+            user_repository=user_repository, message_repository=message_repository, unit_of_work=AsyncMock()
+        )
 
     @pytest_asyncio.fixture
     def user(self):
@@ -34,72 +38,186 @@ class TestMessageService:
 
     @pytest.mark.asyncio
     async def test_create_message_success(self, message_service, user, message):
-        message_service.user_repository.get_by_id.return_value = user
+        message_service.user_repository.exists.return_value = True
 
         message_service.message_repository.create.return_value = message
 
         result = await message_service.create_message(message)
 
-        message_service.user_repository.get_by_id.assert_awaited_once_with(message.sender_id)
+        message_service.user_repository.exists.assert_awaited_once_with(message.sender_id)
         message_service.message_repository.create.assert_awaited_once_with(message)
 
         assert result == message
 
     @pytest.mark.asyncio
     async def test_create_message_user_not_found(self, message_service, message):
-        message_service.user_repository.get_by_id.return_value = None
+        message_service.user_repository.exists.return_value = False
+
+        with pytest.raises(UserNotFoundException):
+            await message_service.create_message(message)
+
+        message_service.user_repository.exists.assert_awaited_once_with(message.sender_id)
+
+    @pytest.mark.asyncio
+    async def test_create_message_cached_sender_skips_lookup(self, message_service, message):
+        message_service.user_cache = InMemoryCache()
+        message_service.user_repository.exists.return_value = True
+
+        await message_service.create_message(message)
+        await message_service.create_message(message)
+
+        message_service.user_repository.exists.assert_awaited_once_with(message.sender_id)
+        assert message_service.message_repository.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_sender_deleted_during_the_check_is_not_cached(self, message_service, message):
+        message_service.user_cache = InMemoryCache()
+
+        async def deleted_meanwhile(sender_id):
+            # The delete commits and leaves its tombstone once the lookup found the sender
+            await message_service.user_cache.set(user_exists_key(sender_id), False)
+            return True
+
+        message_service.user_repository.exists.side_effect = deleted_meanwhile
+
+        await message_service.create_message(message)
+
+        assert await message_service.user_cache.get(user_exists_key(message.sender_id)) is False
+
+    @pytest.mark.asyncio
+    async def test_create_message_unknown_sender_is_not_cached(self, message_service, message):
+        message_service.user_cache = InMemoryCache()
+        message_service.user_repository.exists.return_value = False
 
         with pytest.raises(UserNotFoundException):
             await message_service.create_message(message)
 
-        message_service.user_repository.get_by_id.assert_awaited_once_with(message.sender_id)
+        assert await message_service.user_cache.get(user_exists_key(message.sender_id)) is None
+
+    @pytest.mark.asyncio
+    async def test_create_messages_reports_unknown_senders(self, message_service, user, message):
+        unknown_sender_message = Message(sender_id=uuid4(), content="Nobody sent this")
+        message_service.user_repository.get_existing_ids.return_value = {user["id"]}
+        message_service.message_repository.bulk_create.return_value = [message]
+
+        created, errors = await message_service.create_messages([unknown_sender_message, message])
+
+        message_service.user_repository.get_existing_ids.assert_awaited_once_with(
+            {user["id"], unknown_sender_message.sender_id}
+        )
+        message_service.message_repository.bulk_create.assert_awaited_once_with([message])
+        assert created == [message]
+        assert errors == [(0, f"Sender with ID {unknown_sender_message.sender_id} not found.")]
 
     @pytest.mark.asyncio
     async def test_get_messages_by_sender_id_success(self, message_service, message):
-        message_service.message_repository.get_by_sender_id.return_value = [message]
-        message_service.message_repository.get_by_sender_id_count.return_value = 1
+        message_service.message_repository.get_page_by_sender_id.return_value = (1, [message])
 
         result = await message_service.get_mesages_by_sender_id(message.sender_id, limit=5, offset=5)
 
-        message_service.message_repository.get_by_sender_id.assert_awaited_once_with(
-            sender_id=message.sender_id, limit=5, offset=5
+        message_service.message_repository.get_page_by_sender_id.assert_awaited_once_with(
+            sender_id=message.sender_id,
+            limit=5,
+            offset=5,
+            cursor=None,
+            include_count=True,
+            created_after=None,
+            created_before=None,
+        )
+        assert result == (1, [message], None)
+
+    @pytest.mark.asyncio
+    async def test_get_messages_by_sender_id_full_page_returns_cursor(self, message_service, message):
+        message_service.message_repository.get_page_by_sender_id.return_value = (3, [message])
+
+        count, messages, next_cursor = await message_service.get_mesages_by_sender_id(
+            message.sender_id, limit=1, cursor="previous"
+        )
+
+        message_service.message_repository.get_page_by_sender_id.assert_awaited_once_with(
+            sender_id=message.sender_id,
+            limit=1,
+            offset=None,
+            cursor="previous",
+            include_count=True,
+            created_after=None,
+            created_before=None,
+        )
+        assert (count, messages) == (3, [message])
+        assert next_cursor == encode_cursor(message.created_at, message.id)
+
+    @pytest.mark.asyncio
+    async def test_get_messages_by_sender_id_without_count(self, message_service, message):
+        message_service.message_repository.get_page_by_sender_id.return_value = (None, [message])
+
+        result = await message_service.get_mesages_by_sender_id(message.sender_id, limit=5, include_count=False)
+
+        message_service.message_repository.get_page_by_sender_id.assert_awaited_once_with(
+            sender_id=message.sender_id,
+            limit=5,
+            offset=None,
+            cursor=None,
+            include_count=False,
+            created_after=None,
+            created_before=None,
         )
-        message_service.message_repository.get_by_sender_id_count.assert_awaited_once_with(sender_id=message.sender_id)
-        assert result == (1, [message])
+        assert result == (None, [message], None)
 
     @pytest.mark.asyncio
     async def test_get_messages_by_sender_id_no_messages(self, message_service):
         sender_id = uuid4()
 
-        message_service.message_repository.get_by_sender_id.return_value = []
-        message_service.message_repository.get_by_sender_id_count.return_value = 0
+        message_service.message_repository.get_page_by_sender_id.return_value = (0, [])
 
         result = await message_service.get_mesages_by_sender_id(sender_id)
 
-        message_service.message_repository.get_by_sender_id.assert_awaited_once_with(
-            sender_id=sender_id, limit=None, offset=None
+        message_service.message_repository.get_page_by_sender_id.assert_awaited_once_with(
+            sender_id=sender_id,
+            limit=None,
+            offset=None,
+            cursor=None,
+            include_count=True,
+            created_after=None,
+            created_before=None,
         )
-        message_service.message_repository.get_by_sender_id_count.assert_awaited_once_with(sender_id=sender_id)
-        assert result == (0, [])
+        assert result == (0, [], None)
 
     @pytest.mark.asyncio
     async def test_delete_message_success(self, message_service, message):
-        message_service.message_repository.get_by_id.return_value = message
-
-        message_service.message_repository.soft_delete.return_value = None
+        message_service.message_repository.soft_delete.return_value = True
 
         await message_service.delete_message(message.id)
 
-        message_service.message_repository.get_by_id.assert_awaited_once_with(message.id)
+        # The conditional delete checks the message exists, without loading it first
+        message_service.message_repository.get_by_id.assert_not_awaited()
         message_service.message_repository.soft_delete.assert_awaited_once_with(message.id)
 
     @pytest.mark.asyncio
     async def test_delete_message_not_found(self, message_service):
         message_id = uuid4()
 
-        message_service.message_repository.get_by_id.return_value = None
+        message_service.message_repository.soft_delete.return_value = False
 
         with pytest.raises(MessageNotFoundException):
             await message_service.delete_message(message_id)
 
-        message_service.message_repository.get_by_id.assert_awaited_once_with(message_id)
+        message_service.message_repository.soft_delete.assert_awaited_once_with(message_id)
+
+    @pytest.mark.asyncio
+    async def test_search_messages_full_page_returns_cursor(self, message_service, message):
+        result = MessageSearchRow(message.id, message.sender_id, message.content, message.created_at, 0.5)
+        message_service.message_repository.search.return_value = [result]
+
+        results, next_cursor = await message_service.search_messages("test", sender_id=message.sender_id, limit=1)
+
+        message_service.message_repository.search.assert_awaited_once_with(
+            "test", sender_id=message.sender_id, limit=1, cursor=None
+        )
+        assert results == [result]
+        assert next_cursor == encode_search_cursor(0.5, message.created_at, message.id)
+
+    @pytest.mark.asyncio
+    async def test_search_messages_last_page_has_no_cursor(self, message_service):
+        message_service.message_repository.search.return_value = []
+
+        assert await message_service.search_messages("test") == ([], None)
@@ -1,4 +1,5 @@
-from unittest.mock import AsyncMock
+import asyncio
+from unittest.mock import AsyncMock, call
 from uuid import uuid4
 
 import pytest
@@ -6,6 +7,7 @@ from sqlalchemy.exc import IntegrityError
 
 from src.domain.exceptions.user import UserNotFoundException, UserAlreadyExistsException
 from src.domain.models import User
+from src.infrastructure.cache import InMemoryCache, user_exists_key
 from src.infrastructure.services.user_service import UserService
 
 
@@ -18,7 +20,9 @@ class TestUserService:
         message_repository = AsyncMock()
 
         # Create the UserService with the mocked dependencies
-        return UserService(user_repository=user_repository, message_repository=message_repository)
+        return UserService(
+            user_repository=user_repository, message_repository=message_repository, unit_of_work=AsyncMock()
+        )
 
     @pytest.fixture
     def user(self):
@@ -34,6 +38,7 @@ class TestUserService:
         result = await user_service.create_user(user)
 
         user_service.user_repository.create.assert_awaited_once_with(user)
+        user_service.unit_of_work.__aexit__.assert_awaited_once_with(None, None, None)
         assert result == user
 
     async def test_create_user_duplicate_email(self, user_service, user):
@@ -46,6 +51,8 @@ class TestUserService:
             await user_service.create_user(user)
 
         assert str(e.value) == f"User with email {user.email} already exists."
+        # The unit of work saw the error, so it rolled back instead of committing
+        assert user_service.unit_of_work.__aexit__.await_args.args[0] is IntegrityError
 
     async def test_get_user_by_email_found(self, user_service, user):
         user_service.user_repository.get_by_email.return_value = user
@@ -69,21 +76,165 @@ class TestUserService:
         assert result == user
 
     async def test_delete_user_success(self, user_service, user):
-        user_service.user_repository.get_by_id.return_value = user
-        user_service.user_repository.soft_delete.return_value = None
-        user_service.message_repository.soft_delete_by_sender_id.return_value = None
+        user_service.user_repository.soft_delete.return_value = True
+        user_service.message_repository.get_by_sender_id_count.return_value = 5
+        user_service.message_repository.soft_delete_batch_by_sender_id.side_effect = [2, 2, 1]
 
-        await user_service.delete_user(user.id)
+        result = await user_service.delete_user(user.id, batch_size=2)
 
-        user_service.user_repository.get_by_id.assert_awaited_once_with(user.id)
         user_service.user_repository.soft_delete.assert_awaited_once_with(user.id)
-        user_service.message_repository.soft_delete_by_sender_id.assert_awaited_once_with(sender_id=user.id)
+        assert user_service.message_repository.soft_delete_batch_by_sender_id.await_args_list == [call(user.id, 2)] * 3
+        # One transaction for the user, then one per batch of messages
+        assert user_service.unit_of_work.__aexit__.await_count == 4
+        assert result is True
+
+    async def test_delete_user_with_few_messages_in_one_transaction(self, user_service, user):
+        user_service.user_repository.soft_delete.return_value = True
+        user_service.message_repository.get_by_sender_id_count.return_value = 3
+
+        result = await user_service.delete_user(user.id, batch_size=5)
+
+        user_service.message_repository.soft_delete_by_sender_id.assert_awaited_once_with(user.id)
+        user_service.message_repository.soft_delete_batch_by_sender_id.assert_not_awaited()
+        user_service.unit_of_work.__aexit__.assert_awaited_once_with(None, None, None)
+        assert result is True
+
+    async def test_delete_user_defers_large_message_history(self, user_service, user):
+        user_service.user_repository.soft_delete.return_value = True
+        user_service.message_repository.get_by_sender_id_count.return_value = 11
+
+        result = await user_service.delete_user(user.id, inline_limit=10, batch_size=5)
+
+        user_service.user_repository.soft_delete.assert_awaited_once_with(user.id)
+        user_service.message_repository.soft_delete_batch_by_sender_id.assert_not_awaited()
+        assert result is False
 
     async def test_delete_user_not_found(self, user_service):
-        user_service.user_repository.get_by_id.return_value = None
+        user_service.user_repository.soft_delete.return_value = False
         user_id = uuid4()
 
         with pytest.raises(UserNotFoundException) as e:
-            await user_service.delete_user(user_id)
+            await user_service.delete_user(user_id, batch_size=5)
 
         assert str(e.value) == f"User with ID {user_id} not found."
+
+    async def test_remaining_messages_of_a_deleted_user(self, user_service, user):
+        user_service.user_repository.is_deleted.return_value = True
+        user_service.message_repository.get_by_sender_id_count.return_value = 7
+
+        assert await user_service.get_remaining_messages(user.id) == 7
+
+    @pytest.mark.parametrize("is_deleted", [None, False])
+    async def test_remaining_messages_of_a_user_not_deleted(self, user_service, is_deleted):
+        user_service.user_repository.is_deleted.return_value = is_deleted
+
+        with pytest.raises(UserNotFoundException):
+            await user_service.get_remaining_messages(uuid4())
+
+        user_service.message_repository.get_by_sender_id_count.assert_not_awaited()
+
+    async def test_delete_user_invalidates_cache(self, user_service, user):
+        user_service.user_cache = InMemoryCache()
+        await user_service.user_cache.set(user_exists_key(user.id), True)
+        user_service.user_repository.soft_delete.return_value = True
+        user_service.message_repository.get_by_sender_id_count.return_value = 0
+
+        await user_service.delete_user(user.id, batch_size=5)
+
+        # A tombstone, which a concurrent sender check can't overwrite
+        assert await user_service.user_cache.get(user_exists_key(user.id)) is False
+        assert await user_service.user_cache.add(user_exists_key(user.id), True) is False
+
+    async def test_update_user_invalidates_cache(self, user_service, user):
+        user_service.user_cache = InMemoryCache()
+        await user_service.user_cache.set(user_exists_key(user.id), True)
+        user_service.user_repository.update.return_value = user
+
+        await user_service.update_user(user.id, user)
+
+        assert await user_service.user_cache.get(user_exists_key(user.id)) is None
+
+    async def test_get_user_by_email_served_from_profile_cache(self, user_service, user):
+        user_service.profile_cache = InMemoryCache()
+        user_service.user_repository.get_by_email.return_value = user
+
+        await user_service.get_user_by_email(user.email)
+        cached_user = await user_service.get_user_by_email(user.email)
+
+        user_service.user_repository.get_by_email.assert_awaited_once_with(user.email)
+        assert cached_user.id == user.id
+        assert cached_user.updated_at == user.updated_at
+
+    async def test_get_user_by_email_profile_cache_ignores_casing(self, user_service, user):
+        user_service.profile_cache = InMemoryCache()
+        user_service.user_repository.get_by_email.return_value = user
+
+        await user_service.get_user_by_email(user.email)
+        cached_user = await user_service.get_user_by_email(user.email.upper())
+
+        user_service.user_repository.get_by_email.assert_awaited_once_with(user.email)
+        assert cached_user.id == user.id
+
+    async def test_replica_reads_do_not_fill_profile_cache(self, user_service, user):
+        user_service.profile_cache = InMemoryCache()
+        user_service.fill_profile_cache = False
+        user_service.user_repository.get_by_email.return_value = user
+
+        await user_service.get_user_by_email(user.email)
+        await user_service.get_user_by_email(user.email)
+
+        assert user_service.user_repository.get_by_email.await_count == 2
+
+    async def test_update_user_invalidates_profile_cache(self, user_service, user):
+        user_service.profile_cache = InMemoryCache()
+        user_service.user_repository.get_by_email.return_value = user
+        user_service.user_repository.update.return_value = user
+        await user_service.get_user_by_email(user.email)
+
+        await user_service.update_user(user.id, user)
+        await user_service.get_user_by_email(user.email)
+
+        assert user_service.user_repository.get_by_email.await_count == 2
+
+    async def test_get_users_by_ids_reports_missing(self, user_service, user):
+        unknown_id = uuid4()
+        user_service.user_repository.get_by_ids.return_value = [user]
+
+        users, missing = await user_service.get_users_by_ids([unknown_id, user.id, user.id])
+
+        user_service.user_repository.get_by_ids.assert_awaited_once_with([unknown_id, user.id])
+        assert users == [user]
+        assert missing == [unknown_id]
+
+    async def test_get_users_by_emails_ignores_casing(self, user_service, user):
+        user_service.user_repository.get_by_emails.return_value = [user]
+
+        users, missing = await user_service.get_users_by_emails(["JohnDoe@Example.com", "nobody@example.com"])
+
+        assert users == [user]
+        assert missing == ["nobody@example.com"]
+
+    async def test_concurrent_lookups_are_merged_into_one_batch(self, user_service, user):
+        other = User(id=uuid4(), name="Jane Doe", email="janedoe@example.com")
+        user_service.user_repository.get_by_ids.return_value = [user, other]
+        unknown_id = uuid4()
+
+        (first, _), (second, missing) = await asyncio.gather(
+            user_service.get_users_by_ids([user.id, other.id]),
+            user_service.get_users_by_ids([other.id, unknown_id]),
+        )
+
+        user_service.user_repository.get_by_ids.assert_awaited_once_with([user.id, other.id, unknown_id])
+        assert first == [user, other]
+        assert second == [other] and missing == [unknown_id]
+        # Memoized for the rest of the request
+        assert await user_service.get_users_by_ids([user.id]) == ([user], [])
+        assert user_service.user_repository.get_by_ids.await_count == 1
+
+    async def test_failed_lookup_is_retried(self, user_service, user):
+        user_service.user_repository.get_by_emails.side_effect = [RuntimeError("Connection lost"), [user]]
+
+        with pytest.raises(RuntimeError):
+            await user_service.get_users_by_emails([user.email])
+
+        assert await user_service.get_users_by_emails([user.email.upper()]) == ([user], [])